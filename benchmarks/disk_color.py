@@ -0,0 +1,112 @@
+"""黑体颜色查找表与直接积分的精度和耗时对比
+
+1. 在查找表覆盖的温度范围内随机取观测温度，比较查表与直接积分的色度和亮度误差；
+2. 比较两者在 NumPy 中每个样本的耗时；
+3. 用 CPU 参考实现渲染一帧，比较 diskShading=1（查找表）与 2（直接积分）的画面差异；
+4. 指定 --gl 时用离屏 OpenGL 渲染器比较 diskShading=0/1/2 的片元着色器耗时。
+
+    python -m benchmarks.disk_color --size 160x90
+    python -m benchmarks.disk_color --gl --size 1280x720
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from blackhole import blackbody, cpu
+from blackhole.camera import cameraParams
+from blackhole.params import makeParams
+
+SHADING_NAMES = {0: "grey", 1: "lookup table", 2: "analytic"}
+
+
+def parseSize(text):
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', expected WxH")
+    return width, height
+
+
+def accuracy(samples, seed=0):
+    """返回 (色度最大绝对误差, 亮度最大相对误差)"""
+    rng = np.random.default_rng(seed)
+    temperature = blackbody.T_MIN * (blackbody.T_MAX / blackbody.T_MIN) ** rng.random(samples)
+    table = blackbody.blackbodyTable()
+    approx = blackbody.sampleTable(table, temperature)
+    exact = blackbody.blackbodyRgba(temperature)
+    chroma = np.abs(approx[:, :3] - exact[:, :3]).max()
+    luminance = np.abs(np.exp2(approx[:, 3] - exact[:, 3]) - 1.0).max()
+    return chroma, luminance
+
+
+def timePerSample(function, temperature, repeats=5):
+    """多次调用取最短耗时，返回每个样本的纳秒数"""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(temperature)
+        best = min(best, time.perf_counter() - start)
+    return best / temperature.size * 1e9
+
+
+def measureGl(width, height, params, frames):
+    """离屏渲染 frames 帧，返回 (每帧毫秒, 最后一帧图像)"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication
+    from widgets.headless_renderer import HeadlessRenderer
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    renderer = HeadlessRenderer(width, height)
+    try:
+        results = {}
+        for shading in SHADING_NAMES:
+            shaded = dict(params, diskShading=shading)
+            renderer.renderFrame(shaded)  # 预热：编译着色器、上传纹理
+            start = time.perf_counter()
+            for _ in range(frames):
+                image = renderer.renderFrame(shaded)  # 读回像素，包含 GPU 同步
+            results[shading] = ((time.perf_counter() - start) / frames * 1e3, image.copy())
+        return results
+    finally:
+        renderer.release()
+        del app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blackbody lookup table vs direct integration")
+    parser.add_argument("--size", type=parseSize, default=(160, 90), help="frame size WxH")
+    parser.add_argument("--samples", type=int, default=100000, help="random temperatures for the accuracy test")
+    parser.add_argument("--gl", action="store_true", help="also time the fragment shader with an offscreen context")
+    parser.add_argument("--frames", type=int, default=20, help="frames per shading mode for --gl")
+    args = parser.parse_args()
+    width, height = args.size
+
+    chroma, luminance = accuracy(args.samples)
+    print(f"accuracy over {args.samples} temperatures in [{blackbody.T_MIN:.0f}, {blackbody.T_MAX:.0f}] K: "
+          f"chroma max abs {chroma:.2e}, luminance max rel {luminance:.2e}")
+
+    temperature = np.geomspace(blackbody.T_MIN, blackbody.T_MAX, args.samples)
+    table = blackbody.blackbodyTable()
+    lookup_ns = timePerSample(lambda t: blackbody.sampleTable(table, t), temperature)
+    analytic_ns = timePerSample(blackbody.blackbodyRgba, temperature)
+    print(f"numpy cost per sample: lookup {lookup_ns:.0f} ns, analytic {analytic_ns:.0f} ns "
+          f"({analytic_ns / lookup_ns:.1f}x)")
+
+    params = makeParams(cameraParams(theta=180.0, phi=90.0))
+    images = {shading: cpu.render(width, height, dict(params, diskShading=shading)) for shading in (1, 2)}
+    diff = np.abs(images[1] - images[2])[..., :3]
+    print(f"cpu frame {width}x{height}, lookup vs analytic: max abs {diff.max():.2e}, "
+          f"mean abs {diff.mean():.2e}")
+
+    if args.gl:
+        results = measureGl(width, height, params, args.frames)
+        reference = results[2][1]
+        for shading, (ms, image) in results.items():
+            error = np.abs(image - reference)[..., :3].max()
+            print(f"gl {SHADING_NAMES[shading]:<13} {ms:8.2f} ms/frame   max abs vs analytic {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""HDR 后处理（泛光链与色调映射）的逐通道 GPU 耗时
+
+在离屏 OpenGL 上下文中按几种输出尺寸各渲染 N 帧，从 FrameProfiler 读出每个后处理通道
+（bloom_down*/bloom_up*/tonemap）的 GPU 时间中位数，并给出泛光链第一级的比例与后处理合计。
+后处理在离线渲染中默认关闭，这里按 --tonemap/--bloom 显式开启。
+光线步进默认以 1/4 渲染比例进行，只用来提供 HDR 输入，不计入合计。
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.post
+    python -m benchmarks.post --sizes 1920x1080 3840x2160 --frames 30 --budget-ms 2.0
+"""
+import argparse
+import os
+import sys
+
+from benchmarks.integrators import parseSize
+from blackhole.params import TONEMAP_OPERATORS, makeParams
+
+
+def measure(width, height, frames, render_scale, post):
+    """渲染 frames 帧，返回 {通道名: GPU 时间中位数（毫秒）}"""
+    from OpenGL import GL as gl
+    from widgets.headless_renderer import HeadlessRenderer
+
+    headless = HeadlessRenderer(width, height)
+    headless.renderer.render_scale = render_scale
+    profiler = headless.renderer.profiler
+    try:
+        for frame in range(frames):
+            headless.draw(makeParams(post, iTime=frame / 60.0, iFrame=frame))
+            gl.glFinish()
+        stats = profiler.stats()
+    finally:
+        headless.release()
+    return {name[len("gpu."):]: s["p50"] for name, s in stats.items() if name.startswith("gpu.")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-pass GPU time of the bloom and tone-mapping passes")
+    parser.add_argument("--sizes", type=parseSize, nargs="+", default=[(1920, 1080), (3840, 2160)],
+                        help="output sizes WxH")
+    parser.add_argument("--frames", type=int, default=20, help="frames rendered per size")
+    parser.add_argument("--render-scale", type=float, default=0.25,
+                        help="ray-march render scale (the post passes always run at output size)")
+    parser.add_argument("--tonemap", choices=TONEMAP_OPERATORS[1:], default="aces")
+    parser.add_argument("--bloom", type=float, default=0.3, help="bloom strength; 0 measures the tonemap pass alone")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="exit with 1 when the post-processing total exceeds this at any size")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication
+    from widgets.post_process import bloomScale
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    over_budget = False
+    for width, height in args.sizes:
+        passes = measure(width, height, args.frames, args.render_scale,
+                         {"tonemap": TONEMAP_OPERATORS.index(args.tonemap), "bloom": args.bloom})
+        post = {name: ms for name, ms in passes.items() if name.startswith("bloom_") or name == "tonemap"}
+        total = sum(post.values())
+        print(f"{width}x{height}  bloom scale 1/{round(1.0 / bloomScale(width, height))}  "
+              f"march {passes.get('march', 0.0):.2f} ms")
+        for name in sorted(post):
+            print(f"  {name:<14} {post[name]:7.3f} ms")
+        print(f"  {'post total':<14} {total:7.3f} ms")
+        if args.budget_ms is not None and total > args.budget_ms:
+            print(f"  over budget ({args.budget_ms:.2f} ms)")
+            over_budget = True
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""比较光线剔除前后每像素的平均步进次数
+
+用 CPU 参考实现（与 circle.frag 相同的步进逻辑）在几个标准视角下各渲染一帧，
+分别统计关闭和开启剔除时的平均步数、被直接剔除的光线比例，以及两者画面差异较大的像素比例。
+
+    python -m benchmarks.step_count --size 320x180
+"""
+import argparse
+import time
+
+import numpy as np
+
+from blackhole import cpu
+from blackhole.camera import DEFAULT_PHI, cameraParams
+from blackhole.params import makeParams
+
+# 标准视角：名称 -> 相机 (theta, phi)（度）
+STANDARD_VIEWS = {
+    "default": (0.0, DEFAULT_PHI),
+    "low": (180.0, 90.0),
+    "overhead": (360.0, 45.0),
+    "behind": (540.0, 135.0),
+}
+
+
+def parseSize(text):
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', expected WxH")
+    return width, height
+
+
+def measure(width, height, params, culling):
+    """渲染一帧，返回 (颜色, 每条光线步数, 耗时秒)"""
+    fy, fx = np.mgrid[0:height, 0:width] + 0.5
+    start = time.perf_counter()
+    color, steps = cpu.marchRays(fx.ravel(), fy.ravel(), width, height, params,
+                                 culling=culling, return_steps=True)
+    return color, steps, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Average ray-march steps per pixel with and without culling")
+    parser.add_argument("--size", type=parseSize, default=(320, 180), help="frame size WxH")
+    args = parser.parse_args()
+    width, height = args.size
+
+    print(f"{'view':<10} {'steps (off)':>12} {'steps (on)':>11} {'culled':>8} "
+          f"{'time off/on (s)':>16} {'changed':>8}")
+    for name, (theta, phi) in STANDARD_VIEWS.items():
+        params = makeParams(cameraParams(theta, phi))
+        color_off, steps_off, time_off = measure(width, height, params, False)
+        color_on, steps_on, time_on = measure(width, height, params, True)
+        changed = (np.abs(color_on - color_off).max(axis=1) > 0.05).mean()
+        print(f"{name:<10} {steps_off.mean():>12.1f} {steps_on.mean():>11.1f} "
+              f"{(steps_on == 0).mean():>8.1%} {time_off:>8.2f}/{time_on:<7.2f} {changed:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
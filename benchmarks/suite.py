@@ -0,0 +1,332 @@
+"""渲染性能基准套件
+
+在固定分辨率下对一组固定场景各渲染 N 帧：circle.frag 的四种背景、几种黑洞质量、
+几个相机视角、查找表、自适应积分与克尔模式，以及基础演示 (basic.frag) 和多通道演示 (multipass1/2) 的着色器。
+每个场景记录每帧耗时（中位数与 95 分位），circle 场景另用 STEP_COUNT 变体统计每像素
+平均步进次数；整体记录启动时间（创建上下文、编译着色器到第一帧完成）和峰值常驻内存。
+结果写成 JSON，指定 --baseline 时与基线逐项比较，超出容差即视为退化并返回 1。
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.suite --out results.json
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --tolerance ms_per_frame=0.1
+    python -m benchmarks.suite --renderer cpu --size 160x90 --frames 2
+
+基线与机器相关，应在做比较的同一台机器（例如 CI 上的 llvmpipe）上生成。
+--renderer cpu 使用 NumPy 参考实现，只包含 circle 场景，可在没有 OpenGL 的环境中运行。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.step_count import STANDARD_VIEWS
+from blackhole import cpu, procedural
+from blackhole.camera import cameraParams
+from blackhole.kerr import kerrParams
+from blackhole.params import makeParams
+
+# 各指标允许的相对增幅，均为越小越好
+DEFAULT_TOLERANCES = {
+    "ms_per_frame": 0.15,
+    "steps_per_pixel": 0.02,
+    "startup_s": 0.5,
+    "peak_rss_mb": 0.25,
+}
+SCENE_METRICS = ("ms_per_frame", "steps_per_pixel")
+GLOBAL_METRICS = ("startup_s", "peak_rss_mb")
+PANORAMA_NAME = "benchmark_panorama.npy"
+
+
+def parseSize(text):
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', expected WxH")
+    return width, height
+
+
+def parseTolerance(text):
+    """'metric=value' 设置单项容差，单独的数值设置全部指标"""
+    name, _, value = text.rpartition("=")
+    try:
+        value = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid tolerance '{text}'")
+    if name and name not in DEFAULT_TOLERANCES:
+        raise argparse.ArgumentTypeError(
+            f"unknown metric '{name}', expected one of {', '.join(DEFAULT_TOLERANCES)}")
+    return name, value
+
+
+def panoramaPath():
+    """纹理背景场景使用的全景图（由程序噪声生成，写入程序纹理的缓存目录）"""
+    path = os.path.join(procedural.cacheDir(), PANORAMA_NAME)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image = np.tile(procedural.generate("noise", size=512, seed=7), (1, 2, 1))
+        np.save(path, image)
+    return path
+
+
+def scenes():
+    """场景名 -> (类型, 参数覆盖)，类型为 circle / basic / multipass"""
+    result = {}
+    for background in (0, 1, 2, 3):
+        overrides = {"backgroundType": background}
+        if background == 3:
+            overrides["backgroundPath"] = panoramaPath()
+        result[f"circle/background{background}"] = ("circle", overrides)
+    for mass in (5.0e6, 1.49e7, 3.0e7):
+        result[f"circle/mass{mass:.3g}"] = ("circle", {"MBlackHole": mass})
+    for name, (theta, phi) in STANDARD_VIEWS.items():
+        if name != "default":
+            result[f"circle/view_{name}"] = ("circle", cameraParams(theta, phi))
+    result["circle/deflection_lut"] = ("circle", {"deflectionLut": 1})
+    result["circle/adaptive_rk"] = ("circle", {"integrator": 1})
+    result["circle/kerr"] = ("circle", kerrParams(0.9))
+    result["basic"] = ("basic", {})
+    result["multipass"] = ("multipass", {})
+    return result
+
+
+def frameTimes(render, frames):
+    """预热一帧后逐帧计时，返回 (中位数, 95 分位)（毫秒）"""
+    render(0)
+    times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        render(frame)
+        times.append((time.perf_counter() - start) * 1e3)
+    return float(np.median(times)), float(np.percentile(times, 95))
+
+
+def peakRssMb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024.0  # macOS 为字节，Linux 为 KB
+
+
+class GlBench:
+    """离屏 OpenGL 上下文中的场景渲染"""
+
+    def __init__(self, width, height):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtGui import QGuiApplication
+        from widgets.headless_renderer import HeadlessRenderer
+
+        self.app = QGuiApplication.instance() or QGuiApplication([])
+        self.width = width
+        self.height = height
+        self.headless = HeadlessRenderer(width, height)
+        self.graphs = {}
+
+    def description(self):
+        from OpenGL import GL as gl
+
+        self.headless.makeCurrent()
+        return gl.glGetString(gl.GL_RENDERER).decode("utf-8", "replace")
+
+    def graph(self, kind):
+        """basic / multipass 场景的渲染图（与对应组件使用相同的着色器和通道）"""
+        graph = self.graphs.get(kind)
+        if graph is None:
+            from widgets.multipass_widget import createMultiPassGraph
+            from widgets.render_graph import RenderGraph
+
+            if kind == "basic":
+                graph = RenderGraph()
+                graph.addPass("basic", "shaders/basic.vert", "shaders/basic.frag")
+                graph.setOutput("basic")
+            else:
+                graph = createMultiPassGraph()
+            self.headless.makeCurrent()
+            graph.initializeGL()
+            self.graphs[kind] = graph
+        return graph
+
+    def render(self, kind, params, frame):
+        """渲染一帧并等待 GPU 完成"""
+        from OpenGL import GL as gl
+
+        if kind == "circle":
+            self.headless.draw(dict(params, iTime=frame / 60.0, iFrame=frame))
+        else:
+            graph = self.graph(kind)
+            self.headless.makeCurrent()
+            if kind == "basic":
+                graph.setUniforms("basic", iTime=frame / 60.0)
+            graph.execute(self.width, self.height, self.headless.fbo.handle())
+        gl.glFinish()
+
+    def stepsPerPixel(self, params):
+        pixels = self.headless.renderFrame(dict(params, stepCount=1))
+        return float(pixels[..., 0].mean())
+
+    def release(self):
+        self.headless.release()
+
+
+class CpuBench:
+    """NumPy 参考实现，只支持 circle 场景"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        fy, fx = np.mgrid[0:height, 0:width] + 0.5
+        self.fx, self.fy = fx.ravel(), fy.ravel()
+        self.steps = None
+
+    def description(self):
+        return "numpy"
+
+    def render(self, kind, params, frame):
+        _, self.steps = cpu.marchRays(self.fx, self.fy, self.width, self.height,
+                                      dict(params, iTime=frame / 60.0, iFrame=frame), return_steps=True)
+
+    def stepsPerPixel(self, params):
+        return float(self.steps.mean())  # 计时循环最后一帧的步数
+
+    def release(self):
+        pass
+
+
+def runSuite(renderer, width, height, frames, only=None, log=print):
+    """运行所有（或名称包含 only 的）场景，返回结果字典"""
+    start = time.perf_counter()
+    bench = GlBench(width, height) if renderer == "gl" else CpuBench(width, height)
+    first = True
+    results = {}
+    try:
+        for name, (kind, overrides) in scenes().items():
+            if only and only not in name:
+                continue
+            if renderer == "cpu" and kind != "circle":
+                continue
+            params = makeParams(overrides)
+            if first:
+                # 启动时间：创建上下文、编译着色器、上传纹理直到第一帧完成
+                bench.render(kind, params, 0)
+                startup = time.perf_counter() - start
+                first = False
+            median, p95 = frameTimes(lambda frame: bench.render(kind, params, frame), frames)
+            entry = {"ms_per_frame": median, "ms_p95": p95}
+            if kind == "circle":
+                entry["steps_per_pixel"] = bench.stepsPerPixel(params)
+            results[name] = entry
+            steps = f"  {entry['steps_per_pixel']:7.1f} steps/px" if "steps_per_pixel" in entry else ""
+            log(f"{name:<24} {median:9.2f} ms  (p95 {p95:8.2f}){steps}")
+        description = bench.description()
+    finally:
+        bench.release()
+
+    return {
+        "meta": {
+            "renderer": renderer,
+            "device": description,
+            "size": [width, height],
+            "frames": frames,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "startup_s": startup if results else None,
+        "peak_rss_mb": peakRssMb(),
+        "scenes": results,
+    }
+
+
+def compare(results, baseline, tolerances):
+    """逐项与基线比较，返回 [(项目, 指标, 基线, 当前, 相对变化, 是否退化)]"""
+    rows = []
+
+    def check(label, metric, old, new):
+        if old is None or new is None or old <= 0:
+            return
+        change = new / old - 1.0
+        rows.append((label, metric, old, new, change, change > tolerances[metric]))
+
+    for metric in GLOBAL_METRICS:
+        check("(global)", metric, baseline.get(metric), results.get(metric))
+    for name, entry in results["scenes"].items():
+        old = baseline["scenes"].get(name)
+        if old is None:
+            continue  # 基线中没有的新场景
+        for metric in SCENE_METRICS:
+            check(name, metric, old.get(metric), entry.get(metric))
+    return rows
+
+
+def writeJson(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp = f"{path}.tmp"
+    with open(temp, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render performance benchmark suite")
+    parser.add_argument("--renderer", choices=("gl", "cpu"), default="gl")
+    parser.add_argument("--size", type=parseSize, default=(640, 360), help="frame size WxH")
+    parser.add_argument("--frames", type=int, default=20, help="timed frames per scene")
+    parser.add_argument("--only", help="run only scenes whose name contains this text")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=parseTolerance, action="append", default=[],
+                        help="allowed relative increase, 'metric=value' or a value for all metrics "
+                             f"(defaults: {', '.join(f'{k}={v}' for k, v in DEFAULT_TOLERANCES.items())})")
+    args = parser.parse_args()
+
+    tolerances = dict(DEFAULT_TOLERANCES)
+    for name, value in args.tolerance:
+        if name:
+            tolerances[name] = value
+        else:
+            tolerances = dict.fromkeys(tolerances, value)
+
+    width, height = args.size
+    results = runSuite(args.renderer, width, height, max(1, args.frames), args.only)
+    if not results["scenes"]:
+        raise SystemExit(f"No scenes matched --only '{args.only}' for the {args.renderer} renderer")
+    rss = results["peak_rss_mb"]
+    print(f"startup {results['startup_s']:.2f}s, peak RSS "
+          + (f"{rss:.0f} MB" if rss is not None else "n/a") + f", device {results['meta']['device']}")
+    if args.out:
+        writeJson(args.out, results)
+    if args.save_baseline:
+        writeJson(args.save_baseline, results)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    for key in ("renderer", "size"):
+        if baseline["meta"][key] != results["meta"][key]:
+            raise SystemExit(f"Baseline {key} {baseline['meta'][key]} does not match {results['meta'][key]}")
+
+    rows = compare(results, baseline, tolerances)
+    regressions = [row for row in rows if row[5]]
+    print(f"\n{'scene':<24} {'metric':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for label, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{label:<24} {metric:<16} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond tolerance")
+        return 1
+    print("\nNo regressions beyond tolerance")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
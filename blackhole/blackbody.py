@@ -0,0 +1,100 @@
+"""黑体颜色查找表
+
+吸积盘某点的静止系温度为 T，观测到的频移因子为 g（多普勒与引力红移之积）时，
+观测到的谱仍是黑体谱，温度为 g*T（I_ν/ν^3 沿光线不变）。因此 (温度, 频移) -> RGB
+的二维表可以压缩成按观测温度索引的一维表，着色器每步只需一次纹理采样。
+
+颜色由 Planck 谱与 CIE 1931 配色函数积分得到 XYZ，再转换为线性 sRGB；配色函数
+使用 Wyman, Sloan & Shirley (2013) 的多峰高斯拟合。表的每个纹素存
+(r, g, b, log2 Y)：rgb 为亮度归一化 (Y=1) 后的颜色（截去色域外的负值），
+log2 Y 为相对 REFERENCE_TEMPERATURE 的亮度。
+"""
+import numpy as np
+
+T_MIN = 1000.0      # 表覆盖的观测温度范围 (K)
+T_MAX = 100000.0
+TABLE_SIZE = 256
+REFERENCE_TEMPERATURE = 6500.0
+WAVELENGTHS = np.arange(360.0, 831.0, 1.0)  # 积分波长 (nm)
+
+# XYZ -> 线性 sRGB (D65)
+XYZ_TO_RGB = np.array([
+    [3.2406, -1.5372, -0.4986],
+    [-0.9689, 1.8758, 0.0415],
+    [0.0557, -0.2040, 1.0570],
+])
+
+
+def _lobe(wavelength, mu, sigma1, sigma2):
+    sigma = np.where(wavelength < mu, sigma1, sigma2)
+    return np.exp(-0.5 * ((wavelength - mu) / sigma) ** 2)
+
+
+def cieXyz(wavelength):
+    """CIE 1931 2° 配色函数 (x̄, ȳ, z̄) 的多峰高斯拟合"""
+    x = (1.056 * _lobe(wavelength, 599.8, 37.9, 31.0)
+         + 0.362 * _lobe(wavelength, 442.0, 16.0, 26.7)
+         - 0.065 * _lobe(wavelength, 501.1, 20.4, 26.2))
+    y = (0.821 * _lobe(wavelength, 568.8, 46.9, 40.5)
+         + 0.286 * _lobe(wavelength, 530.9, 16.3, 31.1))
+    z = (1.217 * _lobe(wavelength, 437.0, 11.8, 36.0)
+         + 0.681 * _lobe(wavelength, 459.0, 26.0, 13.8))
+    return np.stack([x, y, z], axis=-1)
+
+
+def planck(wavelength_nm, temperature):
+    """黑体光谱辐射亮度（省略常数因子 2hc^2，波长以 nm 为单位）"""
+    x = 1.4387769e7 / (wavelength_nm * temperature)  # hc/(λkT)
+    return 1.0 / (wavelength_nm ** 5 * np.expm1(np.minimum(x, 700.0)))
+
+
+def blackbodyXyz(temperature):
+    """对 Planck 谱和配色函数做数值积分，返回 (..., 3) 的 XYZ"""
+    temperature = np.asarray(temperature, dtype=np.float64)
+    spectrum = planck(WAVELENGTHS, temperature[..., None])
+    return spectrum @ cieXyz(WAVELENGTHS)
+
+
+_REFERENCE_Y = float(blackbodyXyz(REFERENCE_TEMPERATURE)[1])
+
+
+def blackbodyRgba(temperature):
+    """直接积分得到 (r, g, b, log2 Y)，与查找表的内容相同（解析参考路径）"""
+    xyz = blackbodyXyz(temperature)
+    y = xyz[..., 1]
+    rgb = np.maximum(xyz @ XYZ_TO_RGB.T, 0.0) / y[..., None]
+    return np.concatenate([rgb, np.log2(y / _REFERENCE_Y)[..., None]], axis=-1)
+
+
+def tableCoord(temperature, size=TABLE_SIZE):
+    """观测温度 -> 纹理坐标（纹素中心对齐，与着色器 blackbodyCoord 一致）"""
+    t = np.log(np.clip(temperature, T_MIN, T_MAX) / T_MIN) / np.log(T_MAX / T_MIN)
+    return (t * (size - 1) + 0.5) / size
+
+
+def blackbodyTable(size=TABLE_SIZE):
+    """按观测温度对数均匀采样的查找表 (1, size, 4) float32"""
+    temperature = T_MIN * (T_MAX / T_MIN) ** (np.arange(size) / (size - 1))
+    return blackbodyRgba(temperature).astype(np.float32)[None]
+
+
+def sampleTable(table, temperature):
+    """线性插值采样查找表（与 GL_LINEAR 纹理采样相同），返回 (..., 4)"""
+    row = table[0].astype(np.float64)
+    size = row.shape[0]
+    x = tableCoord(np.asarray(temperature, dtype=np.float64), size) * size - 0.5
+    i0 = np.clip(np.floor(x).astype(np.int64), 0, size - 2)
+    f = np.clip(x - i0, 0.0, 1.0)[..., None]
+    return row[i0] * (1.0 - f) + row[i0 + 1] * f
+
+
+def diskTemperature(r, r_in, peak_temperature):
+    """薄盘温度分布 T ∝ [x^-3 (1 - sqrt(x_in/x))]^(1/4)，归一化使最高温度为 peak_temperature
+
+    r 与 r_in 单位相同；最高温度出现在 r = 49/36 r_in。
+    """
+    r = np.asarray(r, dtype=np.float64)
+    profile = r ** -3 * np.maximum(1.0 - np.sqrt(r_in / r), 0.0)
+    r_peak = 49.0 / 36.0 * r_in
+    peak = r_peak ** -3 / 7.0
+    return peak_temperature * np.maximum(profile / peak, 1e-6) ** 0.25
@@ -0,0 +1,168 @@
+"""相机与关键帧相机路径
+
+着色器直接使用 Python 端算好的视图矩阵 (RenderParams.iView) 和视场 iFov，
+画面不再依赖窗口尺寸和 iMouse 像素坐标。相机用球坐标描述：绕世界原点的方位角 theta、
+极角 phi（度，与原 GetCamera 中的 _Theta/_Phi 相同，phi=0 时位于 -z 方向）和距离（光年），
+相机始终朝向原点。
+
+CameraPath 在关键帧之间做 Catmull-Rom 样条插值，一次向量化调用算出整段序列的视图矩阵::
+
+    path = CameraPath([
+        {"time": 0.0, "theta": 0.0, "phi": 80.0},
+        {"time": 4.0, "theta": 180.0, "phi": 60.0, "distance": 4.0e-5},
+        {"time": 8.0, "theta": 360.0, "phi": 80.0},
+    ])
+    views, fovs = path.sample(np.arange(480) / 60.0)
+"""
+import json
+import math
+
+import numpy as np
+
+DEFAULT_THETA = 0.0
+DEFAULT_PHI = math.degrees(0.0005)  # 原 iMouse=(0, 0) 时的极角
+DEFAULT_DISTANCE = 0.000057         # 相机到旋转中心的距离（光年），即原 _R
+DEFAULT_FOV = 0.5                   # 屏幕半宽对应的 tan(半视角)，即原 FOV
+PHI_EPSILON = 0.0005                # 极角与两极保持的距离（弧度），避免相机基退化
+KEYFRAME_FIELDS = ("theta", "phi", "distance", "fov")
+
+
+def orbitCamera(theta, phi, distance=DEFAULT_DISTANCE):
+    """球坐标（度）-> (位置 (..., 3), 旋转 (..., 3, 3))，与原 GetCamera 的构造相同
+
+    旋转矩阵的行为相机系的 X、Y、Z 轴（世界系），相机沿 -Z 看向原点。
+    参数可以是标量或可广播的数组。
+    """
+    theta, phi, distance = np.broadcast_arrays(
+        np.radians(np.asarray(theta, dtype=np.float64)),
+        np.clip(np.radians(np.asarray(phi, dtype=np.float64)), PHI_EPSILON, math.pi - PHI_EPSILON),
+        np.asarray(distance, dtype=np.float64))
+    position = distance[..., None] * np.stack([
+        np.sin(phi) * np.cos(theta),
+        np.sin(phi) * np.sin(theta),
+        -np.cos(phi),
+    ], axis=-1)
+    Z = position / np.linalg.norm(position, axis=-1, keepdims=True)
+    X = np.cross([0.0, 0.0, 1.0], position)
+    X /= np.linalg.norm(X, axis=-1, keepdims=True)
+    Y = np.cross(position, X)
+    Y /= np.linalg.norm(Y, axis=-1, keepdims=True)
+    return position, np.stack([X, Y, Z], axis=-2)
+
+
+def viewMatrix(position, rotation):
+    """世界系 -> 相机系的 4x4 矩阵 (..., 4, 4)：先平移到相机位置再旋转"""
+    position = np.asarray(position, dtype=np.float64)
+    rotation = np.asarray(rotation, dtype=np.float64)
+    view = np.zeros(position.shape[:-1] + (4, 4))
+    view[..., :3, :3] = rotation
+    view[..., :3, 3] = -np.einsum("...ij,...j->...i", rotation, position)
+    view[..., 3, 3] = 1.0
+    return view
+
+
+def viewBasis(view):
+    """视图矩阵 -> (相机位置, 旋转)，viewMatrix 的逆"""
+    view = np.asarray(view, dtype=np.float64)
+    rotation = view[:3, :3]
+    return -rotation.T @ view[:3, 3], rotation
+
+
+def cameraParams(theta=DEFAULT_THETA, phi=DEFAULT_PHI, distance=DEFAULT_DISTANCE, fov=DEFAULT_FOV):
+    """单个相机对应的渲染参数 {"cameraView", "fov"}，视图矩阵为嵌套元组（可哈希、可写入 JSON）"""
+    view = viewMatrix(*orbitCamera(theta, phi, distance))
+    return {"cameraView": viewTuple(view), "fov": float(fov)}
+
+
+def viewTuple(view):
+    return tuple(tuple(float(v) for v in row) for row in view)
+
+
+def mouseAngles(x, y, width, height):
+    """界面中的鼠标像素坐标 -> (theta, phi)（度），与原着色器中 iMouse 的映射相同"""
+    theta = 4.0 * math.pi * x / width
+    phi = 0.999 * math.pi * y / height + 0.0005
+    return math.degrees(theta), math.degrees(phi)
+
+
+def catmullRom(times, values, t):
+    """非均匀 Catmull-Rom 样条（切线为相邻关键帧的差商），values 为 (k, m)，返回 (n, m)
+
+    关键帧时刻之外取端点值；只有两个关键帧时退化为 Hermite 插值（端点切线为割线斜率）。
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    t = np.clip(np.asarray(t, dtype=np.float64), times[0], times[-1])
+    if len(times) == 1:
+        return np.repeat(values, t.size, axis=0)
+
+    # 各关键帧的切线：内部点用中心差商，端点用单侧差商
+    tangents = np.empty_like(values)
+    tangents[1:-1] = (values[2:] - values[:-2]) / (times[2:] - times[:-2])[:, None]
+    tangents[0] = (values[1] - values[0]) / (times[1] - times[0])
+    tangents[-1] = (values[-1] - values[-2]) / (times[-1] - times[-2])
+
+    i = np.clip(np.searchsorted(times, t, side="right") - 1, 0, len(times) - 2)
+    dt = (times[i + 1] - times[i])[:, None]
+    s = ((t - times[i])[:, None]) / dt
+    s2, s3 = s * s, s * s * s
+    h00 = 2.0 * s3 - 3.0 * s2 + 1.0
+    h10 = s3 - 2.0 * s2 + s
+    h01 = -2.0 * s3 + 3.0 * s2
+    h11 = s3 - s2
+    return (h00 * values[i] + h10 * dt * tangents[i]
+            + h01 * values[i + 1] + h11 * dt * tangents[i + 1])
+
+
+class CameraPath:
+    """关键帧相机路径
+
+    keyframes 为按时间递增的字典列表，键为 time（秒）及 theta、phi（度）、distance（光年）、
+    fov 中的任意几个；缺少的字段沿用上一个关键帧（第一个关键帧取默认值）。
+    theta 不做周期折返，0 -> 720 表示转两圈。
+    """
+
+    def __init__(self, keyframes):
+        if not keyframes:
+            raise ValueError("A camera path needs at least one keyframe")
+        current = {"theta": DEFAULT_THETA, "phi": DEFAULT_PHI,
+                   "distance": DEFAULT_DISTANCE, "fov": DEFAULT_FOV}
+        times, values = [], []
+        for keyframe in keyframes:
+            unknown = set(keyframe) - set(KEYFRAME_FIELDS) - {"time"}
+            if unknown:
+                raise ValueError(f"Unknown keyframe field(s): {', '.join(sorted(unknown))}")
+            current.update({name: float(keyframe[name]) for name in KEYFRAME_FIELDS if name in keyframe})
+            times.append(float(keyframe.get("time", len(times))))
+            values.append([current[name] for name in KEYFRAME_FIELDS])
+        if np.any(np.diff(times) <= 0.0):
+            raise ValueError("Keyframe times must be strictly increasing")
+        self.times = np.array(times)
+        self.values = np.array(values)
+
+    @classmethod
+    def load(cls, path):
+        """从 JSON 文件读取：关键帧列表，或 {"keyframes": [...]}"""
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        return cls(data["keyframes"] if isinstance(data, dict) else data)
+
+    @property
+    def duration(self):
+        return float(self.times[-1] - self.times[0])
+
+    def interpolate(self, times):
+        """插值后的球坐标，返回 {字段名: (n,) 数组}"""
+        values = catmullRom(self.times, self.values, np.atleast_1d(times))
+        return {name: values[:, k] for k, name in enumerate(KEYFRAME_FIELDS)}
+
+    def sample(self, times):
+        """各时刻的视图矩阵 (n, 4, 4) 与视场 (n,)"""
+        state = self.interpolate(times)
+        position, rotation = orbitCamera(state["theta"], state["phi"], state["distance"])
+        return viewMatrix(position, rotation), state["fov"]
+
+    def params(self, times):
+        """各时刻的相机渲染参数 [{"cameraView", "fov"}, ...]，可直接合并进 makeParams"""
+        views, fovs = self.sample(times)
+        return [{"cameraView": viewTuple(view), "fov": float(fov)} for view, fov in zip(views, fovs)]
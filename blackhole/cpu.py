@@ -0,0 +1,667 @@
+"""circle.frag 测地线光线步进的 NumPy 向量化参考实现
+
+所有像素的光线作为一批数组同时推进，用每条光线的终止掩码代替逐像素分支，
+结果可作为 GLSL 路径的对照基准，也可在没有 GPU 的机器上直接出图。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from blackhole import blackbody, integrators, kerr, lut, procedural, starfield
+from blackhole.camera import viewBasis
+from blackhole.params import diskBasis, makeParams, schwarzschildRadius
+
+MAX_STEPS = 2000        # 着色器中没有上限，这里防止绕光子球的光线无限循环
+COMPACT_FRACTION = 0.25 # 结束的光线超过该比例时压缩数组
+MAX_DISK_CROSSINGS = 4  # 查找表模式下每条光线最多计算的吸积盘穿越次数
+CULL_MARGIN = 2.0       # 剔除半径比吸积盘外半径多出的透镜余量（Rs）
+CULL_MIN_RADIUS = 10.0  # 剔除半径下限（Rs），更近处弱场偏折公式误差过大
+ESCAPE_RADIUS = 100.0   # 远离中的光线超过该距离（Rs）视为逃逸
+
+# 吸积盘湍流的噪声坐标与转动（与 circle.frag 中的同名 #define 相同）
+NOISE_AZIMUTH_TILES = 4.0
+NOISE_RADIAL_SCALE = 0.5
+NOISE_VERTICAL_SCALE = 0.5
+NOISE_DETAIL = 3.0
+DISK_INNER_PERIOD = 20.0
+
+
+def _fract(x):
+    return x - np.floor(x)
+
+
+def randomStep(x, y, seed):
+    """与 RandomStep 相同的哈希随机数"""
+    s = _fract(11.4514 * np.sin(seed))
+    return _fract(np.sin((x + s) * 12.9898 + (y + s) * 78.233) * 43758.5453)
+
+
+def chessTexture(size=64, tiles=8):
+    """与 CircleRenderer 使用的棋格纹理相同 (浮点 RGBA)"""
+    return procedural.chessboard(size, tiles).astype(np.float32) / 255.0
+
+
+def render(width, height, params=None, workers=None, region=None):
+    """渲染一帧，返回 (height, width, 4) 的 float32 RGBA 数组（第 0 行为图像顶部）
+
+    region=(x0, y0, w, h) 时只渲染整幅图像中的一块（图像坐标，原点在左上角），
+    返回 (h, w, 4)，与整幅渲染结果的对应部分一致。
+    """
+    params = makeParams(params)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    x0, y0, region_w, region_h = region if region is not None else (0, 0, width, height)
+    image = np.zeros((region_h, region_w, 4), dtype=np.float32)
+
+    # 按行分块，NumPy 的逐元素运算会释放 GIL，因此线程即可利用多核
+    bands = np.array_split(np.arange(region_h), max(1, min(workers, region_h)))
+    bands = [rows for rows in bands if rows.size]
+
+    def renderBand(rows):
+        fy = (height - 1 - (y0 + rows)).astype(np.float64) + 0.5  # gl_FragCoord.y 自下而上
+        fx = np.arange(x0, x0 + region_w, dtype=np.float64) + 0.5
+        fx, fy = np.meshgrid(fx, fy)
+        color = marchRays(fx.ravel(), fy.ravel(), width, height, params)
+        image[rows[0]:rows[-1] + 1] = color.reshape(rows.size, region_w, 4)
+
+    if len(bands) == 1:
+        renderBand(bands[0])
+    else:
+        with ThreadPoolExecutor(max_workers=len(bands)) as pool:
+            list(pool.map(renderBand, bands))
+    return image
+
+
+def weakFieldDirection(nx, ny, nz, dx, dy, dz, Dis, Rs):
+    """按弱场偏折公式给出光线逃逸到无穷远时的方向（与 weakFieldDirection 相同）
+
+    完整掠过的偏折角取到二阶 2 Rs/b + 15π/16 (Rs/b)^2；光线已走过一部分时按
+    一阶偏折沿直线积分的比例 (1 - x)^2 (2 + x) / 4 折算，x 为方向与径向夹角的余弦。
+    """
+    x = nx * dx + ny * dy + nz * dz
+    # 径向单位矢量垂直于方向的部分取反，指向黑洞一侧
+    ex = x * dx - nx
+    ey = x * dy - ny
+    ez = x * dz - nz
+    sin_a = np.sqrt(ex * ex + ey * ey + ez * ez)
+    rb = Rs / np.maximum(Dis * sin_a, 1e-12 * Rs)
+    delta = (2.0 * rb + 15.0 * np.pi / 16.0 * rb * rb) * (1.0 - x) ** 2 * (2.0 + x) / 4.0
+    inv = np.sin(delta) / np.maximum(sin_a, 1e-12)
+    c = np.cos(delta)
+    return c * dx + inv * ex, c * dy + inv * ey, c * dz + inv * ez
+
+
+def marchRays(fx, fy, width, height, params, culling=True, return_steps=False):
+    """对一组 gl_FragCoord 进行测地线步进，返回 (n, 4) 颜色
+
+    culling 为真时，最近距离在剔除半径之外的光线直接按弱场公式偏折后查背景，
+    并只在光线位于吸积盘薄层内时计算吸积盘颜色（与着色器一致）；
+    return_steps 为真时同时返回每条光线的步进次数。
+    """
+    n = fx.size
+    MBH = params["MBlackHole"]
+    Rs = schwarzschildRadius(MBH)
+    iTime = params["iTime"]
+
+    uvx = fx / width
+    uvy = fy / height
+
+    # 相机与黑洞位置
+    campos, cam_rot = viewBasis(params["cameraView"])
+    fov = params["fov"]
+    BHAPos = np.array([5.0 * Rs, 0.0, 0.0])
+    BHRPos = cam_rot @ (BHAPos - campos)
+
+    # 光线方向（带抖动）
+    jx = randomStep(uvx, uvy, _fract(iTime * 1.0 + 0.5))
+    jy = randomStep(uvx, uvy, _fract(iTime * 1.0))
+    dx = fov * (2.0 * (uvx + 0.5 * jx / width) - 1.0)
+    dy = fov * (2.0 * (uvy + 0.5 * jy / height) - 1.0) * height / width
+    dz = -np.ones(n)
+    inv = 1.0 / np.sqrt(dx * dx + dy * dy + dz * dz)
+    dx *= inv
+    dy *= inv
+    dz *= inv
+
+    px = np.zeros(n)
+    py = np.zeros(n)
+    pz = np.full(n, 20.0 * Rs)
+    tx = px - BHRPos[0]
+    ty = py - BHRPos[1]
+    tz = pz - BHRPos[2]
+    Dis = np.sqrt(tx * tx + ty * ty + tz * tz)
+    nx, ny, nz = tx / Dis, ty / Dis, tz / Dis
+
+    # 初始方向的引力修正
+    k = np.sqrt(np.maximum(1.0 - Rs / Dis, 1e-17))
+    proj = (tx * dx + ty * dy + tz * dz) * (1.0 - k)
+    dx = dx - nx * proj
+    dy = dy - ny * proj
+    dz = dz - nz * proj
+    inv = 1.0 / np.sqrt(dx * dx + dy * dy + dz * dz)
+    dx *= inv
+    dy *= inv
+    dz *= inv
+
+    # 吸积盘参数
+    disk_dir = np.asarray(params["diskDir"], dtype=np.float64)
+    disk_rot = diskBasis(disk_dir)
+    RIn = params["diskInner"] * Rs
+    ROut = params["diskOuter"] * Rs
+    background = backgroundSampler(params, width, height, cam_rot)
+    emission = diskEmission(params, disk_rot, Rs, RIn, np.linalg.norm(BHRPos))
+    density = diskDensity(params, disk_rot, Rs, RIn)
+    if params["deflectionLut"]:
+        color = lutRays(np.stack([tx, ty, tz], axis=1), np.stack([dx, dy, dz], axis=1),
+                        disk_rot, Rs, RIn, ROut, background)
+        if params["stepCount"]:
+            color[:, :3] = 0.0
+        return (color, np.zeros(n, dtype=np.int64)) if return_steps else color
+
+    # 光线离黑洞最近距离超过该半径时不会碰到吸积盘，偏折也已进入弱场
+    cull_radius = max(ROut + CULL_MARGIN * Rs, CULL_MIN_RADIUS * Rs) if culling else np.inf
+    if params["spin"]:
+        color, steps = kerrRays(np.stack([tx, ty, tz], axis=1), np.stack([dx, dy, dz], axis=1),
+                                disk_rot, Rs, RIn, ROut, background, emission, params["spin"],
+                                params["rayTolerance"], cull_radius, density)
+    elif params["integrator"]:
+        color, steps = adaptiveRays(np.stack([tx, ty, tz], axis=1), np.stack([dx, dy, dz], axis=1),
+                                    disk_rot, Rs, RIn, ROut, background, emission,
+                                    params["rayTolerance"], cull_radius, density)
+    if params["spin"] or params["integrator"]:
+        if params["stepCount"]:
+            color[:, :3] = steps[:, None]
+        return (color, steps) if return_steps else color
+
+    first_dl = randomStep(uvx, uvy, _fract(iTime * 1.0))
+    disk_normal = disk_rot[2]
+
+    result = np.zeros((n, 4))
+    steps = np.zeros(n, dtype=np.int64)
+    idx = np.arange(n)
+    acc = np.zeros((n, 4))   # 吸积盘累积颜色 fragColor
+    done = np.zeros(n, dtype=bool)
+    lastR = Dis.copy()
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for count in range(1, MAX_STEPS + 1):
+            if culling:
+                # 靠近中的光线最近距离为碰撞参数，远离中的光线为当前距离
+                x = nx * dx + ny * dy + nz * dz
+                closest = np.where(x < 0.0, Dis * np.sqrt(np.maximum(1.0 - x * x, 0.0)), Dis)
+                culled = ~done & (closest > cull_radius)
+                if culled.any():
+                    ex, ey, ez = weakFieldDirection(nx[culled], ny[culled], nz[culled],
+                                                    dx[culled], dy[culled], dz[culled],
+                                                    Dis[culled], Rs)
+                    color = acc[culled]
+                    bg = background(ex, ey, ez)
+                    result[idx[culled]] = color + bg * (1.0 - color[:, 3:4])
+                    steps[idx[culled]] = count - 1
+                    done |= culled
+                    if done.all():
+                        break
+
+            lastR = Dis
+            cx = ny * dz - nz * dy
+            cy = nz * dx - nx * dz
+            cz = nx * dy - ny * dx
+            costheta = np.sqrt(cx * cx + cy * cy + cz * cz)
+            dphirate = -costheta * costheta * costheta * (1.5 * Rs / Dis)
+
+            dl = first_dl if count == 1 else 1.0
+            dl = dl * (0.15 + 0.25 * np.clip(0.5 * (0.5 * Dis / max(10.0 * Rs, ROut) - 1.0), 0.0, 1.0))
+
+            # 在吸积盘附近缩短步长（与着色器相同的分段连续函数）
+            h = np.maximum(np.abs(disk_dir[0] * tx + disk_dir[1] * ty + disk_dir[2] * tz), Rs)
+            scale = np.where(
+                Dis >= 2.0 * ROut, Dis,
+                np.where(Dis >= ROut, (h * (2.0 * ROut - Dis) + Dis * (Dis - ROut)) / ROut,
+                np.where(Dis >= RIn, h,
+                np.where(Dis > 2.0 * Rs, (h * (Dis - 2.0 * Rs) + Dis * (RIn - Dis)) / (RIn - 2.0 * Rs),
+                         Dis))))
+            dl = dl * scale
+
+            px = px + dx * dl
+            py = py + dy * dl
+            pz = pz + dz * dl
+            dthe = dl / Dis * dphirate
+            tan_dthe = (dthe + dthe * dthe * dthe / 3.0) / costheta
+            # cross(cross(RayDir, NPosToBH), RayDir)
+            ax, ay, az = -cx, -cy, -cz
+            ex = ay * dz - az * dy
+            ey = az * dx - ax * dz
+            ez = ax * dy - ay * dx
+            dx = dx + tan_dthe * ex
+            dy = dy + tan_dthe * ey
+            dz = dz + tan_dthe * ez
+            inv = 1.0 / np.sqrt(dx * dx + dy * dy + dz * dz)
+            dx *= inv
+            dy *= inv
+            dz *= inv
+            steplength = np.abs(dl)
+
+            tx = px - BHRPos[0]
+            ty = py - BHRPos[1]
+            tz = pz - BHRPos[2]
+            Dis = np.sqrt(tx * tx + ty * ty + tz * tz)
+            nx, ny, nz = tx / Dis, ty / Dis, tz / Dis
+
+            # 吸积盘颜色，只有位于吸积盘薄层内的光线才需要计算
+            if culling:
+                height_on_disk = tx * disk_normal[0] + ty * disk_normal[1] + tz * disk_normal[2]
+                near = ~done & (np.abs(height_on_disk) < 0.5 * Rs) & (Dis > RIn)
+                if near.any():
+                    acc[near] = diskColor(acc[near], steplength[near], tx[near], ty[near], tz[near],
+                                          dx[near], dy[near], dz[near], disk_rot, Rs, RIn, ROut, emission,
+                                          density)
+            else:
+                acc = diskColor(acc, steplength, tx, ty, tz, dx, dy, dz, disk_rot, Rs, RIn, ROut,
+                                emission, density)
+
+            escaped = ~done & (Dis > ESCAPE_RADIUS * Rs) & (Dis > lastR) & (count > 50)
+            if escaped.any():
+                color = acc[escaped]
+                bg = background(dx[escaped], dy[escaped], dz[escaped])
+                result[idx[escaped]] = color + bg * (1.0 - color[:, 3:4])
+                steps[idx[escaped]] = count
+                done |= escaped
+            singular = ~done & (Dis < 0.1 * Rs)
+            if singular.any():
+                result[idx[singular]] = acc[singular]
+                steps[idx[singular]] = count
+                done |= singular
+
+            if done.all():
+                break
+            if done.mean() > COMPACT_FRACTION:
+                keep = ~done
+                (idx, px, py, pz, dx, dy, dz, tx, ty, tz, Dis, nx, ny, nz,
+                 acc, first_dl) = (a[keep] for a in (
+                    idx, px, py, pz, dx, dy, dz, tx, ty, tz, Dis, nx, ny, nz,
+                    acc, first_dl))
+                uvx, uvy = uvx[keep], uvy[keep]
+                done = np.zeros(idx.size, dtype=bool)
+        else:
+            # 超过最大步数仍未结束的光线只保留吸积盘颜色
+            result[idx[~done]] = acc[~done]
+            steps[idx[~done]] = MAX_STEPS
+
+    result[:, 3] = 1.0
+    if params["stepCount"]:
+        result[:, :3] = steps[:, None]  # 与 STEP_COUNT 变体相同的调试输出
+    if return_steps:
+        return result.astype(np.float32), steps
+    return result.astype(np.float32)
+
+
+def lutRays(P, D, disk_rot, Rs, RIn, ROut, background):
+    """查找表模式：不逐步推进，按碰撞参数查表得到吸积盘穿越点和最终方向（与 DEFLECTION_LUT 着色器一致）
+
+    P 为相对黑洞的光线起点 (n, 3)，D 为修正后的初始方向 (n, 3)。
+    """
+    state = lut.orbitState(P, D, Rs)
+    e1, e2 = state["e1"], state["e2"]
+    phi_end = state["phi_end"]
+    Z = disk_rot[2]
+    a = e1 @ Z
+    b = e2 @ Z
+
+    # 轨道平面内 a cos(phi) + b sin(phi) = 0 处穿过吸积盘平面，按 phi 从小到大即由近及远
+    first = np.mod(np.arctan2(b, a) + 0.5 * np.pi, np.pi)
+    acc = np.zeros((P.shape[0], 4))
+    h = 1e-3
+    for k in range(MAX_DISK_CROSSINGS):
+        phi = first + k * np.pi
+        valid = phi < phi_end
+        if not valid.any():
+            break
+        u = lut.orbitU(state, phi)
+        du = (lut.orbitU(state, phi + h) - lut.orbitU(state, np.maximum(phi - h, 0.0))) \
+            / (phi + h - np.maximum(phi - h, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = 1.0 / u               # 单位 Rs
+            dr = -du / (u * u)
+            # 穿越处径向在盘面内，光线与盘面夹角只由切向分量决定
+            sin_beta = r * np.abs(b * np.cos(phi) - a * np.sin(phi)) / np.sqrt(dr * dr + r * r)
+        length = np.minimum(1.0 / np.maximum(sin_beta, 1e-3), 2.0 * ROut / Rs)  # 穿过厚度为 Rs 的盘层
+        inside = valid & (r * Rs > RIn) & (r * Rs < ROut)
+        color = np.where(inside, 1.0 - np.exp(-0.05 * length), 0.0)
+        acc = acc + color[:, None] * (1.0 - acc[:, 3:4])
+
+    result = acc.copy()
+    escaped = ~state["captured"]
+    if escaped.any():
+        final = lut.finalDirection(state)[escaped]
+        bg = background(final[:, 0], final[:, 1], final[:, 2])
+        result[escaped] = acc[escaped] + bg * (1.0 - acc[escaped, 3:4])
+    result[:, 3] = 1.0
+    return result.astype(np.float32)
+
+
+def adaptiveRays(P, D, disk_rot, Rs, RIn, ROut, background, emission, tolerance, cull_radius, density=None):
+    """自适应积分模式：Dormand–Prince 5(4) 求解光子轨道（与 ADAPTIVE_RK 着色器一致）
+
+    P 为相对黑洞的光线起点 (n, 3)，D 为修正后的初始方向 (n, 3)，积分在以 Rs 为单位的坐标中进行。
+    吸积盘不再按薄层逐步采样，而是在每个接受的步内求与盘面的交点，按穿过厚度为 Rs 的盘层的
+    路径长度一次算出颜色。返回 (颜色 (n, 4), 每条光线尝试的步数（含被拒绝的步）)。
+    """
+    n = P.shape[0]
+    normal = disk_rot[2]
+    x = P / Rs
+    v = D.copy()
+    h2 = np.einsum("ij,ij->i", np.cross(x, v), np.cross(x, v))
+    a = integrators.photonAcceleration(x, h2)
+    r = np.linalg.norm(x, axis=1)
+    dl = integrators.INITIAL_STEP * r
+    cull = cull_radius / Rs
+
+    result = np.zeros((n, 4))
+    steps = np.zeros(n, dtype=np.int64)
+    acc = np.zeros((n, 4))
+    idx = np.arange(n)
+    done = np.zeros(n, dtype=bool)
+    count = np.zeros(n, dtype=np.int64)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(MAX_STEPS):
+            speed = np.linalg.norm(v, axis=1)
+            radial = np.einsum("ij,ij->i", x, v) / (r * speed)
+            # 与逐步推进相同的剔除条件；逃逸的光线按剩余的弱场偏折修正方向
+            closest = np.where(radial < 0.0, r * np.sqrt(np.maximum(1.0 - radial * radial, 0.0)), r)
+            escaped = ~done & ((closest > cull) | ((r > ESCAPE_RADIUS) & (radial > 0.0)))
+            if escaped.any():
+                n_hat = x[escaped] / r[escaped, None]
+                d_hat = v[escaped] / speed[escaped, None]
+                ex, ey, ez = weakFieldDirection(n_hat[:, 0], n_hat[:, 1], n_hat[:, 2],
+                                                d_hat[:, 0], d_hat[:, 1], d_hat[:, 2], r[escaped] * Rs, Rs)
+                color = acc[escaped]
+                result[idx[escaped]] = color + background(ex, ey, ez) * (1.0 - color[:, 3:4])
+                done |= escaped
+            captured = ~done & (r < 1.0)  # 进入视界
+            result[idx[captured]] = acc[captured]
+            done |= captured
+            steps[idx[done]] = count[done]
+
+            if done.all():
+                break
+            if done.mean() > COMPACT_FRACTION:
+                keep = ~done
+                idx, x, v, a, h2, r, dl, acc, count = (
+                    arr[keep] for arr in (idx, x, v, a, h2, r, dl, acc, count))
+                done = np.zeros(idx.size, dtype=bool)
+
+            x_new, v_new, a_new, x_err, v_err = integrators.dopriStep(x, v, a, h2, dl)
+            error = integrators.errorNorm(x_new, v_new, x_err, v_err, tolerance)
+            accept = ~done & (error <= 1.0)
+            count += ~done
+
+            # 接受的步内穿过吸积盘平面时计算吸积盘颜色
+            z0 = x @ normal
+            z1 = x_new @ normal
+            crossing = accept & (z0 * z1 <= 0.0) & (z0 != z1)
+            if crossing.any():
+                position, direction = integrators.planeCrossing(
+                    x[crossing], v[crossing], x_new[crossing], v_new[crossing], dl[crossing], normal)
+                sin_beta = np.abs(direction @ normal)
+                length = np.minimum(1.0 / np.maximum(sin_beta, 1e-3), 2.0 * ROut / Rs)
+                # 按 diskColor 的线性不透明度 0.05*steplength/Rs 换算成等效步长，整层的不透明度为 1-exp(-0.05 length)
+                steplength = 20.0 * Rs * (1.0 - np.exp(-0.05 * length))
+                t = position * Rs
+                acc[crossing] = diskColor(acc[crossing], steplength, t[:, 0], t[:, 1], t[:, 2],
+                                          direction[:, 0], direction[:, 1], direction[:, 2],
+                                          disk_rot, Rs, RIn, ROut, emission, density)
+
+            x = np.where(accept[:, None], x_new, x)
+            v = np.where(accept[:, None], v_new, v)
+            a = np.where(accept[:, None], a_new, a)
+            r = np.linalg.norm(x, axis=1)
+            dl = np.minimum(dl * integrators.stepFactor(error), integrators.MAX_STEP_FRACTION * r)
+        else:
+            # 超过最大步数仍未结束的光线只保留吸积盘颜色
+            result[idx[~done]] = acc[~done]
+            steps[idx[~done]] = count[~done]
+
+    result[:, 3] = 1.0
+    return result.astype(np.float32), steps
+
+
+def kerrRays(P, D, disk_rot, Rs, RIn, ROut, background, emission, spin, tolerance, cull_radius, density=None):
+    """克尔模式：在 Boyer–Lindquist 坐标中用 Dormand–Prince 5(4) 积分（与 KERR 着色器一致）
+
+    P、D 与 adaptiveRays 相同，先转到吸积盘系（自旋轴为盘面法向），以 M = Rs/2 为单位。
+    每条光线的守恒量在 KerrRays 中只算一次；θ 穿过赤道面时按盘层路径长度一次着色。
+    返回 (颜色 (n, 4), 每条光线尝试的步数)。
+    """
+    n = P.shape[0]
+    M = 0.5 * Rs
+    a = float(np.clip(spin, -kerr.MAX_SPIN, kerr.MAX_SPIN))
+    rays = kerr.KerrRays(P @ disk_rot.T / M, D @ disk_rot.T, a)
+    y = rays.y
+    f = rays.rhs(y)
+    capture = kerr.horizonRadius(a) * kerr.HORIZON_MARGIN
+    cull = cull_radius / M
+    escape = 2.0 * ESCAPE_RADIUS
+
+    position, velocity = rays.cartesian(y, f)
+    dl = integrators.INITIAL_STEP * np.linalg.norm(position, axis=1) / np.linalg.norm(velocity, axis=1)
+
+    result = np.zeros((n, 4))
+    steps = np.zeros(n, dtype=np.int64)
+    acc = np.zeros((n, 4))
+    idx = np.arange(n)
+    done = np.zeros(n, dtype=bool)
+    count = np.zeros(n, dtype=np.int64)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(MAX_STEPS):
+            dist = np.linalg.norm(position, axis=1)
+            speed = np.linalg.norm(velocity, axis=1)
+            radial = np.einsum("ij,ij->i", position, velocity) / (dist * speed)
+            # 与史瓦西模式相同的剔除与逃逸条件，之后的偏折按史瓦西弱场近似（远处拖曳可忽略）
+            closest = np.where(radial < 0.0, dist * np.sqrt(np.maximum(1.0 - radial * radial, 0.0)), dist)
+            escaped = ~done & ((closest > cull) | ((dist > escape) & (radial > 0.0)))
+            if escaped.any():
+                n_hat = position[escaped] / dist[escaped, None]
+                d_hat = velocity[escaped] / speed[escaped, None]
+                e = np.stack(weakFieldDirection(n_hat[:, 0], n_hat[:, 1], n_hat[:, 2],
+                                                d_hat[:, 0], d_hat[:, 1], d_hat[:, 2],
+                                                dist[escaped] * M, Rs), axis=1) @ disk_rot
+                color = acc[escaped]
+                result[idx[escaped]] = color + background(e[:, 0], e[:, 1], e[:, 2]) * (1.0 - color[:, 3:4])
+                done |= escaped
+            captured = ~done & (y[:, 0] < capture)
+            result[idx[captured]] = acc[captured]
+            done |= captured
+            steps[idx[done]] = count[done]
+
+            if done.all():
+                break
+            if done.mean() > COMPACT_FRACTION:
+                keep = ~done
+                idx, y, f, dl, acc, count, position, velocity = (
+                    arr[keep] for arr in (idx, y, f, dl, acc, count, position, velocity))
+                rays.select(keep)
+                done = np.zeros(idx.size, dtype=bool)
+
+            y_new, f_new, y_err = integrators.dopriSystemStep(rays.rhs, y, f, dl)
+            error = rays.errorNorm(y_new, y_err, tolerance)
+            accept = ~done & (error <= 1.0)
+            count += ~done
+
+            # 接受的步内 cosθ 变号即穿过赤道面（吸积盘平面）
+            s0 = np.cos(y[:, 1])
+            s1 = np.cos(y_new[:, 1])
+            crossing = accept & (s0 * s1 <= 0.0) & (s0 != s1)
+            if crossing.any():
+                c = crossing
+                t = integrators.crossingTime(s0[c], -np.sin(y[c, 1]) * f[c, 1],
+                                             s1[c], -np.sin(y_new[c, 1]) * f_new[c, 1], dl[c])
+                # (r, θ, φ) 的 Hermite 切向与其导数只差因子 dl，方向归一化后相同
+                state, tangent = integrators.hermite(y[c], f[c], y_new[c], f_new[c], dl[c], t)
+                disk_pos, disk_vel = rays.cartesian(state, tangent)
+                direction = disk_vel / np.linalg.norm(disk_vel, axis=1, keepdims=True)
+                length = np.minimum(1.0 / np.maximum(np.abs(direction[:, 2]), 1e-3), 2.0 * ROut / Rs)
+                steplength = 20.0 * Rs * (1.0 - np.exp(-0.05 * length))
+                t_cam = disk_pos @ disk_rot * M
+                d_cam = direction @ disk_rot
+                acc[c] = diskColor(acc[c], steplength, t_cam[:, 0], t_cam[:, 1], t_cam[:, 2],
+                                   d_cam[:, 0], d_cam[:, 1], d_cam[:, 2], disk_rot, Rs, RIn, ROut, emission,
+                                   density)
+
+            y = np.where(accept[:, None], y_new, y)
+            f = np.where(accept[:, None], f_new, f)
+            rays.project(y, f)
+            position, velocity = rays.cartesian(y, f)
+            dl = np.minimum(dl * integrators.stepFactor(error),
+                            integrators.MAX_STEP_FRACTION * np.linalg.norm(position, axis=1)
+                            / np.linalg.norm(velocity, axis=1))
+        else:
+            result[idx[~done]] = acc[~done]
+            steps[idx[~done]] = count[~done]
+
+    result[:, 3] = 1.0
+    return result.astype(np.float32), steps
+
+
+def diskColor(fragColor, steplength, tx, ty, tz, dx, dy, dz, disk_rot, Rs, RIn, ROut, emission=None,
+              density=None):
+    """吸积盘颜色，与 diskColor 相同；emission 为 diskEmission 返回的黑体着色函数，density 为 diskDensity 返回的湍流"""
+    Z = disk_rot[2]
+    PosZ = tx * Z[0] + ty * Z[1] + tz * Z[2]
+    PosR = np.sqrt(np.maximum(tx * tx + ty * ty + tz * tz - PosZ * PosZ, 0.0))
+    inside = (np.abs(PosZ) < 0.5 * Rs) & (PosR < ROut) & (PosR > RIn)
+    if not inside.any():
+        return fragColor
+    color = np.zeros(fragColor.shape)
+    color[inside] = (0.05 * steplength[inside] / Rs)[:, None]
+    if density is not None:
+        color[inside] *= density(tx[inside], ty[inside], tz[inside])[:, None]
+    if emission is not None:
+        color[inside, :3] *= emission(tx[inside], ty[inside], tz[inside],
+                                      dx[inside], dy[inside], dz[inside])
+    return fragColor + color * (1.0 - fragColor[:, 3:4])
+
+
+def diskEmission(params, disk_rot, Rs, RIn, cam_dis):
+    """返回 (tx, ty, tz, dx, dy, dz) -> (n, 3) 的黑体颜色函数（与 diskEmission 相同），灰色着色时返回 None
+
+    t 为相对黑洞的位置，d 为光线方向（相机系）。轨道速度与时间膨胀按克尔赤道面上相对
+    零角动量观者计算（kerr.orbitSpeed、kerr.equatorialLapse），spin = 0 时即开普勒速度与 sqrt(1 - Rs/r)。
+    """
+    shading = int(params["diskShading"])
+    if shading == 0:
+        return None
+    peak = float(params["diskTemperature"])
+    shift_max = float(params["shiftMax"])
+    if shading == 2:
+        lookup = blackbody.blackbodyRgba
+    else:
+        table = procedural.generate("blackbody")
+        lookup = lambda temperature: blackbody.sampleTable(table, temperature)
+    peak_log_y = lookup(np.array([peak]))[0, 3]
+    M = 0.5 * Rs
+    a = float(np.clip(params["spin"], -kerr.MAX_SPIN, kerr.MAX_SPIN))
+
+    def emit(tx, ty, tz, dx, dy, dz):
+        pos = np.stack([tx, ty, tz], axis=1) @ disk_rot.T
+        ray = np.stack([dx, dy, dz], axis=1) @ disk_rot.T
+        # 赤道面上的 Boyer–Lindquist 半径（单位 M），a = 0 时即 2r/Rs
+        r = np.sqrt(np.maximum(np.einsum("ij,ij->i", pos, pos) / (M * M) - a * a, 1e-6))
+        beta = np.clip(kerr.orbitSpeed(r, a), 0.0, 0.99)
+        # 绕 +z 轴逆时针的圆轨道方向
+        orbit = np.stack([-pos[:, 1], pos[:, 0]], axis=1)
+        orbit /= np.linalg.norm(orbit, axis=1, keepdims=True)
+        doppler = np.sqrt(1.0 - beta * beta) / (1.0 + beta * np.sum(orbit * ray[:, :2], axis=1))
+        gravity = kerr.equatorialLapse(r, a) / np.sqrt(max(1.0 - Rs / cam_dis, 1e-6))
+        g = np.minimum(doppler * gravity, shift_max)
+        temperature = g * blackbody.diskTemperature(np.hypot(pos[:, 0], pos[:, 1]), RIn, peak)
+        rgba = lookup(temperature)
+        return rgba[:, :3] * np.exp2(rgba[:, 3:4] - peak_log_y)
+
+    return emit
+
+
+def diskDensity(params, disk_rot, Rs, RIn):
+    """返回 (tx, ty, tz) -> (n,) 的湍流密度因子（与 diskDensity 相同），湍流关闭时返回 None"""
+    strength = float(params["diskTurbulence"])
+    if strength <= 0.0:
+        return None
+    volume = procedural.generate("diskNoise")
+    r_in = max(RIn / Rs, 2.0)
+    phase = 2.0 * np.pi / DISK_INNER_PERIOD * params["diskTime"]
+
+    def density(tx, ty, tz):
+        pos = np.stack([tx, ty, tz], axis=1) @ disk_rot.T
+        r = np.hypot(pos[:, 0], pos[:, 1])
+        # 各半径的角速度与内边缘之比（omega 的常数因子约去），半径取不小于 2Rs
+        rr = np.maximum(r / Rs, 2.0)
+        spin_rate = np.sqrt((2.0 * r_in - 3.0) * r_in * r_in / ((2.0 * rr - 3.0) * rr * rr))
+        angle = np.arctan2(pos[:, 1], pos[:, 0]) - phase * spin_rate
+        coord = np.stack([angle / (2.0 * np.pi) * NOISE_AZIMUTH_TILES, r / Rs * NOISE_RADIAL_SCALE,
+                          pos[:, 2] / Rs * NOISE_VERTICAL_SCALE], axis=1)
+        coarse = sampleVolume(volume, coord)[:, 0]
+        detail = sampleVolume(volume, coord * NOISE_DETAIL)[:, 1]
+        return 1.0 + strength * (2.0 * (0.65 * coarse + 0.35 * detail) - 1.0)
+
+    return density
+
+
+def sampleVolume(volume, coord):
+    """三维纹理的三线性采样（GL_REPEAT，纹素中心在 (i + 0.5) / size），volume 为 (depth, height, width, c)，
+    coord 为 (n, 3) 的 (s, t, r)，返回 (n, c)"""
+    shape = np.array(volume.shape[2::-1])  # (width, height, depth)
+    x = coord * shape - 0.5
+    i0 = np.floor(x).astype(np.int64)
+    f = x - i0
+    i0 %= shape
+    i1 = (i0 + 1) % shape
+    result = 0.0
+    for corner in range(8):
+        pick = [(corner >> axis) & 1 for axis in range(3)]
+        index = [np.where(p, i1[:, axis], i0[:, axis]) for axis, p in enumerate(pick)]
+        weight = np.prod([f[:, axis] if p else 1.0 - f[:, axis] for axis, p in enumerate(pick)], axis=0)
+        result = result + weight[:, None] * volume[index[2], index[1], index[0]]
+    return result
+
+
+def backgroundSampler(params, width, height, cam_rot):
+    """按背景类型返回 f(dx, dy, dz) -> (n, 4) 的背景颜色函数，方向为相机系"""
+    background_type = params["backgroundType"]
+    sky = None
+    if background_type == 2:
+        sky = procedural.generate("starfield", seed=params["starSeed"])
+    elif background_type == 3 and params["backgroundPath"]:
+        sky = starfield.loadPanorama(params["backgroundPath"])
+    if sky is None:
+        chess = chessTexture()
+        return lambda dx, dy, dz: backgroundColor(dx, dy, dz, width, height,
+                                                  background_type, chess)
+
+    # 与着色器相同的统一 mip 级别：屏幕像素张角 / 纹素张角
+    lod = np.log2(max(2.0 * params["fov"] / width * sky.shape[1] / (2.0 * np.pi), 1.0))
+    level = starfield.mipLevel(sky, int(round(lod))).astype(np.float64)
+
+    def sample(dx, dy, dz):
+        # 相机系方向换回世界系 (GetCameraRot 的逆)
+        world = np.stack([dx, dy, dz], axis=1) @ cam_rot
+        u, v = starfield.skyUv(world[:, 0], world[:, 1], world[:, 2])
+        return starfield.sampleEquirect(level, u, v)
+
+    return sample
+
+
+def backgroundColor(dx, dy, dz, width, height, background_type, chess):
+    """光线逃逸后的背景颜色"""
+    if background_type == 1:  # 纯黑背景
+        color = np.zeros((dx.size, 4))
+        color[:, 3] = 1.0
+        return color
+    # 棋盘背景（星空/纹理尚未就绪时也使用棋盘背景）
+    u = 0.5 - 0.5 * dx / dz
+    v = 0.5 - 0.5 * dy / dz * width / height
+    size = chess.shape[0]
+    tx = (_fract(u) * size).astype(np.int64) % size
+    ty = (_fract(v) * size).astype(np.int64) % size
+    return 0.5 * chess[ty, tx].astype(np.float64)
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+
+
+class FrameWriter:
+    """把浮点 RGBA 帧写成 PNG / NPY / EXR，8 位转换缓冲区只分配一次"""
+
+    FORMATS = ("png", "npy", "exr")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._scratch = np.empty((height, width, 4), dtype=np.float32)
+        self._rgba8 = np.empty((height, width, 4), dtype=np.uint8)
+
+    def write(self, path, rgba):
+        """按扩展名写出一帧，rgba 为 (height, width, 4) float32，第 0 行为图像顶部"""
+        ext = os.path.splitext(path)[1].lower().lstrip(".")
+        if ext == "png":
+            self.writePng(path, rgba)
+        elif ext == "npy":
+            np.save(path, rgba)
+        elif ext == "exr":
+            writeExr(path, rgba)
+        else:
+            raise ValueError(f"Unsupported image format: {path}")
+
+    def writePng(self, path, rgba):
+        """写出 8 位 PNG（数值截断到 [0, 1]）"""
+        from PyQt6.QtGui import QImage
+
+        np.clip(rgba, 0.0, 1.0, out=self._scratch)
+        np.multiply(self._scratch, 255.0, out=self._scratch)
+        np.rint(self._scratch, out=self._scratch)
+        self._rgba8[...] = self._scratch
+        image = QImage(self._rgba8.data, self.width, self.height, self.width * 4,
+                       QImage.Format.Format_RGBA8888)
+        if not image.save(path):
+            raise RuntimeError(f"Failed to write image: {path}")
+
+
+def saveImage(path, rgba):
+    """写出单张图像"""
+    height, width = rgba.shape[:2]
+    FrameWriter(width, height).write(path, rgba)
+
+
+def writeExr(path, rgba):
+    """写出 32 位浮点 EXR，需要可选依赖 OpenEXR 或 imageio"""
+    try:
+        import OpenEXR
+    except ImportError:
+        OpenEXR = None
+
+    if OpenEXR is not None:
+        channels = {"RGBA": np.ascontiguousarray(rgba, dtype=np.float32)}
+        header = {"compression": OpenEXR.ZIP_COMPRESSION, "type": OpenEXR.scanlineimage}
+        with OpenEXR.File(header, channels) as exr:
+            exr.write(path)
+        return
+
+    try:
+        import imageio.v3 as iio
+    except ImportError:
+        raise RuntimeError("Writing EXR requires the 'OpenEXR' or 'imageio' package; "
+                           "use .npy for HDR output instead")
+    iio.imwrite(path, np.asarray(rgba, dtype=np.float32))
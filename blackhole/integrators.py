@@ -0,0 +1,117 @@
+"""光线测地线的高阶自适应积分
+
+史瓦西时空中的光子轨道可以写成三维欧氏空间中的二阶方程（以 Rs 为长度单位）::
+
+    x' = v,   v' = -1.5 h² x / r⁵,   h = |x × v| 守恒
+
+它与 Binet 方程 u'' + u = 1.5 u² 给出相同的轨道形状，也就是 circle.frag 逐步推进中
+dphirate = -1.5 Rs sin³/r 的弯曲率。这里用 Dormand–Prince 5(4) 嵌入式龙格-库塔法求解：
+每步由 5 阶与 4 阶解之差估计局部误差，误差超过容差时拒绝并缩短步长，否则按误差放大下一步。
+shaders/circle.frag 的 ADAPTIVE_RK 变体是同一算法的 GLSL 版本，cpu.adaptiveRays 为其参考实现。
+"""
+import numpy as np
+
+# Dormand–Prince 5(4) 系数；第 7 级在新点上求值，可作为下一步的第 1 级 (FSAL)
+DOPRI_C = np.array([0.0, 1.0 / 5.0, 3.0 / 10.0, 4.0 / 5.0, 8.0 / 9.0, 1.0, 1.0])
+DOPRI_A = (
+    (),
+    (1.0 / 5.0,),
+    (3.0 / 40.0, 9.0 / 40.0),
+    (44.0 / 45.0, -56.0 / 15.0, 32.0 / 9.0),
+    (19372.0 / 6561.0, -25360.0 / 2187.0, 64448.0 / 6561.0, -212.0 / 729.0),
+    (9017.0 / 3168.0, -355.0 / 33.0, 46732.0 / 5247.0, 49.0 / 176.0, -5103.0 / 18656.0),
+    (35.0 / 384.0, 0.0, 500.0 / 1113.0, 125.0 / 192.0, -2187.0 / 6784.0, 11.0 / 84.0),
+)
+DOPRI_B = np.array(DOPRI_A[6] + (0.0,))  # 5 阶解
+DOPRI_E = DOPRI_B - np.array([5179.0 / 57600.0, 0.0, 7571.0 / 16695.0, 393.0 / 640.0,
+                              -92097.0 / 339200.0, 187.0 / 2100.0, 1.0 / 40.0])  # 5 阶 - 4 阶
+
+SAFETY = 0.9            # 步长调整的安全系数
+MIN_FACTOR = 0.2        # 单步内步长最多缩小到 1/5
+MAX_FACTOR = 5.0        # 单步内步长最多放大 5 倍
+MAX_STEP_FRACTION = 0.5 # 步长不超过当前距离的一半，保证一步内最多穿过盘面一次
+INITIAL_STEP = 0.1      # 初始步长（当前距离的比例）
+EVALS_PER_STEP = 6      # FSAL 后每次尝试的加速度求值次数
+
+
+def photonAcceleration(x, h2):
+    """v' = -1.5 h² x / r⁵，x 为 (n, 3)（单位 Rs），h2 为 (n,)"""
+    r2 = np.einsum("ij,ij->i", x, x)
+    return x * (-1.5 * h2 / (r2 * r2 * np.sqrt(r2)))[:, None]
+
+
+def dopriSystemStep(rhs, y, k1, dl):
+    """一阶方程组 y' = rhs(y) 的一次 Dormand–Prince 尝试，y 为 (n, m)，k1 为起点处的导数
+
+    返回 (y5, k7, y_err)：5 阶解、新点处的导数（下一步的 k1）和 5 阶与 4 阶解之差。
+    """
+    dl = dl[:, None]
+    k = [k1]
+    for row in DOPRI_A[1:]:
+        yi = y + dl * sum(coef * kj for coef, kj in zip(row, k) if coef)
+        k.append(rhs(yi))
+    # 第 7 级在 5 阶解上求值
+    return yi, k[-1], dl * sum(coef * kj for coef, kj in zip(DOPRI_E, k) if coef)
+
+
+def dopriStep(x, v, a, h2, dl):
+    """从 (x, v) 前进 dl 的一次尝试，a 为起点处的加速度
+
+    返回 (x5, v5, a5, x_err, v_err)：5 阶解、新点处的加速度（下一步的第 1 级），以及误差估计。
+    """
+    def rhs(y):
+        return np.concatenate([y[:, 3:], photonAcceleration(y[:, :3], h2)], axis=1)
+
+    y5, k7, y_err = dopriSystemStep(rhs, np.concatenate([x, v], axis=1),
+                                    np.concatenate([v, a], axis=1), dl)
+    return y5[:, :3], y5[:, 3:], k7[:, 3:], y_err[:, :3], y_err[:, 3:]
+
+
+def errorNorm(x, v, x_err, v_err, tolerance):
+    """相对误差范数：位置误差相对当前距离、速度误差相对速度大小，<= 1 时接受该步"""
+    r = np.sqrt(np.einsum("ij,ij->i", x, x))
+    speed = np.sqrt(np.einsum("ij,ij->i", v, v))
+    return np.maximum(np.sqrt(np.einsum("ij,ij->i", x_err, x_err)) / r,
+                      np.sqrt(np.einsum("ij,ij->i", v_err, v_err)) / speed) / tolerance
+
+
+def stepFactor(error):
+    """按误差范数调整步长的倍数（5 阶方法取 1/5 次方）"""
+    with np.errstate(divide="ignore"):
+        factor = SAFETY * error ** -0.2
+    return np.clip(factor, MIN_FACTOR, MAX_FACTOR)
+
+
+def hermite(x0, v0, x1, v1, dl, t):
+    """一步内的三次 Hermite 插值，返回 (位置, 切向)，t 为 (n,) 的步内比例"""
+    t = t[:, None]
+    dl = dl[:, None]
+    t2, t3 = t * t, t * t * t
+    position = ((2.0 * t3 - 3.0 * t2 + 1.0) * x0 + (t3 - 2.0 * t2 + t) * dl * v0
+                + (3.0 * t2 - 2.0 * t3) * x1 + (t3 - t2) * dl * v1)
+    tangent = ((6.0 * t2 - 6.0 * t) * x0 + (3.0 * t2 - 4.0 * t + 1.0) * dl * v0
+               + (6.0 * t - 6.0 * t2) * x1 + (3.0 * t2 - 2.0 * t) * dl * v1)
+    return position, tangent
+
+
+def crossingTime(s0, ds0, s1, ds1, dl, iterations=2):
+    """一步内标量 s 的 Hermite 插值过零的位置（步内比例），ds 为 s 对积分变量的导数
+
+    调用方保证 s0 与 s1 异号：先按弦线性插值，再做几次牛顿迭代。
+    """
+    t = s0 / (s0 - s1)
+    for _ in range(iterations):
+        t2, t3 = t * t, t * t * t
+        value = ((2.0 * t3 - 3.0 * t2 + 1.0) * s0 + (t3 - 2.0 * t2 + t) * dl * ds0
+                 + (3.0 * t2 - 2.0 * t3) * s1 + (t3 - t2) * dl * ds1)
+        slope = ((6.0 * t2 - 6.0 * t) * s0 + (3.0 * t2 - 4.0 * t + 1.0) * dl * ds0
+                 + (6.0 * t - 6.0 * t2) * s1 + (3.0 * t2 - 2.0 * t) * dl * ds1)
+        t = np.clip(t - value / np.where(slope == 0.0, 1.0, slope), 0.0, 1.0)
+    return t
+
+
+def planeCrossing(x0, v0, x1, v1, dl, normal):
+    """步内穿过平面 dot(x, normal)=0 的位置与单位方向（调用方保证两端在平面两侧）"""
+    t = crossingTime(x0 @ normal, v0 @ normal, x1 @ normal, v1 @ normal, dl)
+    position, tangent = hermite(x0, v0, x1, v1, dl, t)
+    return position, tangent / np.linalg.norm(tangent, axis=1, keepdims=True)
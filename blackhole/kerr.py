@@ -0,0 +1,162 @@
+"""克尔（旋转）黑洞的光线积分
+
+Boyer–Lindquist 坐标，以 M = Rs/2 为长度单位，光子能量取 E = 1，自旋轴为吸积盘法向 +z，
+spin 即无量纲自旋 a/M（负值表示吸积盘逆向旋转）。每条光线的守恒量（绕自旋轴的角动量 L、
+Carter 常数 Q）只在起点算一次，之后在 Mino 时间 λ 中积分二阶方程::
+
+    r'' = R'(r)/2 = 2r (r² + a² - aL) - (r - 1) K,        K = (L - a)² + Q
+    θ'' = Θ'(θ)/2 = L² cosθ / sin³θ - a² cosθ sinθ
+    φ'  = a (r² + a² - aL)/Δ - a + L/sin²θ,               Δ = r² - 2r + a²
+
+右端只有多项式和三角函数，没有一阶形式 r' = ±sqrt(R) 在转折点处的符号切换；
+a = 0 时与史瓦西的自适应积分给出相同的轨道。状态 y = (r, θ, φ, r', θ') 用 integrators 中的
+Dormand–Prince 5(4) 求解。视界、ISCO 等只依赖自旋的常数在 Python 端计算后传给着色器
+（RenderParams.kerrHorizon、diskInner），shaders/circle.frag 的 KERR 变体与 cpu.kerrRays 一致。
+"""
+import numpy as np
+
+MAX_SPIN = 0.999
+HORIZON_MARGIN = 1.01  # r 小于视界半径的该倍数时视为被捕获（φ' 在视界上发散）
+
+
+def horizonRadius(spin):
+    """外视界半径 r+ = M (1 + sqrt(1 - a²))，单位 M"""
+    a = np.clip(spin, -MAX_SPIN, MAX_SPIN)
+    return 1.0 + np.sqrt(1.0 - a * a)
+
+
+def iscoRadius(spin):
+    """顺行（spin < 0 时为逆行）最内稳定圆轨道半径（Bardeen, Press & Teukolsky 1972），单位 Rs"""
+    a = float(np.clip(spin, -MAX_SPIN, MAX_SPIN))
+    z1 = 1.0 + np.cbrt(1.0 - a * a) * (np.cbrt(1.0 + a) + np.cbrt(1.0 - a))
+    z2 = np.sqrt(3.0 * a * a + z1 * z1)
+    r = 3.0 + z2 - np.sign(a) * np.sqrt((3.0 - z1) * (3.0 + z1 + 2.0 * z2))
+    return 0.5 * float(r)
+
+
+def kerrParams(spin, isco=True):
+    """给定自旋的渲染参数 {"spin", "diskInner"}，isco 为真时吸积盘内边缘取 ISCO"""
+    spin = float(np.clip(spin, -MAX_SPIN, MAX_SPIN))
+    params = {"spin": spin}
+    if isco:
+        params["diskInner"] = iscoRadius(spin)
+    return params
+
+
+def boyerLindquist(x, a):
+    """吸积盘系笛卡尔坐标 (n, 3)（单位 M）-> (r, θ, φ)，远处视为平直的扁球坐标"""
+    rho2 = np.einsum("ij,ij->i", x, x)
+    z2 = x[:, 2] * x[:, 2]
+    b = rho2 - a * a
+    r = np.sqrt(0.5 * (b + np.sqrt(b * b + 4.0 * a * a * z2)))
+    theta = np.arccos(np.clip(x[:, 2] / r, -1.0, 1.0))
+    phi = np.arctan2(x[:, 1], x[:, 0])
+    return r, theta, phi
+
+
+class KerrRays:
+    """一批光线的守恒量与运动方程，所有与自旋和光线有关的常数在构造时算好"""
+
+    def __init__(self, x, d, a):
+        """x 为吸积盘系中的光线起点 (n, 3)（单位 M），d 为单位方向 (n, 3)"""
+        self.a = a
+        self.a2 = a * a
+        r, theta, phi = boyerLindquist(x, a)
+        sin_t, cos_t = np.sin(theta), np.cos(theta)
+        e_r = np.stack([sin_t * np.cos(phi), sin_t * np.sin(phi), cos_t], axis=1)
+        e_theta = np.stack([cos_t * np.cos(phi), cos_t * np.sin(phi), -sin_t], axis=1)
+
+        # 起点处切向与 d 一致：动量各分量取局部平直空间中的值乘以同一个因子 c，
+        # c 由 E = 1 时的径向方程 R(r) = r'² 确定（a = 0 时 c² = 1/(1 - 2 sin²α/r)）
+        sigma = r * r + self.a2 * cos_t * cos_t
+        L = x[:, 0] * d[:, 1] - x[:, 1] * d[:, 0]
+        p_theta = np.sqrt(sigma) * np.einsum("ij,ij->i", d, e_theta)
+        d_r = np.einsum("ij,ij->i", d, e_r)
+        A0 = r * r + self.a2
+        delta = r * r - 2.0 * r + self.a2
+        qa = self.a2 * L * L - delta * (L * L + p_theta * p_theta + (cos_t * L / sin_t) ** 2) - (sigma * d_r) ** 2
+        qb = 2.0 * a * L * (delta - A0)
+        qc = A0 * A0 - delta * self.a2 * sin_t * sin_t
+        c = (-qb - np.sqrt(np.maximum(qb * qb - 4.0 * qa * qc, 0.0))) / (2.0 * qa)
+
+        self.L = c * L
+        p_theta = c * p_theta
+        Q = p_theta * p_theta + cos_t * cos_t * (self.L * self.L / (sin_t * sin_t) - self.a2)
+        self.L2 = self.L * self.L
+        self.P0 = self.a2 - a * self.L      # r² + a² - aL 中与 r 无关的部分
+        self.Q = Q
+        self.K = (self.L - a) ** 2 + Q
+        self.theta_scale = np.sqrt(np.maximum(self.K, 0.0)) + 1.0
+        self.y = np.stack([r, theta, phi, c * sigma * d_r, p_theta], axis=1)
+
+    def select(self, keep):
+        """只保留部分光线（压缩数组时使用）"""
+        for name in ("L", "L2", "P0", "Q", "K", "theta_scale"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def rhs(self, y):
+        """dy/dλ，y 为 (n, 5) 的 (r, θ, φ, r', θ')"""
+        r, theta = y[:, 0], y[:, 1]
+        sin_t, cos_t = np.sin(theta), np.cos(theta)
+        P = r * r + self.P0
+        delta = r * r - 2.0 * r + self.a2
+        return np.stack([
+            y[:, 3],
+            y[:, 4],
+            self.a * P / delta - self.a + self.L / (sin_t * sin_t),
+            2.0 * r * P - (r - 1.0) * self.K,
+            self.L2 * cos_t / (sin_t * sin_t * sin_t) - self.a2 * cos_t * sin_t,
+        ], axis=1)
+
+    def project(self, y, f):
+        """把 r'、θ' 的大小拉回首次积分 r'² = R(r)、θ'² = Θ(θ) 上（R、Θ > 0 处，符号不变），原地修改
+
+        二阶方程本身不约束这两个首次积分，远处很小的相对误差到了近心点附近（R -> 0）会变成
+        转折点的明显偏移；投影只用守恒量和当前位置，不需要额外求值。
+        """
+        r, theta = y[:, 0], y[:, 1]
+        P = r * r + self.P0
+        R = P * P - (r * r - 2.0 * r + self.a2) * self.K
+        sin_t, cos_t = np.sin(theta), np.cos(theta)
+        Theta = self.Q - cos_t * cos_t * (self.L2 / (sin_t * sin_t) - self.a2)
+        y[:, 3] = np.where(R > 0.0, np.copysign(np.sqrt(np.maximum(R, 0.0)), y[:, 3]), y[:, 3])
+        y[:, 4] = np.where(Theta > 0.0, np.copysign(np.sqrt(np.maximum(Theta, 0.0)), y[:, 4]), y[:, 4])
+        f[:, 0] = y[:, 3]
+        f[:, 1] = y[:, 4]
+
+    def errorNorm(self, y, y_err, tolerance):
+        """r 按相对误差，角度按绝对误差（弧度），速度分量按各自的量级"""
+        r = y[:, 0]
+        return np.max(np.abs(y_err) / np.stack([
+            r, np.ones_like(r), np.ones_like(r), r * r + np.sqrt(np.maximum(self.K, 0.0)) * r,
+            self.theta_scale], axis=1), axis=1) / tolerance
+
+    def cartesian(self, y, f):
+        """状态与 (r, θ, φ) 的导数 -> 吸积盘系笛卡尔位置和速度 (n, 3)（单位 M），只用到 f 的前三列"""
+        r, theta, phi = y[:, 0], y[:, 1], y[:, 2]
+        dr, dtheta, dphi = f[:, 0], f[:, 1], f[:, 2]
+        sin_t, cos_t = np.sin(theta), np.cos(theta)
+        sin_p, cos_p = np.sin(phi), np.cos(phi)
+        w = np.sqrt(r * r + self.a2)
+        dw = r * dr / w
+        position = np.stack([w * sin_t * cos_p, w * sin_t * sin_p, r * cos_t], axis=1)
+        velocity = np.stack([
+            dw * sin_t * cos_p + w * (cos_t * cos_p * dtheta - sin_t * sin_p * dphi),
+            dw * sin_t * sin_p + w * (cos_t * sin_p * dtheta + sin_t * cos_p * dphi),
+            dr * cos_t - r * sin_t * dtheta,
+        ], axis=1)
+        return position, velocity
+
+
+def orbitSpeed(r, a):
+    """顺行圆轨道相对零角动量观者的速度（光速为单位），r 为 Boyer–Lindquist 半径（M）"""
+    delta = np.maximum(r * r - 2.0 * r + a * a, 1e-6)
+    sqrt_r = np.sqrt(r)
+    return (r * r - 2.0 * a * sqrt_r + a * a) / (np.sqrt(delta) * (r * sqrt_r + a))
+
+
+def equatorialLapse(r, a):
+    """赤道面上零角动量观者的时间膨胀因子 α = sqrt(ΔΣ/A)，a = 0 时为 sqrt(1 - 2/r)"""
+    delta = np.maximum(r * r - 2.0 * r + a * a, 1e-6 * r * r)
+    big_a = (r * r + a * a) ** 2 - a * a * delta
+    return np.sqrt(delta * r * r / big_a)
@@ -0,0 +1,135 @@
+import numpy as np
+
+from blackhole.camera import cameraParams
+from blackhole.kerr import horizonRadius
+
+# 物理常量 (与 shaders/circle.frag 中的 #define 保持一致)
+G0 = 6.673e-11
+LIGHTSPEED = 299792458.0
+LY = 9460730472580800.0
+MSUN = 1.9891e30
+
+# 渲染参数默认值，键名与着色器中的 uniform 同名
+DEFAULT_PARAMS = {
+    "MBlackHole": 1.49e7,           # 黑洞质量（太阳质量单位）
+    "backgroundType": 0,            # 0: 棋盘, 1: 纯黑, 2: 星空, 3: 纹理
+    "starSeed": 1,                  # 星空背景的随机种子
+    "backgroundPath": "",           # 纹理背景的等距柱状投影全景图路径
+    "iMouse": (0.0, 0.0, 0.0, 0.0), # 与 GLCircleWidget.iMouse 相同（像素坐标），不再影响相机
+    **cameraParams(),               # cameraView: 世界系 -> 相机系 4x4 视图矩阵, fov: 视场，见 blackhole.camera
+    "iTime": 0.0,
+    "iFrame": 0,
+    "iTimeDelta": 0.0,              # 与上一帧的真实时间间隔（秒）
+    "diskTime": 0.0,                # 吸积盘湍流转动的时间（秒），与 iTime 分开，静止画面保持不变以便完全平均
+    "accumHalfLife": 0.0,           # 时间累积的历史半衰期（秒），0 为静态场景完全平均
+    "deflectionLut": 0,             # 1: 按碰撞参数查表代替逐步推进（仅史瓦西黑洞）
+    "integrator": 0,                # 0: 原有的逐步推进, 1: Dormand–Prince 5(4) 自适应积分（ADAPTIVE_RK 变体）
+    "rayTolerance": 1e-4,           # 自适应积分每步允许的相对局部误差
+    "stepCount": 0,                 # 1: 输出每像素步进次数代替颜色（STEP_COUNT 变体，基准测试用）
+    "diskInner": 2.0,               # 吸积盘内半径（Rs）
+    "diskOuter": 10.0,              # 吸积盘外半径（Rs）
+    "diskDir": (1.0, 1.0, 1.0),     # 吸积盘法向（相机系）
+    "spin": 0.0,                    # 无量纲自旋 a/M，0 为史瓦西黑洞，非 0 时使用克尔积分（KERR 变体）
+    "TPeak4": 1.0,                  # 温度峰值参数（无量纲）
+    "shiftMax": 2.0,                # 最大多普勒频移因子
+    "diskShading": 1,               # 0: 灰色, 1: 黑体查找表, 2: 黑体直接积分（对照）
+    "diskTemperature": 8000.0,      # 吸积盘静止系最高温度（K）
+    "diskTurbulence": 0.6,          # 吸积盘湍流（3D 噪声纹理）的强度，0 为均匀的吸积盘
+    # 后处理默认关闭，离线渲染输出原始 HDR 数值；交互窗口默认使用 ACES 与泛光（见 GLCircleWidget）
+    "tonemap": 0,                   # 色调映射，TONEMAP_OPERATORS 的下标（0 为不做色调映射）
+    "exposure": 1.0,                # 色调映射前的曝光倍数
+    "bloom": 0.0,                   # 泛光强度，0 为关闭泛光链
+}
+
+# 色调映射算子，顺序与 shaders/tonemap.frag 中的 tonemapOperator 一致
+TONEMAP_OPERATORS = ("none", "aces", "reinhard", "exposure")
+
+
+# 不影响画面内容（或只在累积之后的后处理中使用）的参数，变化时不需要重置时间累积；
+# iMouse 只为兼容 Shadertoy 布局保留，相机由 cameraTheta / cameraPhi 决定
+ACCUMULATION_IGNORED = ("iTime", "iFrame", "iTimeDelta", "diskTime", "iMouse", "tonemap", "exposure", "bloom")
+
+
+def makeParams(params=None, **overrides):
+    """以默认值为基础合并渲染参数"""
+    merged = dict(DEFAULT_PARAMS)
+    if params:
+        merged.update(params)
+    merged.update(overrides)
+    return merged
+
+
+def accumulationKey(params):
+    """参数中影响画面的部分，变化时需要重置时间累积"""
+    key = []
+    for name in sorted(params):
+        if name in ACCUMULATION_IGNORED:
+            continue
+        value = params[name]
+        if isinstance(value, (list, np.ndarray)):
+            value = tuple(np.asarray(value).ravel().tolist())
+        key.append((name, value))
+    return tuple(key)
+
+
+def packRenderParams(params, width, height, channel_resolution=(64.0, 64.0, 0.0),
+                     tile_origin=(0.0, 0.0)):
+    """按 circle.frag 中 RenderParams 块的 std140 布局打包，返回 176 字节的 float32 数组
+
+    偏移（字节）: iMouse 0, iResolution 16, MBlackHole 24, diskInner 28, diskOuter 32,
+    spin 36, TPeak4 40, shiftMax 44, diskDir 48, backgroundType 60 (int),
+    iChannelResolution 64, accumHalfLife 76, iTileOrigin 80, diskTemperature 88,
+    diskShading 92 (int), iView 96 (按列存放), iFov 160, rayTolerance 164, kerrHorizon 168,
+    diskTurbulence 172，共 176 字节
+    """
+    block = np.zeros(44, dtype=np.float32)
+    block[0:4] = params["iMouse"]
+    block[4:6] = (width, height)
+    block[6:12] = (params["MBlackHole"], params["diskInner"], params["diskOuter"],
+                   params["spin"], params["TPeak4"], params["shiftMax"])
+    block[12:15] = params["diskDir"]
+    block[15:16].view(np.int32)[0] = int(params["backgroundType"])
+    block[16:19] = channel_resolution
+    block[19] = params["accumHalfLife"]
+    block[20:22] = tile_origin
+    block[22] = params["diskTemperature"]
+    block[23:24].view(np.int32)[0] = int(params["diskShading"])
+    block[24:40] = np.asarray(params["cameraView"], dtype=np.float64).T.ravel()  # std140 mat4 按列
+    block[40] = params["fov"]
+    block[41] = params["rayTolerance"]
+    block[42] = horizonRadius(params["spin"])
+    block[43] = params["diskTurbulence"]
+    return block
+
+
+def packFrameParams(params, accum_frame):
+    """按 FrameParams 块的 std140 布局打包每帧变化的参数
+
+    偏移（字节）: iTime 0, iTimeDelta 4, iFrame 8 (int), iAccumFrame 12 (int), diskTime 16，
+    补齐到 32 字节
+    """
+    block = np.zeros(8, dtype=np.float32)
+    block[0] = params["iTime"]
+    block[1] = params["iTimeDelta"]
+    block[2:4].view(np.int32)[:] = (int(params["iFrame"]), int(accum_frame))
+    block[4] = params["diskTime"]
+    return block
+
+
+def schwarzschildRadius(mass):
+    """史瓦西半径，单位为光年 (mass 为太阳质量)"""
+    return 2.0 * mass * G0 / LIGHTSPEED / LIGHTSPEED * MSUN / LY
+
+
+def diskBasis(disk_dir):
+    """与 GetBH/GetBHRot 相同的吸积盘坐标系 (行为 X, Y, Z 轴)"""
+    disk_dir = np.asarray(disk_dir, dtype=np.float64)
+    vecz = np.array([0.0, 0.0, 1.0])
+    if np.array_equal(disk_dir, vecz):
+        disk_dir = disk_dir + 0.0001 * np.array([1.0, 0.0, 0.0])
+    X = np.cross(vecz, disk_dir)
+    X /= np.linalg.norm(X)
+    Y = np.cross(disk_dir, X)
+    Y /= np.linalg.norm(Y)
+    Z = disk_dir / np.linalg.norm(disk_dir)
+    return np.stack([X, Y, Z])
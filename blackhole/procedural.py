@@ -0,0 +1,145 @@
+"""程序生成纹理及其磁盘缓存
+
+各生成函数均为向量化 NumPy 实现，返回 (height, width, 4) 数组（uint8 或 float32），
+三维纹理为 (depth, height, width, 4)。
+generate() 以 (名称, 参数) 的哈希为键把结果缓存为 .npy，再次启动时直接读取；
+缓存目录默认为 ~/.cache/blackhole/procedural，可用环境变量 BLACKHOLE_CACHE_DIR 覆盖。
+"""
+import functools
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from blackhole import blackbody, starfield
+
+CACHE_VERSION = 1  # 生成算法变化时加一，旧缓存自动失效
+
+
+def chessboard(size=64, tiles=8, color1=(220, 220, 220, 255), color2=(80, 80, 100, 255)):
+    """棋格纹理，左上角为 color1"""
+    index = np.arange(size) * tiles // size
+    light = (index[:, None] + index[None, :]) % 2 == 0
+    return np.where(light[..., None], np.array(color1, dtype=np.uint8),
+                    np.array(color2, dtype=np.uint8))
+
+
+def valueNoise(size=256, octaves=4, seed=0):
+    """可平铺的分形值噪声，各通道使用不同的随机晶格，取值约在 [0, 1]"""
+    rng = np.random.default_rng(seed)
+    coords = np.arange(size) / size
+    result = np.zeros((size, size, 4), dtype=np.float64)
+    amplitude, total = 1.0, 0.0
+    for octave in range(octaves):
+        cells = 4 << octave
+        lattice = rng.random((4, cells, cells))
+        x = coords * cells
+        i0 = np.floor(x).astype(np.int64)
+        f = x - i0
+        f = f * f * (3.0 - 2.0 * f)  # smoothstep 插值
+        i1 = (i0 + 1) % cells
+        rows0, rows1 = lattice[:, i0], lattice[:, i1]
+        a = rows0[:, :, i0] * (1.0 - f) + rows0[:, :, i1] * f
+        b = rows1[:, :, i0] * (1.0 - f) + rows1[:, :, i1] * f
+        layer = a * (1.0 - f[None, :, None]) + b * f[None, :, None]
+        result += amplitude * np.moveaxis(layer, 0, -1)
+        total += amplitude
+        amplitude *= 0.5
+    return (result / total).astype(np.float32)
+
+
+def _smoothLerp(values, size, cells, axis):
+    """沿 axis 把 cells 个（循环）晶格值用 smoothstep 插值到 size 个采样点"""
+    x = np.arange(size) / size * cells
+    i0 = np.floor(x).astype(np.int64)
+    f = x - i0
+    f = f * f * (3.0 - 2.0 * f)
+    shape = [1] * values.ndim
+    shape[axis] = size
+    f = f.reshape(shape)
+    return np.take(values, i0, axis=axis) * (1.0 - f) + np.take(values, (i0 + 1) % cells, axis=axis) * f
+
+
+def diskNoise(size=64, octaves=4, seed=0):
+    """可平铺的三维分形值噪声 (size, size, size, 4)，用于吸积盘湍流
+
+    各通道使用不同的随机晶格；每个通道按排名均衡到 [0, 1] 的均匀分布，
+    着色器中任意组合的平均值都是 0.5，不会改变吸积盘的平均亮度。
+    """
+    rng = np.random.default_rng(seed)
+    result = np.zeros((4, size, size, size))
+    amplitude = 1.0
+    for octave in range(octaves):
+        cells = 4 << octave
+        layer = rng.random((4, cells, cells, cells))
+        for axis in (3, 2, 1):  # 依次沿 x、y、z 插值，每次只放大一个轴
+            layer = _smoothLerp(layer, size, cells, axis)
+        result += amplitude * layer
+        amplitude *= 0.5
+    flat = result.reshape(4, -1)
+    ranks = np.empty_like(flat)
+    ranks[np.arange(4)[:, None], np.argsort(flat, axis=1)] = (np.arange(flat.shape[1]) + 0.5) / flat.shape[1]
+    return np.moveaxis(ranks.reshape(result.shape), 0, -1).astype(np.float32)
+
+
+def temperatureRamp(width=256, t_min=1000.0, t_max=40000.0):
+    """色温色带 (1, width, 4)，温度按对数均匀分布，颜色归一化到最大通道为 1"""
+    temperature = np.geomspace(t_min, t_max, width)
+    rgb = starfield.temperatureColor(temperature)
+    rgba = np.ones((1, width, 4), dtype=np.float32)
+    rgba[0, :, :3] = rgb / rgb.max(axis=1, keepdims=True)
+    return rgba
+
+
+def starfieldTexture(width=2048, height=1024, seed=1, count=starfield.STAR_COUNT):
+    return starfield.generateStarfield(width, height, seed, count)
+
+
+GENERATORS = {
+    "blackbody": blackbody.blackbodyTable,
+    "chessboard": chessboard,
+    "diskNoise": diskNoise,
+    "noise": valueNoise,
+    "starfield": starfieldTexture,
+    "temperatureRamp": temperatureRamp,
+}
+
+
+def cacheDir():
+    return os.path.join(os.environ.get("BLACKHOLE_CACHE_DIR")
+                        or os.path.join(os.path.expanduser("~"), ".cache", "blackhole"),
+                        "procedural")
+
+
+def cacheKey(name, params):
+    text = json.dumps([name, CACHE_VERSION, params], sort_keys=True, default=list)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=16)
+def _generate(name, frozen):
+    params = dict(frozen)
+    path = os.path.join(cacheDir(), f"{name}_{cacheKey(name, params)[:16]}.npy")
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        pass
+    image = GENERATORS[name](**params)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再改名，多个进程同时生成时不会读到半截文件
+        temp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(temp, image)
+        os.replace(temp, path)
+    except OSError:
+        pass  # 缓存目录不可写时只保留内存中的结果
+    return image
+
+
+def generate(name, **params):
+    """生成（或从缓存读取）程序纹理，返回的数组被多处共用，调用方不要修改"""
+    if name not in GENERATORS:
+        raise ValueError(f"Unknown procedural texture '{name}'")
+    frozen = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()))
+    return _generate(name, frozen)
@@ -0,0 +1,600 @@
+"""本地渲染任务服务器
+
+通过 HTTP/JSON 接口接收渲染任务，放入有界优先级队列，由工作进程池渲染后写入结果缓存。
+每个工作进程持有自己的渲染器：renderer 为 "gl" 时是一个离屏 OpenGL 上下文 (HeadlessRenderer，
+与 GLCircleWidget 使用同一套着色器)，为 "cpu" 时是 NumPy 参考实现。结果按参数哈希缓存在磁盘上，
+参数完全相同的请求直接返回已有结果，与排队或渲染中的任务相同时返回该任务。
+
+    QT_QPA_PLATFORM=offscreen python -m blackhole.server --port 8765 --workers 2
+    curl -s localhost:8765/jobs -d '{"size": [640, 360], "camera": {"theta": 30, "phi": 80}, "samples": 4}'
+    curl -s localhost:8765/jobs/1
+    curl -s localhost:8765/jobs/1/result -o frame.png
+    curl -s localhost:8765/status
+
+接口::
+
+    POST   /jobs              提交任务，已有缓存时返回 200（status 为 done），否则 202；队列已满时 503
+    GET    /jobs              所有任务的状态
+    GET    /jobs/<id>         任务状态：status (queued/running/done/failed/cancelled)、progress、position
+    GET    /jobs/<id>/result  渲染结果（png/npy/exr），未完成时 409
+    DELETE /jobs/<id>         取消排队中的任务
+    GET    /status            队列长度、各状态任务数、缓存条目数
+
+任务示例（均可省略，未给出的取默认值）::
+
+    {
+        "size": [640, 360],
+        "camera": {"theta": 30, "phi": 80, "distance": 5.7e-5, "fov": 0.5},
+        "mass": 1.49e7,
+        "spin": 0.0,
+        "background": {"type": "stars", "seed": 3},
+        "samples": 4,
+        "format": "png",
+        "priority": 0,
+        "params": {"diskOuter": 12.0}
+    }
+
+camera 的含义同 blackhole.camera.cameraParams；background 的 type 为 chess/black/stars/texture
+（或 backgroundType 的整数值），texture 需要服务器本机上的全景图 path；params 为其余
+DEFAULT_PARAMS 中的参数；samples 为时间累积的子帧数，cpu 渲染器只接受 1；priority 越大越先渲染。缓存目录默认为 ~/.cache/blackhole/renders，
+可用环境变量 BLACKHOLE_CACHE_DIR 或 --cache-dir 覆盖。服务器默认只监听 127.0.0.1。
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from blackhole.camera import KEYFRAME_FIELDS, cameraParams
+from blackhole.image_io import FrameWriter
+from blackhole.kerr import kerrParams
+from blackhole.params import DEFAULT_PARAMS, makeParams
+
+RENDERERS = ("cpu", "gl")
+BACKGROUNDS = ("chess", "black", "stars", "texture")  # 下标即 backgroundType
+JOB_FIELDS = ("size", "camera", "mass", "spin", "background", "samples", "format", "priority", "params")
+MAX_SIZE = 8192          # 单边最大像素数
+MAX_SAMPLES = 256
+MAX_BODY = 1 << 20       # 请求体上限（字节）
+JOB_HISTORY = 1000       # 保留的已结束任务记录数
+CACHE_VERSION = 1        # 渲染结果改变时递增，使旧缓存失效
+CONTENT_TYPES = {"png": "image/png", "npy": "application/octet-stream", "exr": "image/x-exr"}
+
+_worker = {}  # 工作进程内的渲染器状态
+
+
+class QueueFull(RuntimeError):
+    """任务队列已满"""
+
+
+def cacheDir():
+    return os.path.join(os.environ.get("BLACKHOLE_CACHE_DIR")
+                        or os.path.join(os.path.expanduser("~"), ".cache", "blackhole"),
+                        "renders")
+
+
+def backgroundParams(value):
+    """background 字段 -> {"backgroundType", "starSeed", "backgroundPath"} 中的若干项"""
+    if isinstance(value, (int, str)):
+        value = {"type": value}
+    if not isinstance(value, dict):
+        raise ValueError("'background' must be a name, an integer or an object")
+    kind = value.get("type", 0)
+    if isinstance(kind, str):
+        if kind not in BACKGROUNDS:
+            raise ValueError(f"Unknown background '{kind}', expected one of {BACKGROUNDS}")
+        kind = BACKGROUNDS.index(kind)
+    elif not isinstance(kind, int) or isinstance(kind, bool) or kind not in range(len(BACKGROUNDS)):
+        raise ValueError(f"Background type must be 0..{len(BACKGROUNDS) - 1}")
+    params = {"backgroundType": kind}
+    if "seed" in value:
+        params["starSeed"] = int(value["seed"])
+    if "path" in value:
+        params["backgroundPath"] = str(value["path"])
+    if kind == BACKGROUNDS.index("texture") and not params.get("backgroundPath"):
+        raise ValueError("A texture background needs a panorama 'path'")
+    return params
+
+
+def parseJob(body, renderer="gl"):
+    """检查请求体并补全默认值，返回 (渲染说明, 优先级)；参数有误时抛出 ValueError"""
+    if not isinstance(body, dict):
+        raise ValueError("Job must be a JSON object")
+    for name in body:
+        if name not in JOB_FIELDS:
+            raise ValueError(f"Unknown job field '{name}'")
+    try:
+        width, height = (int(v) for v in body.get("size", (640, 360)))
+    except (TypeError, ValueError):
+        raise ValueError("'size' must be [width, height]")
+    if not (0 < width <= MAX_SIZE and 0 < height <= MAX_SIZE):
+        raise ValueError(f"Image size must be between 1 and {MAX_SIZE} pixels per side")
+    samples = int(body.get("samples", 1))
+    if not 0 < samples <= MAX_SAMPLES:
+        raise ValueError(f"'samples' must be between 1 and {MAX_SAMPLES}")
+    if renderer == "cpu" and samples != 1:
+        # NumPy 参考实现不做时间累积，samples 不会改变结果
+        raise ValueError("The cpu renderer does not accumulate samples; use 'samples': 1")
+    fmt = str(body.get("format", "png")).lower()
+    if fmt not in FrameWriter.FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of {FrameWriter.FORMATS}")
+
+    overrides = body.get("params", {})
+    if not isinstance(overrides, dict):
+        raise ValueError("'params' must be an object")
+    for name in overrides:
+        if name not in DEFAULT_PARAMS:
+            raise ValueError(f"Unknown render parameter '{name}'")
+    # 自旋同时把吸积盘内边缘设为 ISCO，params 中显式给出的 diskInner 优先
+    params = kerrParams(float(body["spin"])) if "spin" in body else {}
+    params.update(overrides)
+    if "mass" in body:
+        params["MBlackHole"] = float(body["mass"])
+    if "background" in body:
+        params.update(backgroundParams(body["background"]))
+    params = makeParams(params)
+    if "camera" in body:
+        camera = body["camera"]
+        if not isinstance(camera, dict) or any(name not in KEYFRAME_FIELDS for name in camera):
+            raise ValueError(f"'camera' must be an object with keys from {KEYFRAME_FIELDS}")
+        params.update(cameraParams(**{"fov": params["fov"], **{k: float(v) for k, v in camera.items()}}))
+
+    spec = {"size": [width, height], "samples": samples, "format": fmt, "params": params}
+    return spec, int(body.get("priority", 0))
+
+
+def jobKey(renderer, spec):
+    """渲染说明的哈希，作为结果缓存的文件名"""
+    text = json.dumps([CACHE_VERSION, renderer, spec], sort_keys=True, default=list)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def initWorker(renderer, threads, progress_queue):
+    """工作进程初始化：GL 渲染器在第一个任务时按其尺寸创建"""
+    _worker["renderer_type"] = renderer
+    _worker["threads"] = threads
+    _worker["progress"] = progress_queue
+    _worker["renderer"] = None
+    if renderer == "gl":
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtGui import QGuiApplication
+
+        _worker["app"] = QGuiApplication.instance() or QGuiApplication([])
+
+
+def workerRenderer(width, height):
+    """工作进程的离屏渲染器，尺寸变化时重建（每个工作进程只持有一个 GL 上下文）"""
+    from widgets.headless_renderer import HeadlessRenderer
+
+    renderer = _worker["renderer"]
+    if renderer is not None and (renderer.width, renderer.height) == (width, height):
+        return renderer
+    if renderer is not None:
+        renderer.release()
+    renderer = _worker["renderer"] = HeadlessRenderer(width, height)
+    return renderer
+
+
+def renderJob(job_id, spec, path):
+    """在工作进程中渲染一个任务并写入缓存文件，返回渲染耗时（秒）"""
+    from blackhole.image_io import saveImage
+
+    width, height = spec["size"]
+
+    def progress(done, total):
+        _worker["progress"].put((job_id, done, total))
+
+    start = time.perf_counter()
+    if _worker["renderer_type"] == "gl":
+        pixels = workerRenderer(width, height).renderFrame(spec["params"], samples=spec["samples"],
+                                                           progress=progress)
+    else:
+        from blackhole import cpu
+        pixels = cpu.render(width, height, spec["params"], workers=_worker["threads"])
+        progress(1, 1)
+    render_seconds = time.perf_counter() - start
+
+    # 先写临时文件再改名，其他请求不会读到半截文件
+    directory, name = os.path.split(path)
+    temp = os.path.join(directory, f".{name}.tmp.{spec['format']}")
+    saveImage(temp, pixels)
+    os.replace(temp, path)
+    return render_seconds
+
+
+class RenderJob:
+    """一个渲染任务的状态，只在服务器进程中持锁修改"""
+
+    def __init__(self, job_id, sequence, key, spec, priority):
+        self.id = job_id
+        self.sequence = sequence
+        self.key = key
+        self.spec = spec
+        self.priority = priority
+        self.status = "queued"
+        self.progress = 0.0
+        self.cached = False
+        self.error = None
+        self.render_seconds = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def finished_state(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def describe(self):
+        width, height = self.spec["size"]
+        info = {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "priority": self.priority,
+            "size": [width, height],
+            "samples": self.spec["samples"],
+            "format": self.spec["format"],
+            "key": self.key,
+            "cached": self.cached,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "render_seconds": self.render_seconds,
+        }
+        if self.error is not None:
+            info["error"] = self.error
+        if self.status == "done":
+            info["result"] = f"/jobs/{self.id}/result"
+        return info
+
+
+class RenderService:
+    """任务队列、工作进程池与结果缓存（与 HTTP 无关，可直接在 Python 中使用）
+
+    每个分发线程从优先级队列取出一个任务交给进程池并等待其完成，线程数等于工作进程数，
+    因此进程池内部不会积压任务，优先级总是在任务真正开始时才决定。
+    """
+
+    def __init__(self, workers=1, queue_size=64, renderer="gl", cache_dir=None, cache_limit=256):
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown renderer '{renderer}', expected one of {RENDERERS}")
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.renderer = renderer
+        self.cache_dir = cache_dir or cacheDir()
+        self.cache_limit = cache_limit
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.queue = queue.PriorityQueue()  # (-priority, 序号, 任务)，容量由 submit 按 queuedCount 检查
+        self.jobs = {}                      # 任务 id -> RenderJob，按提交顺序
+        self.active = {}                    # 缓存键 -> 排队或渲染中的 RenderJob
+        self.sequence = itertools.count(1)
+        self.started = time.time()
+        self.closing = False
+
+        # Qt/OpenGL 在 fork 出的子进程中不可用，统一使用 spawn
+        self.context = multiprocessing.get_context("spawn")
+        self.progress_queue = self.context.Queue()
+        # CPU 渲染器本身按行多线程，进程数和线程数相乘不超过核数
+        self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.pool = self.createPool()
+
+        self.dispatchers = [threading.Thread(target=self._dispatch, name=f"dispatch-{index}", daemon=True)
+                            for index in range(self.workers)]
+        self.progress_thread = threading.Thread(target=self._collectProgress, name="progress", daemon=True)
+        for thread in self.dispatchers + [self.progress_thread]:
+            thread.start()
+
+    def createPool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self.context,
+                                   initializer=initWorker,
+                                   initargs=(self.renderer, self.threads, self.progress_queue))
+
+    def resultPath(self, job):
+        return os.path.join(self.cache_dir, f"{job.key}.{job.spec['format']}")
+
+    def submit(self, body):
+        """提交任务，返回 RenderJob；参数有误时抛出 ValueError，队列已满时抛出 QueueFull"""
+        spec, priority = parseJob(body, self.renderer)
+        key = jobKey(self.renderer, spec)
+        with self.lock:
+            if self.closing:
+                raise QueueFull("Server is shutting down")
+            existing = self.active.get(key)
+            if existing is not None:
+                # 相同的任务正在排队或渲染，直接共用
+                return existing
+            sequence = next(self.sequence)
+            job = RenderJob(str(sequence), sequence, key, spec, priority)
+            path = self.resultPath(job)
+            if os.path.exists(path):
+                os.utime(path)  # 缓存按最近使用时间淘汰
+                job.status = "done"
+                job.progress = 1.0
+                job.cached = True
+                job.finished = job.created
+            else:
+                if self.queuedCount() >= self.queue_size:
+                    raise QueueFull(f"Job queue is full ({self.queue_size} jobs)")
+                self.active[key] = job
+                self.queue.put((-priority, sequence, job))
+            self.remember(job)
+        return job
+
+    def queuedCount(self):
+        """排队中的任务数（调用方持锁；已取消的任务仍留在优先级队列中，不计入）"""
+        return sum(1 for job in self.active.values() if job.status == "queued")
+
+    def remember(self, job):
+        """记录任务，超出 JOB_HISTORY 时丢弃最早的已结束任务"""
+        self.jobs[job.id] = job
+        excess = len(self.jobs) - JOB_HISTORY
+        if excess > 0:
+            for old in [j for j in self.jobs.values() if j.finished_state][:excess]:
+                del self.jobs[old.id]
+
+    def job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def describe(self, job):
+        """任务状态；排队中的任务另给出前面还有几个任务"""
+        with self.lock:
+            info = job.describe()
+            if job.status == "queued":
+                order = (-job.priority, job.sequence)
+                info["position"] = sum(1 for other in self.active.values()
+                                       if other.status == "queued"
+                                       and (-other.priority, other.sequence) < order)
+        return info
+
+    def listJobs(self):
+        with self.lock:
+            return [job.describe() for job in self.jobs.values()]
+
+    def cancel(self, job):
+        """取消排队中的任务，已开始的任务不能取消，返回是否成功"""
+        with self.lock:
+            if job.status != "queued":
+                return False
+            job.status = "cancelled"
+            job.finished = time.time()
+            self.active.pop(job.key, None)
+        return True
+
+    def status(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            queued = counts.get("queued", 0)
+        return {
+            "renderer": self.renderer,
+            "workers": self.workers,
+            "queue": {"length": queued, "capacity": self.queue_size},
+            "jobs": counts,
+            "cache": {"entries": len(self.cacheEntries()), "limit": self.cache_limit, "dir": self.cache_dir},
+            "uptime": time.time() - self.started,
+        }
+
+    def cacheEntries(self):
+        return [entry for entry in os.scandir(self.cache_dir)
+                if entry.is_file() and not entry.name.startswith(".")]
+
+    def pruneCache(self):
+        """按最近使用时间淘汰超出 cache_limit 的结果文件"""
+        entries = self.cacheEntries()
+        if len(entries) <= self.cache_limit:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.cache_limit]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _dispatch(self):
+        while True:
+            _, _, job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.status != "queued":
+                    continue  # 排队时已取消
+                job.status = "running"
+                job.started = time.time()
+                pool = self.pool
+            try:
+                seconds = pool.submit(renderJob, job.id, job.spec, self.resultPath(job)).result()
+            except BrokenProcessPool as error:
+                # 工作进程异常退出（例如驱动崩溃），换一个新的进程池继续服务
+                self.replacePool(pool)
+                self.finish(job, error=f"Worker process died: {error}")
+            except Exception as error:
+                self.finish(job, error=f"{type(error).__name__}: {error}")
+            else:
+                self.finish(job, seconds=seconds)
+
+    def finish(self, job, seconds=None, error=None):
+        with self.lock:
+            job.finished = time.time()
+            if error is None:
+                job.status = "done"
+                job.progress = 1.0
+                job.render_seconds = seconds
+            else:
+                job.status = "failed"
+                job.error = error
+            self.active.pop(job.key, None)
+        self.pruneCache()
+
+    def replacePool(self, broken):
+        with self.lock:
+            if self.pool is not broken or self.closing:
+                return
+            self.pool = self.createPool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _collectProgress(self):
+        while True:
+            item = self.progress_queue.get()
+            if item is None:
+                return
+            job_id, done, total = item
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is not None and job.status == "running":
+                    job.progress = done / total
+
+    def close(self):
+        """取消排队中的任务，等待渲染中的任务结束后关闭工作进程"""
+        with self.lock:
+            self.closing = True
+            for job in self.active.values():
+                if job.status == "queued":
+                    job.status = "cancelled"
+                    job.finished = time.time()
+        for _ in self.dispatchers:
+            self.queue.put((-math.inf, next(self.sequence), None))
+        for thread in self.dispatchers:
+            thread.join()
+        self.pool.shutdown(wait=True)
+        self.progress_queue.put(None)
+        self.progress_thread.join()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """把 HTTP 请求转交给 server.service (RenderService)"""
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def sendJson(self, data, status=HTTPStatus.OK, headers=None):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def sendError(self, status, message):
+        self.sendJson({"error": message}, status)
+
+    def pathParts(self):
+        return [part for part in urlsplit(self.path).path.split("/") if part]
+
+    def do_GET(self):
+        parts = self.pathParts()
+        if parts == ["status"]:
+            self.sendJson(self.service.status())
+        elif parts == ["jobs"]:
+            self.sendJson({"jobs": self.service.listJobs()})
+        elif len(parts) in (2, 3) and parts[0] == "jobs" and parts[2:] in ([], ["result"]):
+            job = self.service.job(parts[1])
+            if job is None:
+                self.sendError(HTTPStatus.NOT_FOUND, "Unknown job")
+            elif len(parts) == 2:
+                self.sendJson(self.service.describe(job))
+            else:
+                self.sendResult(job)
+        else:
+            self.sendError(HTTPStatus.NOT_FOUND, "Not found")
+
+    def sendResult(self, job):
+        if job.status != "done":
+            self.sendError(HTTPStatus.CONFLICT, f"Job is {job.status}")
+            return
+        try:
+            with open(self.service.resultPath(job), "rb") as file:
+                payload = file.read()
+        except FileNotFoundError:
+            self.sendError(HTTPStatus.GONE, "Result was evicted from the cache; submit the job again")
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPES[job.spec["format"]])
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.pathParts() != ["jobs"]:
+            self.sendError(HTTPStatus.NOT_FOUND, "Not found")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.sendError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            job = self.service.submit(body)
+        except (ValueError, TypeError) as error:
+            # json.JSONDecodeError 也是 ValueError
+            self.sendError(HTTPStatus.BAD_REQUEST, str(error))
+            return
+        except QueueFull as error:
+            self.sendError(HTTPStatus.SERVICE_UNAVAILABLE, str(error))
+            return
+        status = HTTPStatus.OK if job.status == "done" else HTTPStatus.ACCEPTED
+        self.sendJson(self.service.describe(job), status, {"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        parts = self.pathParts()
+        job = self.service.job(parts[1]) if len(parts) == 2 and parts[0] == "jobs" else None
+        if job is None:
+            self.sendError(HTTPStatus.NOT_FOUND, "Unknown job")
+            return
+        if not self.service.cancel(job):
+            self.sendError(HTTPStatus.CONFLICT, f"Job is {job.status}")
+            return
+        self.sendJson(self.service.describe(job))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve black hole render jobs over a local HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (0 picks a free port)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, each with its own renderer")
+    parser.add_argument("--queue", type=int, default=64, help="maximum number of queued jobs")
+    parser.add_argument("--renderer", choices=RENDERERS, default="gl")
+    parser.add_argument("--cache-dir", help="result cache directory (default: ~/.cache/blackhole/renders)")
+    parser.add_argument("--cache-limit", type=int, default=256, help="results kept in the cache")
+    parser.add_argument("--verbose", action="store_true", help="log every HTTP request")
+    args = parser.parse_args(argv)
+
+    service = RenderService(args.workers, args.queue, args.renderer, args.cache_dir, args.cache_limit)
+    server = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+    server.service = service
+    server.verbose = args.verbose
+    host, port = server.server_address[:2]
+    print(f"Serving render jobs on http://{host}:{port} "
+          f"({service.workers} {service.renderer} worker(s), cache {service.cache_dir})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
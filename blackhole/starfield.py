@@ -0,0 +1,146 @@
+"""星空背景与全景图
+
+生成等距柱状投影 (equirect) 的浮点星空图，也可读取用户提供的全景图。
+图像第 0 行为北极（世界 +z），列从经度 -π 到 π，与 circle.frag 中的
+skyUv 一致；像素值为线性 HDR 亮度，亮星可以超过 1。
+"""
+import functools
+import os
+
+import numpy as np
+
+STAR_COUNT = 40000          # 星的数量
+BRIGHTEST_MAGNITUDE = -1.5  # 最亮星等
+FAINTEST_MAGNITUDE = 9.0    # 极限星等
+FAINTEST_FLUX = 0.03        # 极限星等的星在赤道处占一个像素时的亮度
+MAGNITUDE_SLOPE = 0.6       # 欧几里得星数计数 N(<m) ∝ 10^(0.6 m)
+
+
+def planck(wavelength_nm, temperature):
+    """黑体辐射强度（只用于比较不同波长，忽略常数因子）"""
+    x = 1.4387769e7 / (wavelength_nm * temperature)  # hc/(λkT)，λ 以 nm 为单位
+    return 1.0 / (wavelength_nm ** 5 * np.expm1(x))
+
+
+def temperatureColor(temperature):
+    """色温对应的 RGB（在 R/G/B 代表波长处取黑体谱，G 通道归一化为 1）"""
+    temperature = np.asarray(temperature, dtype=np.float64)[..., None]
+    rgb = planck(np.array([610.0, 550.0, 465.0]), temperature)
+    return rgb / rgb[..., 1:2]
+
+
+def sampleMagnitudes(rng, count):
+    """按 N(<m) ∝ 10^(0.6 m) 在 [BRIGHTEST, FAINTEST] 内抽取星等"""
+    low = 10.0 ** (MAGNITUDE_SLOPE * (BRIGHTEST_MAGNITUDE - FAINTEST_MAGNITUDE))
+    u = rng.uniform(low, 1.0, count)
+    return FAINTEST_MAGNITUDE + np.log10(u) / MAGNITUDE_SLOPE
+
+
+def sampleTemperatures(rng, count):
+    """恒星表面温度（K），以类太阳的冷星为主，少量高温蓝星"""
+    return np.clip(10.0 ** rng.normal(np.log10(5500.0), 0.18, count), 2500.0, 40000.0)
+
+
+@functools.lru_cache(maxsize=4)
+def generateStarfield(width=2048, height=1024, seed=1, count=STAR_COUNT):
+    """生成 (height, width, 4) float32 星空图；同样参数的结果被缓存，调用方不要修改
+
+    星在球面上均匀分布，每颗星的流量按双线性权重分到相邻四个像素，并除以像素的
+    立体角（随纬度的余弦变化），缩小采样或生成 mipmap 时总亮度保持不变。
+    """
+    rng = np.random.default_rng(seed)
+    z = rng.uniform(-1.0, 1.0, count)
+    lon = rng.uniform(-np.pi, np.pi, count)
+    flux = FAINTEST_FLUX * 10.0 ** (-0.4 * (sampleMagnitudes(rng, count) - FAINTEST_MAGNITUDE))
+    color = temperatureColor(sampleTemperatures(rng, count)) * flux[:, None]
+
+    # 像素中心在 (i + 0.5)，双线性分配到相邻像素
+    px = (lon + np.pi) / (2.0 * np.pi) * width - 0.5
+    py = (0.5 - np.arcsin(z) / np.pi) * height - 0.5
+    x0 = np.floor(px).astype(np.int64)
+    y0 = np.floor(py).astype(np.int64)
+    fx = px - x0
+    fy = py - y0
+
+    image = np.zeros((height, width, 3), dtype=np.float64)
+    for dy, wy in ((0, 1.0 - fy), (1, fy)):
+        rows = np.clip(y0 + dy, 0, height - 1)
+        for dx, wx in ((0, 1.0 - fx), (1, fx)):
+            cols = (x0 + dx) % width  # 经度方向首尾相接
+            np.add.at(image, (rows, cols), color * (wx * wy)[:, None])
+
+    lat = (0.5 - (np.arange(height) + 0.5) / height) * np.pi
+    image /= np.maximum(np.cos(lat), 0.05)[:, None, None]
+
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[..., :3] = image
+    return rgba
+
+
+def loadPanorama(path):
+    """读取等距柱状投影全景图，返回 (height, width, 4) float32
+
+    .npy 直接读取；.exr/.hdr 需要可选依赖 imageio；其他格式用 QImage 读取并归一化到 [0, 1]。
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        image = np.load(path).astype(np.float32)
+    elif ext in (".exr", ".hdr"):
+        try:
+            import imageio.v3 as iio
+        except ImportError:
+            raise RuntimeError("Reading HDR panoramas requires the 'imageio' package")
+        image = np.asarray(iio.imread(path), dtype=np.float32)
+    else:
+        from PyQt6.QtGui import QImage
+
+        qimage = QImage(path)
+        if qimage.isNull():
+            raise RuntimeError(f"Failed to read image: {path}")
+        qimage = qimage.convertToFormat(QImage.Format.Format_RGBA8888)
+        data = np.frombuffer(qimage.constBits().asstring(qimage.sizeInBytes()), dtype=np.uint8)
+        data = data.reshape(qimage.height(), qimage.bytesPerLine())[:, :qimage.width() * 4]
+        image = data.reshape(qimage.height(), qimage.width(), 4).astype(np.float32) / 255.0
+
+    if image.ndim == 2:
+        image = image[..., None]
+    if image.shape[2] < 4:
+        channels = image.shape[2]
+        rgba = np.ones(image.shape[:2] + (4,), dtype=np.float32)
+        rgba[..., :3] = image[..., :3] if channels >= 3 else image[..., :1]
+        image = rgba
+    return np.ascontiguousarray(image)
+
+
+def skyUv(dx, dy, dz):
+    """世界系方向 -> 等距柱状投影纹理坐标 (u, v)，v=0 为北极"""
+    u = 0.5 + np.arctan2(dy, dx) / (2.0 * np.pi)
+    v = 0.5 - np.arcsin(np.clip(dz, -1.0, 1.0)) / np.pi
+    return u, v
+
+
+def mipLevel(image, level):
+    """按 2x2 平均逐级缩小，level=0 返回原图"""
+    for _ in range(level):
+        height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+        if height < 2 or width < 2:
+            break
+        image = image[:height, :width].reshape(height // 2, 2, width // 2, 2, -1).mean(axis=(1, 3))
+    return image
+
+
+def sampleEquirect(image, u, v):
+    """双线性采样（经度方向循环，纬度方向截断）"""
+    height, width = image.shape[:2]
+    x = u * width - 0.5
+    y = np.clip(v * height - 0.5, 0.0, height - 1.0)
+    x0 = np.floor(x).astype(np.int64)
+    y0 = np.minimum(np.floor(y).astype(np.int64), height - 2) if height > 1 else np.zeros_like(x0)
+    fx = (x - x0)[:, None]
+    fy = (y - y0)[:, None]
+    x1 = (x0 + 1) % width
+    x0 = x0 % width
+    y1 = np.minimum(y0 + 1, height - 1)
+    top = image[y0, x0] * (1.0 - fx) + image[y0, x1] * fx
+    bottom = image[y1, x0] * (1.0 - fx) + image[y1, x1] * fx
+    return top * (1.0 - fy) + bottom * fy
@@ -0,0 +1,292 @@
+"""批量参数扫描渲染
+
+按扫描说明（JSON，安装了 PyYAML 时也可用 YAML）对各参数取值的笛卡尔积逐帧出图，
+用进程池并行渲染，每完成一帧立即写盘并更新 manifest.json（含每帧耗时）。
+再次运行时跳过已完成的帧，最后拼出一张对比总览图 contact_sheet.png。
+
+    python -m blackhole.sweep sweep.json --jobs 4
+
+扫描说明示例::
+
+    {
+        "size": [320, 180],
+        "renderer": "cpu",
+        "base": {"diskOuter": 12.0},
+        "axes": {
+            "MBlackHole": [1.0e6, 1.49e7],
+            "theta": [0, 45, 90],
+            "phi": [30, 60]
+        }
+    }
+
+axes 中的键为 DEFAULT_PARAMS 中的参数名，另外 theta/phi（角度）和 distance（光年）
+描述相机位置，由 blackhole.camera 换算成视图矩阵，未给出的取默认值。每个工作进程持有自己的渲染器：renderer 为 "gl" 时
+是一个离屏 OpenGL 上下文 (HeadlessRenderer)，为 "cpu" 时是 NumPy 参考实现。
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from blackhole.camera import cameraParams
+from blackhole.params import DEFAULT_PARAMS, makeParams
+
+MANIFEST_NAME = "manifest.json"
+SHEET_NAME = "contact_sheet.png"
+CAMERA_AXES = ("theta", "phi", "distance")
+RENDERERS = ("cpu", "gl")
+
+_worker = {}  # 工作进程内的渲染器状态
+
+
+def loadSpec(path):
+    """读取扫描说明，.yaml/.yml 需要可选依赖 PyYAML"""
+    with open(path, "r", encoding="utf-8") as file:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("Reading YAML sweep specs requires the 'PyYAML' package; "
+                                   "use JSON instead")
+            spec = yaml.safe_load(file)
+        else:
+            spec = json.load(file)
+    return normalizeSpec(spec)
+
+
+def normalizeSpec(spec):
+    """补全默认值并检查参数名"""
+    spec = dict(spec)
+    spec["size"] = [int(v) for v in spec.get("size", (320, 180))]
+    spec.setdefault("renderer", "cpu")
+    spec.setdefault("samples", 1)
+    spec.setdefault("format", "png")
+    spec.setdefault("thumbnail", 256)
+    spec["base"] = dict(spec.get("base", {}))
+    spec["axes"] = {name: list(values) for name, values in spec.get("axes", {}).items()}
+    if spec["renderer"] not in RENDERERS:
+        raise ValueError(f"Unknown renderer '{spec['renderer']}', expected one of {RENDERERS}")
+    if spec["format"] not in ("png", "npy", "exr"):
+        raise ValueError(f"Unsupported format: {spec['format']}")
+    for name in list(spec["base"]) + list(spec["axes"]):
+        if name not in DEFAULT_PARAMS and name not in CAMERA_AXES:
+            raise ValueError(f"Unknown sweep parameter '{name}'")
+    for name, values in spec["axes"].items():
+        if not values:
+            raise ValueError(f"Sweep axis '{name}' has no values")
+    return spec
+
+
+def frameParams(spec, values):
+    """单帧的完整渲染参数，values 为 轴名 -> 取值"""
+    merged = dict(spec["base"])
+    merged.update(values)
+    camera = {name: merged.pop(name) for name in CAMERA_AXES if name in merged}
+    params = makeParams(merged)
+    if camera:
+        params.update(cameraParams(fov=params["fov"], **camera))
+    return params
+
+
+def frames(spec):
+    """按轴的笛卡尔积列出各帧 (序号, 轴取值)，最后一个轴变化最快"""
+    names = list(spec["axes"])
+    for index, combo in enumerate(itertools.product(*(spec["axes"][n] for n in names))):
+        yield index, dict(zip(names, combo))
+
+
+def frameFile(spec, index):
+    return f"frame_{index:05d}.{spec['format']}"
+
+
+def initWorker(spec, threads):
+    """工作进程初始化：创建各自的渲染器"""
+    _worker["spec"] = spec
+    _worker["threads"] = threads
+    if spec["renderer"] == "gl":
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtGui import QGuiApplication
+        from widgets.headless_renderer import HeadlessRenderer
+
+        _worker["app"] = QGuiApplication.instance() or QGuiApplication([])
+        _worker["renderer"] = HeadlessRenderer(*spec["size"])
+
+
+def renderFrame(index, values, out_dir):
+    """在工作进程中渲染并写出一帧，返回 manifest 条目"""
+    from blackhole.image_io import saveImage
+
+    spec = _worker["spec"]
+    width, height = spec["size"]
+    params = frameParams(spec, values)
+    start = time.perf_counter()
+    if spec["renderer"] == "gl":
+        pixels = _worker["renderer"].renderFrame(params, samples=spec["samples"])
+    else:
+        from blackhole import cpu
+        pixels = cpu.render(width, height, params, workers=_worker["threads"])
+    render_seconds = time.perf_counter() - start
+
+    name = frameFile(spec, index)
+    # 先写临时文件再改名，中断时不会留下被误认为已完成的半截文件
+    temp = os.path.join(out_dir, f".{name}.tmp.{spec['format']}")
+    saveImage(temp, pixels)
+    os.replace(temp, os.path.join(out_dir, name))
+    return {
+        "index": index,
+        "file": name,
+        "values": values,
+        "render_seconds": render_seconds,
+        "total_seconds": time.perf_counter() - start,
+        "pid": os.getpid(),
+    }
+
+
+def writeManifest(out_dir, spec, entries):
+    manifest = {
+        "spec": spec,
+        "frames": [entries[index] for index in sorted(entries)],
+    }
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def renderSettings(spec):
+    """扫描说明中除 axes 外影响每帧画面的部分（经 JSON 往返，便于与 manifest 比较）"""
+    settings = {name: value for name, value in spec.items() if name not in ("axes", "output", "thumbnail")}
+    return json.loads(json.dumps(settings))
+
+
+def loadCompleted(out_dir, spec):
+    """已完成的帧：base/renderer/samples/format 等设置与 manifest 相同时，轴取值一致且文件仍在的条目"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    if renderSettings(manifest.get("spec", {})) != renderSettings(spec):
+        # 设置变化后旧帧不再对应，全部重新渲染
+        return {}
+    expected = dict(frames(spec))
+    completed = {}
+    for entry in manifest.get("frames", []):
+        index = entry["index"]
+        if expected.get(index) == entry["values"] and entry["file"] == frameFile(spec, index) \
+                and os.path.exists(os.path.join(out_dir, entry["file"])):
+            completed[index] = entry
+    return completed
+
+
+def loadFrame(path):
+    """读回已写出的帧，返回 (height, width, 4) float32"""
+    if path.endswith(".npy"):
+        return np.load(path)
+    if path.endswith(".exr"):
+        import imageio.v3 as iio
+        return np.asarray(iio.imread(path), dtype=np.float32)
+    from PyQt6.QtGui import QImage
+
+    image = QImage(path).convertToFormat(QImage.Format.Format_RGBA8888)
+    if image.isNull():
+        raise RuntimeError(f"Failed to read image: {path}")
+    data = np.frombuffer(image.constBits().asstring(image.sizeInBytes()), dtype=np.uint8)
+    data = data.reshape(image.height(), image.bytesPerLine())[:, :image.width() * 4]
+    return data.reshape(image.height(), image.width(), 4).astype(np.float32) / 255.0
+
+
+def thumbnail(rgba, width):
+    """按面积平均缩小到给定宽度"""
+    height = max(1, round(rgba.shape[0] * width / rgba.shape[1]))
+    ys = np.linspace(0, rgba.shape[0], height + 1).astype(int)
+    xs = np.linspace(0, rgba.shape[1], width + 1).astype(int)
+    rows = np.add.reduceat(rgba, ys[:-1], axis=0) / np.diff(ys)[:, None, None]
+    return np.add.reduceat(rows, xs[:-1], axis=1) / np.diff(xs)[None, :, None]
+
+
+def contactSheet(out_dir, spec, entries, gap=4):
+    """把各帧缩略图按网格拼成一张图：列为最后一个轴，行为其余轴的组合"""
+    from blackhole.image_io import saveImage
+
+    names = list(spec["axes"])
+    columns = len(spec["axes"][names[-1]]) if names else 1
+    total = math.prod(len(v) for v in spec["axes"].values())
+    rows = math.ceil(total / columns)
+    width, height = spec["size"]
+    thumb_w = min(spec["thumbnail"], width)
+    thumb_h = max(1, round(height * thumb_w / width))
+
+    sheet = np.zeros((rows * (thumb_h + gap) + gap, columns * (thumb_w + gap) + gap, 4),
+                     dtype=np.float32)
+    sheet[..., 3] = 1.0
+    for index, entry in entries.items():
+        thumb = thumbnail(loadFrame(os.path.join(out_dir, entry["file"])), thumb_w)[:thumb_h]
+        y = gap + (index // columns) * (thumb_h + gap)
+        x = gap + (index % columns) * (thumb_w + gap)
+        sheet[y:y + thumb.shape[0], x:x + thumb.shape[1]] = thumb
+    path = os.path.join(out_dir, SHEET_NAME)
+    saveImage(path, sheet)
+    return path
+
+
+def runSweep(spec, out_dir, jobs=None, log=print):
+    """执行扫描，返回 manifest 中的全部条目（序号 -> 条目）"""
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    entries = loadCompleted(out_dir, spec)
+    todo = [(index, values) for index, values in frames(spec) if index not in entries]
+    total = len(entries) + len(todo)
+    if entries:
+        log(f"Resuming: {len(entries)}/{total} frame(s) already rendered")
+
+    if todo:
+        jobs = min(jobs, len(todo))
+        # CPU 渲染器本身按行多线程，进程数和线程数相乘不超过核数
+        threads = max(1, (os.cpu_count() or 1) // jobs)
+        # Qt/OpenGL 在 fork 出的子进程中不可用，统一使用 spawn
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                 initializer=initWorker, initargs=(spec, threads)) as pool:
+            futures = [pool.submit(renderFrame, index, values, out_dir) for index, values in todo]
+            for future in as_completed(futures):
+                entry = future.result()
+                entries[entry["index"]] = entry
+                writeManifest(out_dir, spec, entries)
+                log(f"[{len(entries)}/{total}] {entry['file']} {entry['values']} "
+                    f"{entry['render_seconds']:.2f}s")
+    else:
+        writeManifest(out_dir, spec, entries)
+
+    sheet = contactSheet(out_dir, spec, entries)
+    log(f"Contact sheet written to {sheet}")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a parameter sweep of black hole stills")
+    parser.add_argument("spec", help="sweep spec (.json, or .yaml with PyYAML installed)")
+    parser.add_argument("--out", help="output directory (default: spec 'output' or sweep_<name>)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--renderer", choices=RENDERERS, help="override the spec renderer")
+    args = parser.parse_args(argv)
+
+    spec = loadSpec(args.spec)
+    if args.renderer:
+        spec["renderer"] = args.renderer
+    out_dir = args.out or spec.get("output") or \
+        "sweep_" + os.path.splitext(os.path.basename(args.spec))[0]
+    start = time.perf_counter()
+    entries = runSweep(spec, out_dir, args.jobs)
+    print(f"{len(entries)} frame(s) in {out_dir} ({time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+"""分块渲染超大静帧
+
+把整幅图像切成固定大小的块逐块渲染，避免单次全屏绘制触发驱动的 GPU 超时。
+每块渲染完成后直接写入内存映射的 .npy 输出文件 (height, width, 4) float32，
+内存占用只与块大小有关；块可以分发到多个进程并行渲染。
+
+    python -m blackhole.tiled --size 7680x4320 --tile 512 --out poster.npy --jobs 4
+
+renderer 为 "gl" 时每个进程持有一个块大小的离屏 OpenGL 上下文 (HeadlessRenderer)，
+通过 iTileOrigin 偏移 gl_FragCoord，iResolution 保持整幅尺寸，uvToDir 在各块间一致；
+为 "cpu" 时使用 NumPy 参考实现的 region 选项。
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from blackhole.kerr import kerrParams
+from blackhole.params import makeParams
+
+RENDERERS = ("cpu", "gl")
+
+_worker = {}  # 工作进程内的渲染器状态
+
+
+def parseSize(text):
+    """解析 WxH 格式的尺寸"""
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', expected WxH")
+    return width, height
+
+
+def tiles(width, height, tile_size):
+    """按行列出各块 (x0, y0, w, h)，图像坐标，边缘的块可能较小"""
+    return [(x0, y0, min(tile_size, width - x0), min(tile_size, height - y0))
+            for y0 in range(0, height, tile_size)
+            for x0 in range(0, width, tile_size)]
+
+
+def createOutput(path, width, height):
+    """创建内存映射的输出文件（不会在内存中分配整幅图像）"""
+    output = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32,
+                                       shape=(height, width, 4))
+    del output
+
+
+def initWorker(renderer, tile_size, threads):
+    """工作进程初始化：创建块大小的渲染器"""
+    _worker["renderer_type"] = renderer
+    _worker["threads"] = threads
+    if renderer == "gl":
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtGui import QGuiApplication
+        from widgets.headless_renderer import HeadlessRenderer
+
+        _worker["app"] = QGuiApplication.instance() or QGuiApplication([])
+        _worker["renderer"] = HeadlessRenderer(tile_size, tile_size)
+
+
+def renderTile(path, tile, width, height, params, samples):
+    """在工作进程中渲染一块并写入输出文件，返回耗时（秒）"""
+    x0, y0, tile_w, tile_h = tile
+    start = time.perf_counter()
+    if _worker["renderer_type"] == "gl":
+        # 渲染器固定为整块大小，边缘的块裁掉超出图像的部分
+        pixels = _worker["renderer"].renderFrame(params, samples, tile=(x0, y0, width, height))
+        pixels = pixels[:tile_h, :tile_w]
+    else:
+        from blackhole import cpu
+        pixels = cpu.render(width, height, params, workers=_worker["threads"], region=tile)
+
+    output = np.load(path, mmap_mode="r+")
+    output[y0:y0 + tile_h, x0:x0 + tile_w] = pixels
+    output.flush()
+    del output
+    return time.perf_counter() - start
+
+
+def renderTiled(path, width, height, params=None, tile_size=512, jobs=1, renderer="cpu",
+                samples=1, log=print):
+    """分块渲染整幅图像到 path (.npy)，返回各块耗时列表"""
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown renderer '{renderer}', expected one of {RENDERERS}")
+    params = makeParams(params)
+    createOutput(path, width, height)
+    todo = tiles(width, height, tile_size)
+    jobs = max(1, min(jobs, len(todo)))
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    timings = []
+
+    if jobs == 1:
+        initWorker(renderer, tile_size, threads)
+        for index, tile in enumerate(todo):
+            timings.append(renderTile(path, tile, width, height, params, samples))
+            log(f"[{index + 1}/{len(todo)}] tile {tile} {timings[-1]:.2f}s")
+        return timings
+
+    # Qt/OpenGL 在 fork 出的子进程中不可用，统一使用 spawn
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=initWorker,
+                             initargs=(renderer, tile_size, threads)) as pool:
+        futures = {pool.submit(renderTile, path, tile, width, height, params, samples): tile
+                   for tile in todo}
+        for future in as_completed(futures):
+            timings.append(future.result())
+            log(f"[{len(timings)}/{len(todo)}] tile {futures[future]} {timings[-1]:.2f}s")
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a large still in tiles")
+    parser.add_argument("--size", type=parseSize, default=(7680, 4320), help="image size WxH")
+    parser.add_argument("--tile", type=int, default=512, help="tile edge length in pixels")
+    parser.add_argument("--out", default="still.npy", help="memory-mapped .npy output file")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes")
+    parser.add_argument("--renderer", choices=RENDERERS, default="gl")
+    parser.add_argument("--samples", type=int, default=1,
+                        help="temporally accumulated samples per tile")
+    parser.add_argument("--lut", action="store_true",
+                        help="use the precomputed deflection lookup table instead of ray marching")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="integrate rays with the adaptive Dormand-Prince integrator")
+    parser.add_argument("--spin", type=float, default=0.0,
+                        help="black hole spin a/M; non-zero traces rays in the Kerr metric "
+                             "with the disk inner edge at the ISCO")
+    args = parser.parse_args(argv)
+    if not args.out.endswith(".npy"):
+        parser.error("--out must be a .npy file")
+
+    width, height = args.size
+    start = time.perf_counter()
+    params = makeParams(kerrParams(args.spin) if args.spin else None,
+                        deflectionLut=int(args.lut), integrator=int(args.adaptive))
+    timings = renderTiled(args.out, width, height, params, args.tile, args.jobs, args.renderer, args.samples)
+    print(f"Rendered {len(timings)} tile(s) at {width}x{height} to {args.out} "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,170 @@
+"""视频序列导出：固定时间步长的动画参数与带背压的流式编码管线
+
+渲染线程从 EncoderPipeline.acquire() 取得预分配的帧缓冲，填入像素后 submit()；
+后台线程按顺序把帧交给编码器（ffmpeg 子进程的 stdin 或图像序列）。缓冲数量固定，
+编码跟不上时 acquire() 阻塞，渲染随之减速，内存占用不会无限增长。
+"""
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from blackhole.image_io import FrameWriter
+from blackhole.camera import CameraPath
+from blackhole.params import makeParams
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".webm")
+
+
+def orbitPath(duration, orbit=360.0, phi=75.0):
+    """整段内方位角匀速转过 orbit 度的环绕路径"""
+    return CameraPath([{"time": 0.0, "theta": 0.0, "phi": phi},
+                       {"time": duration, "theta": orbit, "phi": phi}])
+
+
+def sequenceParams(frame_count, fps, path, base=None):
+    """各帧的渲染参数：iTime（以及吸积盘转动的 diskTime）按 1/fps 固定步进，相机按路径一次算出所有视图矩阵
+
+    只依赖帧序号，与实际渲染耗时无关，同样的参数总是得到同样的序列。
+    """
+    times = np.arange(frame_count) / fps
+    cameras = path.params(path.times[0] + times)
+    return [makeParams(base, iTime=float(times[frame]), iTimeDelta=1.0 / fps, iFrame=frame,
+                       diskTime=float(times[frame]),
+                       **cameras[frame])
+            for frame in range(frame_count)]
+
+
+class FfmpegEncoder:
+    """把帧以 8 位 RGBA 原始数据写入 ffmpeg 的 stdin"""
+
+    def __init__(self, path, width, height, fps, codec="libx264", crf=18):
+        executable = shutil.which("ffmpeg")
+        if executable is None:
+            raise RuntimeError("Video output requires 'ffmpeg' on PATH; "
+                               "record to a directory for an image sequence instead")
+        self.path = path
+        self._rgba8 = np.empty((height, width, 4), dtype=np.uint8)
+        self._scratch = np.empty((height, width, 4), dtype=np.float32)
+        self._log = open(f"{path}.log", "wb")
+        self.process = subprocess.Popen(
+            [executable, "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps),
+             "-i", "-",
+             "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",  # yuv420p 要求宽高为偶数
+             "-c:v", codec, "-crf", str(crf), "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE, stderr=self._log)
+
+    def write(self, frame, rgba):
+        # 与 FrameWriter.writePng 相同的截断与量化
+        np.clip(rgba, 0.0, 1.0, out=self._scratch)
+        np.multiply(self._scratch, 255.0, out=self._scratch)
+        np.rint(self._scratch, out=self._scratch)
+        self._rgba8[...] = self._scratch
+        try:
+            self.process.stdin.write(self._rgba8.data)
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg exited early, see {self._log.name}")
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        code = self.process.wait()
+        self._log.close()
+        if code != 0:
+            raise RuntimeError(f"ffmpeg failed with exit code {code}, see {self._log.name}")
+        os.remove(self._log.name)
+
+
+class ImageSequenceEncoder:
+    """把帧写成目录中的 frame_00000.png 等文件"""
+
+    def __init__(self, directory, width, height, formats=("png",)):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.formats = formats
+        self.writer = FrameWriter(width, height)
+
+    def write(self, frame, rgba):
+        for fmt in self.formats:
+            self.writer.write(os.path.join(self.directory, f"frame_{frame:05d}.{fmt}"), rgba)
+
+    def close(self):
+        pass
+
+
+def openEncoder(path, width, height, fps, formats=("png",)):
+    """按输出路径选择编码器：视频扩展名用 ffmpeg，其他视为图像序列目录"""
+    if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+        return FfmpegEncoder(path, width, height, fps)
+    return ImageSequenceEncoder(path, width, height, formats)
+
+
+class EncoderPipeline:
+    """有界的帧队列和后台编码线程
+
+    depth 个 (height, width, 4) float32 缓冲在渲染方与编码线程之间循环使用：
+    acquire() 取空闲缓冲（没有时阻塞，即背压），submit() 交给编码线程，
+    编码完成后缓冲回到空闲队列。编码线程的异常在下一次 acquire/submit/close 时抛出。
+    """
+
+    def __init__(self, encoder, width, height, depth=8):
+        self.encoder = encoder
+        self.free = queue.Queue()
+        for _ in range(depth):
+            self.free.put(np.empty((height, width, 4), dtype=np.float32))
+        self.frames = queue.Queue()
+        self.error = None
+        self.encoded = 0
+        self.encode_seconds = 0.0   # 编码线程实际工作的时间
+        self.blocked_seconds = 0.0  # acquire() 因队列满而等待的时间
+        self.thread = threading.Thread(target=self._run, name="encoder", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            frame, buffer = item
+            if self.error is None:
+                try:
+                    start = time.perf_counter()
+                    self.encoder.write(frame, buffer)
+                    self.encode_seconds += time.perf_counter() - start
+                    self.encoded += 1
+                except Exception as error:  # 交给渲染线程抛出
+                    self.error = error
+            self.free.put(buffer)
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def acquire(self):
+        """取一个空闲帧缓冲，编码跟不上时阻塞"""
+        self._check()
+        start = time.perf_counter()
+        buffer = self.free.get()
+        self.blocked_seconds += time.perf_counter() - start
+        return buffer
+
+    def submit(self, frame, buffer):
+        """把填好的缓冲按帧序号交给编码线程（须按顺序提交）"""
+        self._check()
+        self.frames.put((frame, buffer))
+
+    def close(self):
+        """等待队列中的帧编码完毕并关闭编码器"""
+        self.frames.put(None)
+        self.thread.join()
+        try:
+            self._check()
+        finally:
+            self.encoder.close()
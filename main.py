@@ -1,9 +1,11 @@
 import sys
 import os
+import time
+import argparse
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QSlider,
                              QHBoxLayout, QColorDialog, QLabel, QFrame, QPushButton,
                              QGroupBox, QTabWidget, QStackedWidget, QMessageBox)
-from PyQt6.QtGui import QPalette, QColor, QFont
+from PyQt6.QtGui import QPalette, QColor, QFont, QGuiApplication
 from PyQt6.QtCore import Qt
 
 # 从其他文件导入组件
@@ -13,6 +15,9 @@ from widgets.multipass_widget import MultiPassWidget  # 导入多通道渲染组
 from tabs.control_panel import ControlPanel
 from tabs.basic_control_panel import BasicControlPanel  # 导入基本功能演示的控制面板
 from tabs.multipass_control_panel import MultiPassControlPanel  # 导入多通道渲染控制面板
+from widgets.frame_scheduler import FrameScheduler  # 统一调度各画布的重绘
+from widgets.shader_reloader import ShaderReloader  # 着色器热重载
+from blackhole.params import TONEMAP_OPERATORS
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -100,6 +105,11 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(multipass_tab, "Multi-Pass Demo")
         
         left_layout.addWidget(self.tab_widget)
+
+        # 重绘调度：只绘制可见且画面仍在变化的画布
+        self.frame_scheduler = FrameScheduler(self)
+        for canvas in (self.circle_canvas, self.basic_canvas, self.multipass_canvas):
+            self.frame_scheduler.register(canvas)
         main_layout.addWidget(left_panel, 3)  # 左侧占据3/4空间
         
         # 创建右侧控制面板堆栈
@@ -121,6 +131,18 @@ class MainWindow(QMainWindow):
         self.control_stack.addWidget(self.multipass_control)
         
         main_layout.addWidget(self.control_stack, 1)  # 控制面板占据1/4空间
+
+        # 着色器热重载：后台编译，成功后下一帧换入，失败时在控制面板显示日志
+        self.shader_reloader = ShaderReloader("shaders", self)
+        self.shader_reloader.reloaded.connect(self.onShaderReloaded)
+        self.shader_reloader.reloadFailed.connect(
+            lambda log: self.circle_control.setShaderStatus(log, ok=False))
+        self.circle_control.shaderHotReloadToggled.connect(self.shader_reloader.setEnabled)
+        self.shader_reloader.setEnabled(True)
+        QApplication.instance().aboutToQuit.connect(self.shader_reloader.shutdown)
+        QApplication.instance().aboutToQuit.connect(self.circle_canvas.background_loader.shutdown)
+        self.circle_canvas.background_loader.failed.connect(
+            lambda message: self.circle_control.bg_path_label.setText(f"Failed to load: {message}"))
         
         # 连接信号
         self.connectSignals()
@@ -130,7 +152,6 @@ class MainWindow(QMainWindow):
         
         # 初始更新宽高比
         self.onTabChanged(0)  # 默认选择第一个标签页
-        self.connectSignals()
 
     def checkShaderFiles(self):
         """检查着色器文件是否存在"""
@@ -361,14 +382,58 @@ class MainWindow(QMainWindow):
         """连接所有信号"""
         # 圆形演示信号
         self.circle_control.backgroundTypeChanged.connect(self.circle_canvas.setBackgroundType)
+        self.circle_control.backgroundPathChanged.connect(self.circle_canvas.setBackgroundPath)
+        self.circle_control.massChanged.connect(self.circle_canvas.setMass)
+        self.circle_control.spinChanged.connect(self.circle_canvas.setSpin)
+        self.circle_control.diskRadiiChanged.connect(self.circle_canvas.setDiskRadii)
+        self.circle_control.diskShadingChanged.connect(self.circle_canvas.setDiskShading)
+        self.circle_control.diskTemperatureChanged.connect(self.circle_canvas.setDiskTemperature)
+        self.circle_control.diskTurbulenceChanged.connect(self.circle_canvas.setDiskTurbulence)
+        self.circle_control.animateDiskChanged.connect(self.circle_canvas.setAnimateDisk)
+        self.circle_control.tonemapChanged.connect(self.circle_canvas.setTonemap)
+        self.circle_control.exposureChanged.connect(self.circle_canvas.setExposure)
+        self.circle_control.bloomChanged.connect(self.circle_canvas.setBloom)
+        self.circle_control.renderScaleChanged.connect(self.circle_canvas.setRenderScale)
+        self.circle_control.autoScaleChanged.connect(self.circle_canvas.setAutoScale)
+        self.circle_control.deflectionLutChanged.connect(self.circle_canvas.setDeflectionLut)
+        self.circle_control.integratorChanged.connect(self.circle_canvas.setIntegrator)
+
+        # 帧时间统计
+        self.circle_canvas.profiler.statsUpdated.connect(self.circle_control.setStats)
+        self.circle_control.overlayToggled.connect(self.setStatsOverlayVisible)
+        self.circle_control.csvLoggingToggled.connect(self.setFrameStatsLogging)
         
         # 基本功能信号
         # self.basic_control.rotateRequested.connect(self.basic_canvas.rotateTriangle)
 
+    def setStatsOverlayVisible(self, visible):
+        """在所有画布上显示/隐藏帧时间叠加"""
+        for canvas in (self.circle_canvas, self.basic_canvas, self.multipass_canvas):
+            canvas.stats_overlay.setVisible(visible)
+
+    def setFrameStatsLogging(self, enabled):
+        """开始/停止把各画布的帧时间写入 CSV"""
+        canvases = {"circle": self.circle_canvas, "basic": self.basic_canvas,
+                    "multipass": self.multipass_canvas}
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        for name, canvas in canvases.items():
+            if enabled:
+                canvas.profiler.startCsvLog(f"frame_stats_{name}_{stamp}.csv")
+            else:
+                canvas.profiler.stopCsvLog()
+
+    def onShaderReloaded(self, path):
+        """新程序已换入着色器库，重绘可见画布"""
+        self.circle_control.setShaderStatus(f"Reloaded {os.path.basename(path)} at {time.strftime('%H:%M:%S')}")
+        self.frame_scheduler.requestFrame()
+
     def onTabChanged(self, index):
         """标签页切换事件处理"""
         # 切换到对应的控制面板
         self.control_stack.setCurrentIndex(index)
+
+        # 新显示的画布恢复绘制，隐藏的画布在下一次 frameSwapped 时自动停止
+        self.frame_scheduler.requestFrame()
         
         # 更新宽高比（仅圆形演示需要）
         if index == 0:  # 圆形演示
@@ -399,8 +464,185 @@ class MainWindow(QMainWindow):
             self.updateAspectRatio()
 
 
+def parseSize(text):
+    """解析 WxH 格式的尺寸"""
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', expected WxH")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', width and height must be positive")
+    return width, height
+
+
+def positive(kind):
+    """argparse 类型：kind 转换后必须大于 0"""
+    def parse(text):
+        try:
+            value = kind(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid {kind.__name__} value '{text}'")
+        if not value > 0:
+            raise argparse.ArgumentTypeError(f"'{text}' must be positive")
+        return value
+    return parse
+
+
+def parseArgs(argv):
+    """解析命令行参数，未识别的参数留给 Qt"""
+    parser = argparse.ArgumentParser(description="OpenGL black hole demo")
+    parser.add_argument("--headless", action="store_true",
+                        help="render frames offscreen without opening a window")
+    parser.add_argument("--out", default="frames", help="output directory for --headless")
+    parser.add_argument("--frames", type=positive(int), default=1, help="number of frames to render")
+    parser.add_argument("--size", type=parseSize, default=(1920, 1080), help="frame size WxH")
+    parser.add_argument("--format", default="png",
+                        help="comma separated output formats: png, npy, exr")
+    parser.add_argument("--fps", type=positive(float), default=60.0,
+                        help="iTime step per frame is 1/fps")
+    parser.add_argument("--samples", type=positive(int), default=1,
+                        help="temporally accumulated samples per frame")
+    parser.add_argument("--lut", action="store_true",
+                        help="use the precomputed deflection lookup table instead of ray marching")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="integrate rays with the adaptive Dormand-Prince integrator")
+    parser.add_argument("--spin", type=float, default=0.0,
+                        help="black hole spin a/M; non-zero traces rays in the Kerr metric "
+                             "with the disk inner edge at the ISCO")
+    parser.add_argument("--tonemap", choices=TONEMAP_OPERATORS, default="none",
+                        help="tone-mapping operator (e.g. aces); the default keeps raw HDR "
+                             "values in npy/exr output")
+    parser.add_argument("--exposure", type=float, default=0.0,
+                        help="exposure before tone mapping (EV stops); only used with --tonemap or --bloom")
+    parser.add_argument("--bloom", type=float, default=0.0, help="bloom strength, e.g. 0.3 (default: off)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="render a camera animation offscreen into a video (.mp4/.mkv/.mov/.webm, "
+                             "needs ffmpeg) or an image-sequence directory")
+    parser.add_argument("--orbit", type=float, default=360.0,
+                        help="camera azimuth swept over the whole --record sequence (degrees)")
+    parser.add_argument("--phi", type=float, default=75.0, help="camera polar angle for --record (degrees)")
+    parser.add_argument("--camera-path", metavar="JSON",
+                        help="keyframe camera path for --record (see blackhole/camera.py); "
+                             "replaces --orbit/--phi")
+    parser.add_argument("--queue", type=positive(int), default=8,
+                        help="frames buffered between rendering and encoding for --record")
+    return parser.parse_known_args(argv)
+
+
+def postParams(args):
+    """命令行中的后处理参数（色调映射、曝光、泛光）"""
+    return {"tonemap": TONEMAP_OPERATORS.index(args.tonemap), "exposure": 2.0 ** args.exposure,
+            "bloom": args.bloom}
+
+
+def parseFormats(text):
+    """解析逗号分隔的输出格式"""
+    from blackhole.image_io import FrameWriter
+
+    formats = [f.strip().lower() for f in text.split(",") if f.strip()]
+    for fmt in formats:
+        if fmt not in FrameWriter.FORMATS:
+            raise SystemExit(f"Unsupported format: {fmt}")
+    return formats
+
+
+def runHeadless(args, qt_argv):
+    """离屏渲染帧序列并写入文件"""
+    from widgets.headless_renderer import HeadlessRenderer
+    from blackhole.image_io import FrameWriter
+    from blackhole.kerr import kerrParams
+    from blackhole.params import makeParams
+
+    # 无显示环境下使用 offscreen 平台插件 (Mesa llvmpipe)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QGuiApplication(qt_argv)
+
+    formats = parseFormats(args.format)
+    os.makedirs(args.out, exist_ok=True)
+
+    width, height = args.size
+    renderer = HeadlessRenderer(width, height)
+    writer = FrameWriter(width, height)
+
+    physics = kerrParams(args.spin) if args.spin else {}
+    start = time.perf_counter()
+    for frame in range(args.frames):
+        params = makeParams(physics, iTime=frame / args.fps, iFrame=frame, iTimeDelta=1.0 / args.fps,
+                            diskTime=frame / args.fps,
+                            deflectionLut=int(args.lut), integrator=int(args.adaptive), **postParams(args))
+        pixels = renderer.renderFrame(params, samples=args.samples)
+        for fmt in formats:
+            writer.write(os.path.join(args.out, f"frame_{frame:05d}.{fmt}"), pixels)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {args.frames} frame(s) at {width}x{height} in {elapsed:.2f}s")
+
+    renderer.release()
+    return 0
+
+
+def runRecord(args, qt_argv):
+    """按固定时间步长渲染相机动画（环绕或关键帧路径），PBO 异步读回后经有界队列交给后台编码"""
+    from widgets.headless_renderer import HeadlessRenderer
+    from blackhole.camera import CameraPath
+    from blackhole.kerr import kerrParams
+    from blackhole.video import EncoderPipeline, openEncoder, orbitPath, sequenceParams
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QGuiApplication(qt_argv)
+
+    formats = parseFormats(args.format)
+    width, height = args.size
+    if args.camera_path:
+        path = CameraPath.load(args.camera_path)
+    else:
+        path = orbitPath(args.frames / args.fps, args.orbit, args.phi)
+    # 整段的相机矩阵一次算好
+    base = {"deflectionLut": int(args.lut), "integrator": int(args.adaptive), **postParams(args)}
+    if args.spin:
+        base.update(kerrParams(args.spin))
+    sequence = sequenceParams(args.frames, args.fps, path, base=base)
+    renderer = HeadlessRenderer(width, height)
+    pipeline = EncoderPipeline(openEncoder(args.record, width, height, args.fps, formats),
+                               width, height, depth=max(1, args.queue))
+
+    def collect():
+        # 取回最早一帧；编码跟不上时 acquire() 阻塞，渲染随之等待
+        buffer = pipeline.acquire()
+        pipeline.submit(renderer.finishReadback(buffer), buffer)
+
+    start = time.perf_counter()
+    try:
+        for frame, params in enumerate(sequence):
+            renderer.draw(params, samples=args.samples)
+            if renderer.readback_full:
+                collect()
+            renderer.startReadback(frame)  # GPU 拷贝与下一帧的渲染、前几帧的编码重叠
+            if (frame + 1) % max(1, int(args.fps)) == 0:
+                elapsed = time.perf_counter() - start
+                print(f"frame {frame + 1}/{args.frames}  {(frame + 1) / elapsed:.1f} fps")
+        while renderer.pending_readbacks:
+            collect()
+    finally:
+        pipeline.close()
+        renderer.release()
+    elapsed = time.perf_counter() - start
+    print(f"Recorded {args.frames} frame(s) at {width}x{height} to {args.record} in {elapsed:.2f}s "
+          f"({args.frames / elapsed:.1f} fps); encoder busy {pipeline.encode_seconds:.2f}s, "
+          f"renderer waited {pipeline.blocked_seconds:.2f}s on the queue")
+    return 0
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    args, qt_argv = parseArgs(sys.argv[1:])
+    qt_argv = sys.argv[:1] + qt_argv
+    if args.record:
+        sys.exit(runRecord(args, qt_argv))
+    if args.headless:
+        sys.exit(runHeadless(args, qt_argv))
+
+    # 各标签页的 OpenGL 上下文共享资源，着色器程序只需编译一次
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication(qt_argv)
     
     # 设置深色主题
     app.setStyle("Fusion")
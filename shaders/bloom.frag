@@ -0,0 +1,51 @@
+#version 430 core
+// 泛光链的一级（见 widgets/post_process.py），按宏选择：
+//   PREFILTER  从 HDR 场景缩小一半并提取超过阈值的亮部
+//   DOWNSAMPLE 缩小一半
+//   UPSAMPLE   把更低一级放大（3x3 帐篷滤波）并叠加到同级的缩小结果上
+in vec2 fragCoord;
+out vec4 outColor;
+
+uniform sampler2D sourceTexture;  // 上一级（PREFILTER 时为 HDR 场景）
+#ifdef UPSAMPLE
+uniform sampler2D baseTexture;    // 与输出同尺寸的缩小结果
+#endif
+#ifdef PREFILTER
+uniform float threshold;          // 亮度超过该值的部分产生泛光
+uniform float knee;               // 阈值附近的软过渡宽度
+#endif
+
+vec3 downsample(vec2 uv)
+{
+    // 中心与四个对角（偏移半个输出纹素，即一个源纹素）的双线性采样，每个采样是 2x2 源纹素的平均，合计覆盖 4x4
+    vec2 halfTexel = 1.0/vec2(textureSize(sourceTexture, 0));
+    vec3 sum = 4.0*texture(sourceTexture, uv).rgb;
+    sum += texture(sourceTexture, uv + vec2(-halfTexel.x, -halfTexel.y)).rgb;
+    sum += texture(sourceTexture, uv + vec2( halfTexel.x, -halfTexel.y)).rgb;
+    sum += texture(sourceTexture, uv + vec2(-halfTexel.x,  halfTexel.y)).rgb;
+    sum += texture(sourceTexture, uv + vec2( halfTexel.x,  halfTexel.y)).rgb;
+    return sum/8.0;
+}
+
+void main() {
+    vec2 uv = fragCoord;
+#if defined(PREFILTER)
+    vec3 color = downsample(uv);
+    // 软阈值：亮度 b 超过 threshold-knee 后按二次曲线过渡到线性 (b - threshold)
+    float brightness = max(color.r, max(color.g, color.b));
+    float soft = clamp(brightness - threshold + knee, 0.0, 2.0*knee);
+    soft = soft*soft/(4.0*knee + 1e-5);
+    float contribution = max(soft, brightness - threshold)/max(brightness, 1e-5);
+    outColor = vec4(color*contribution, 1.0);
+#elif defined(DOWNSAMPLE)
+    outColor = vec4(downsample(uv), 1.0);
+#elif defined(UPSAMPLE)
+    vec2 texel = 1.0/vec2(textureSize(sourceTexture, 0));
+    vec3 sum = 4.0*texture(sourceTexture, uv).rgb;
+    sum += 2.0*(texture(sourceTexture, uv + vec2(texel.x, 0.0)).rgb + texture(sourceTexture, uv - vec2(texel.x, 0.0)).rgb
+              + texture(sourceTexture, uv + vec2(0.0, texel.y)).rgb + texture(sourceTexture, uv - vec2(0.0, texel.y)).rgb);
+    sum += texture(sourceTexture, uv + texel).rgb + texture(sourceTexture, uv - texel).rgb
+         + texture(sourceTexture, uv + vec2(texel.x, -texel.y)).rgb + texture(sourceTexture, uv + vec2(-texel.x, texel.y)).rgb;
+    outColor = vec4(texture(baseTexture, uv).rgb + sum/16.0, 1.0);
+#endif
+}
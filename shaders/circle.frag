@@ -1,17 +1,44 @@
 #version 430 core
 out vec4 fragColor;
-uniform vec3 circleColor;
-uniform vec2 iResolution;  // 视口分辨率
-uniform vec2 offset;       // 偏移参数
-uniform float radius;      // 半径参数
-uniform float MBlackHole;  // 黑洞质量（太阳质量单位）
-uniform sampler2D backgroundTexture;  // 背景纹理
-uniform int backgroundType; // 0: 棋盘, 1: 纯黑, 2: 星空, 3: 纹理
-uniform vec4 iMouse; // 添加 iMouse 变量
-uniform float iTime;              // 添加 iTime 变量 (类似Shadertoy)
-uniform sampler2D iChannel1;         // 棋盘格纹理 (类似Shadertoy)
-uniform vec3 iChannelResolution;  // 声明为vec3数组
-uniform int iFrame;           // 添加 iFrame 变量 (类似Shadertoy)
+
+// 物理与相机参数（std140，绑定点 0），只在数值变化时由 CircleRenderer 上传，见 blackhole.params.packRenderParams
+layout(std140, binding = 0) uniform RenderParams {
+    vec4 iMouse;              // 鼠标像素坐标 (类似Shadertoy)
+    vec2 iResolution;         // 视口分辨率
+    float MBlackHole;         // 黑洞质量（太阳质量单位）
+    float diskInner;          // 吸积盘内半径（Rs）
+    float diskOuter;          // 吸积盘外半径（Rs）
+    float spin;               // 黑洞无量纲自旋 a/M（0 为史瓦西黑洞）
+    float TPeak4;             // 温度峰值参数（无量纲）
+    float shiftMax;           // 最大多普勒频移因子
+    vec3 diskDir;             // 吸积盘法向（相机系）
+    int backgroundType;       // 0: 棋盘, 1: 纯黑, 2: 星空, 3: 纹理
+    vec3 iChannelResolution;  // 棋格纹理分辨率
+    float accumHalfLife;      // 历史帧权重的半衰期（秒），0 表示静态场景的完全平均
+    vec2 iTileOrigin;         // 分块渲染时本块左下角在整幅图像中的像素坐标，iResolution 为整幅尺寸
+    float diskTemperature;    // 吸积盘静止系最高温度（K）
+    int diskShading;          // 0: 灰色, 1: 黑体查找表, 2: 黑体直接积分（查找表的参考路径）
+    mat4 iView;               // 世界系 -> 相机系的视图矩阵，由 Python 端计算（见 blackhole.camera）
+    float iFov;               // 视场：屏幕半宽对应的 tan(半视角)
+    float rayTolerance;       // 自适应积分 (ADAPTIVE_RK、KERR) 每步允许的相对局部误差
+    float kerrHorizon;        // 外视界半径 r+（单位 M = Rs/2），由 Python 端按 spin 计算（见 blackhole.kerr）
+    float diskTurbulence;     // 吸积盘湍流强度，0 为均匀的吸积盘
+};
+
+// 每帧变化的参数（std140，绑定点 1）
+layout(std140, binding = 1) uniform FrameParams {
+    float iTime;              // 时间（秒，类似Shadertoy）
+    float iTimeDelta;         // 与上一帧的真实时间间隔（秒）
+    int iFrame;               // 帧数 (类似Shadertoy)
+    int iAccumFrame;          // 已累积的帧数，0 表示重新开始累积
+    float diskTime;           // 吸积盘湍流转动的时间（秒），不转动时保持不变
+};
+
+layout(binding = 0) uniform sampler2D backgroundTexture;  // 背景纹理
+layout(binding = 1) uniform sampler2D iChannel1;          // 棋盘格纹理 (类似Shadertoy)
+layout(binding = 3) uniform sampler2D iChannel3;          // 上一帧纹理（时间累积）
+layout(binding = 6) uniform sampler2D blackbodyTable;     // 观测温度 -> (rgb, log2 Y)，见 blackhole.blackbody
+layout(binding = 7) uniform sampler3D diskNoise;          // 可平铺的三维分形噪声，各通道均匀分布在 [0, 1]，见 blackhole.procedural
 
 // 物理常量
 #define PI 3.141592653589
@@ -20,38 +47,11 @@ uniform int iFrame;           // 添加 iFrame 变量 (类似Shadertoy)
 #define sigma 5.670373e-8
 #define ly 9460730472580800.0
 #define Msun 1.9891e30
-#define FOV 0.5
-
-
-vec4 GetCamera(vec4 a)//相机系平移旋转  本部分在实际使用时uniform输入
-{
-    float _Theta=4.0*PI*iMouse.x/iResolution.x;
-    float _Phi=0.999*PI*iMouse.y/iResolution.y+0.0005;
-    float _R=0.000057;
-    vec3 _Rotcen=vec3(0.0,0.0,0.0);
-    vec3 _Campos;
-        vec3 reposcam=vec3(
-        _R * sin(_Phi) * cos(_Theta),
-        _R * sin(_Phi) * sin(_Theta),
-        -_R * cos(_Phi));
-        _Campos = _Rotcen + reposcam;
-        vec3 vecz =vec3( 0.0,0.0,1.0 );
-        vec3 _X = normalize(cross(vecz, reposcam));
-        vec3 _Y = normalize(cross(reposcam, _X));
-        vec3 _Z = normalize(reposcam);
-        a=(transpose(mat4x4(//注意glsl的矩阵和线性代数里学的矩阵差个转置
-            1., 0., 0., -_Campos.x,
-            0., 1., 0., -_Campos.y,
-            0., 0., 1., -_Campos.z,
-            0., 0., 0., 1.
-        ))*a);
-        a=transpose(mat4x4(
-            _X.x,_X.y,_X.z,0.,
-            _Y.x,_Y.y,_Y.z,0.,
-            _Z.x,_Z.y,_Z.z,0.,
-            0.   ,0.   ,0.   ,1.)
-            )*a;  
-        return a;
+
+
+vec4 GetCamera(vec4 a)//相机系平移旋转
+{
+    return iView*a;
 }
 
 // vec3 WorldToBlackHoleSpace(vec4 Position, vec3 BlackHolePos, vec3 DiskNormal,vec3 WorldUp)
@@ -80,34 +80,14 @@ vec4 GetCamera(vec4 a)//相机系平移旋转  本部分在实际使用时unifor
 //     return Position.xyz;
 // }
 
-vec4 GetCameraRot(vec4 a)//摄影机系旋转，用于矢量换系   本部分在实际使用时uniform输入
-{
-float _Theta=4.0*PI*iMouse.x/iResolution.x;
-float _Phi=0.999*PI*iMouse.y/iResolution.y+0.0005;
-float _R=0.000057;
-vec3 _Rotcen=vec3(0.0,0.0,0.0);
-vec3 _Campos;
-    vec3 reposcam=vec3(
-    _R * sin(_Phi) * cos(_Theta),
-    _R * sin(_Phi) * sin(_Theta),
-    -_R * cos(_Phi));
-    _Campos = _Rotcen + reposcam;
-    vec3 vecz =vec3( 0.0,0.0,1.0 );
-    vec3 _X = normalize(cross(vecz, reposcam));
-    vec3 _Y = normalize(cross(reposcam, _X));
-    vec3 _Z = normalize(reposcam);
-    a=transpose(mat4x4(
-        _X.x,_X.y,_X.z,0.,
-        _Y.x,_Y.y,_Y.z,0.,
-        _Z.x,_Z.y,_Z.z,0.,
-        0.   ,0.   ,0.   ,1.)
-        )*a;
-    return a;
+vec4 GetCameraRot(vec4 a)//摄影机系旋转，用于矢量换系
+{
+    return vec4(mat3(iView)*a.xyz, a.w);
 }
 
 vec3 uvToDir(vec2 uv) //一堆坐标间变换
 {
-    return normalize(vec3(FOV*(2.0*uv.x-1.0),FOV*(2.0*uv.y-1.0)*iResolution.y/iResolution.x,-1.0));
+    return normalize(vec3(iFov*(2.0*uv.x-1.0),iFov*(2.0*uv.y-1.0)*iResolution.y/iResolution.x,-1.0));
 }
 vec2 PosToNDC(vec4 pos)
 {
@@ -232,6 +212,104 @@ vec3 GetBHRot(vec4 a,vec3 BHPos,vec3 DiskDir)//BH系旋转
     return a.xyz;
 }
 
+// 黑体查找表的温度范围与参考亮度，与 blackhole.blackbody 一致
+#define BB_T_MIN 1000.0
+#define BB_T_MAX 100000.0
+#define BB_REFERENCE_Y 3.778231e-14  // 6500K 黑体的 Y（1nm 步长积分）
+
+float cieLobe(float wavelength, float mu, float sigma1, float sigma2){
+    float t = (wavelength-mu)/(wavelength<mu ? sigma1 : sigma2);
+    return exp(-0.5*t*t);
+}
+
+vec4 blackbodyAnalytic(float T)//直接积分 Planck 谱与 CIE 配色函数，返回 (rgb, log2 Y)，只用作查找表的对照
+{
+    vec3 xyz = vec3(0.0);
+    for(float wavelength = 360.0; wavelength <= 830.0; wavelength += 5.0){
+        float x = min(1.4387769e7/(wavelength*T), 80.0);
+        float planck = 1.0/(pow(wavelength, 5.0)*(exp(x)-1.0));
+        xyz += planck*vec3(
+            1.056*cieLobe(wavelength, 599.8, 37.9, 31.0)+0.362*cieLobe(wavelength, 442.0, 16.0, 26.7)-0.065*cieLobe(wavelength, 501.1, 20.4, 26.2),
+            0.821*cieLobe(wavelength, 568.8, 46.9, 40.5)+0.286*cieLobe(wavelength, 530.9, 16.3, 31.1),
+            1.217*cieLobe(wavelength, 437.0, 11.8, 36.0)+0.681*cieLobe(wavelength, 459.0, 26.0, 13.8));
+    }
+    xyz *= 5.0;
+    vec3 rgb = vec3(
+        3.2406*xyz.x-1.5372*xyz.y-0.4986*xyz.z,
+        -0.9689*xyz.x+1.8758*xyz.y+0.0415*xyz.z,
+        0.0557*xyz.x-0.2040*xyz.y+1.0570*xyz.z);
+    return vec4(max(rgb, 0.0)/xyz.y, log2(xyz.y/BB_REFERENCE_Y));
+}
+
+vec4 blackbodyColor(float T)//观测温度 -> (亮度归一化的 rgb, 相对亮度 log2 Y)
+{
+    if(diskShading == 2){
+        return blackbodyAnalytic(clamp(T, BB_T_MIN, BB_T_MAX));
+    }
+    float size = float(textureSize(blackbodyTable, 0).x);
+    float t = log(clamp(T, BB_T_MIN, BB_T_MAX)/BB_T_MIN)/log(BB_T_MAX/BB_T_MIN);
+    return textureLod(blackbodyTable, vec2((t*(size-1.0)+0.5)/size, 0.5), 0.0);
+}
+
+float diskTemperatureAt(float r, float RIn)//薄盘温度分布，最高温度 diskTemperature 位于 r=49/36 RIn
+{
+    float rPeak = 49.0/36.0*RIn;
+    float profile = pow(rPeak/r, 3.0)*max(1.0-sqrt(RIn/r), 0.0)*7.0;
+    return diskTemperature*pow(max(profile, 1e-6), 0.25);
+}
+
+float kerrOrbitSpeed(float r, float a)//赤道面顺行圆轨道相对零角动量观者的速度，r 为 Boyer–Lindquist 半径（M）
+{
+    float delta = max(r*r - 2.0*r + a*a, 1e-6);
+    float sqrtR = sqrt(r);
+    return (r*r - 2.0*a*sqrtR + a*a)/(sqrt(delta)*(r*sqrtR + a));
+}
+
+float kerrLapse(float r, float a)//赤道面上零角动量观者的时间膨胀因子 sqrt(ΔΣ/A)，a = 0 时为 sqrt(1 - 2/r)
+{
+    float delta = max(r*r - 2.0*r + a*a, 1e-6*r*r);
+    float A = (r*r + a*a)*(r*r + a*a) - a*a*delta;
+    return sqrt(delta*r*r/A);
+}
+
+vec3 diskEmission(vec3 PosOnDisk, vec3 DirOnDisk, vec3 CamOnDisk, float Rs, float RIn, float a, float shiftMax)//黑洞系下吸积盘的黑体颜色（含多普勒与引力频移），a 为自旋
+{
+    // 赤道面上的 Boyer–Lindquist 半径（单位 M），a = 0 时即 2r/Rs
+    float M = 0.5*Rs;
+    float r = sqrt(max(dot(PosOnDisk, PosOnDisk)/(M*M) - a*a, 1e-6));
+    // 圆轨道速度（以光速为单位），绕 +z 轴逆时针运动
+    float beta = clamp(kerrOrbitSpeed(r, a), 0.0, 0.99);
+    vec3 orbit = normalize(cross(vec3(0.0, 0.0, 1.0), PosOnDisk));
+    float doppler = sqrt(1.0-beta*beta)/(1.0-beta*dot(orbit, -DirOnDisk));
+    float gravity = kerrLapse(r, a)/sqrt(max(1.0-Rs/length(CamOnDisk), 1e-6));
+    float g = min(doppler*gravity, shiftMax);
+    // 观测谱为温度 g*T 的黑体谱；亮度相对最高温度处静止时的亮度
+    vec4 bb = blackbodyColor(g*diskTemperatureAt(length(PosOnDisk.xy), RIn));
+    return bb.rgb*exp2(bb.a-blackbodyColor(diskTemperature).a);
+}
+
+// 吸积盘湍流：噪声纹理坐标为 (转动后的方位角, r, z)，方位角一圈对应整数个纹理周期
+#define NOISE_AZIMUTH_TILES 4.0
+#define NOISE_RADIAL_SCALE 0.5   // 每 Rs 的纹理周期数
+#define NOISE_VERTICAL_SCALE 0.5
+#define NOISE_DETAIL 3.0         // 细节层的频率倍数（整数，保持方位角平铺）
+#define DISK_INNER_PERIOD 20.0   // 内边缘转一圈的演示时间（秒），其余半径按 omega() 之比差速转动
+
+float diskDensity(vec3 PosOnDisk, float Rs, float RIn)//吸积盘湍流的密度因子（平均为 1），每次两次三维纹理采样
+{
+    if(diskTurbulence <= 0.0){
+        return 1.0;
+    }
+    float r = length(PosOnDisk.xy);
+    // omega 在 r = 1.5Rs 处发散，半径取不小于 2Rs
+    float spinRate = omega(max(r, 2.0*Rs), Rs)/omega(max(RIn, 2.0*Rs), Rs);
+    float angle = atan(PosOnDisk.y, PosOnDisk.x) - 2.0*PI/DISK_INNER_PERIOD*spinRate*diskTime;
+    vec3 coord = vec3(angle/(2.0*PI)*NOISE_AZIMUTH_TILES, r/Rs*NOISE_RADIAL_SCALE, PosOnDisk.z/Rs*NOISE_VERTICAL_SCALE);
+    float coarse = texture(diskNoise, coord).r;
+    float detail = texture(diskNoise, coord*NOISE_DETAIL).g;
+    return mix(1.0, 2.0*(0.65*coarse + 0.35*detail), diskTurbulence);
+}
+
 vec4 diskColor(vec4 fragColor,float timerate,float steplength,vec3 RayPos,vec3 lastRayPos,vec3 RayDir,vec3 lastRayDir,vec3 WorldZ,vec3 BHPos,vec3 DiskDir,float Rs,float RIn,float ROut,float diskA,float TPeak4,float shiftMax){//吸积盘
     vec3 CamOnDisk=GetBH(vec4(0.,0.,0.,1.0),BHPos,DiskDir);//黑洞系下相机位置
     vec3 References=GetBHRot(vec4(WorldZ,1.0),BHPos,DiskDir);//用于吸积盘角度零点确定
@@ -245,7 +323,10 @@ vec4 diskColor(vec4 fragColor,float timerate,float steplength,vec3 RayPos,vec3 l
     
     vec4 color=vec4(0.);
     if(abs(PosZ)<0.5*Rs && PosR<ROut && PosR>RIn){
-            color=vec4(0.05);
+            color=vec4(0.05)*diskDensity(PosOnDisk, Rs, RIn);
+            if(diskShading != 0){
+                color.rgb*=diskEmission(PosOnDisk, DirOnDisk, CamOnDisk, Rs, RIn, clamp(diskA, -0.999, 0.999), shiftMax);
+            }
             color.xyz*=steplength   /Rs ;
             color.a*=steplength    /Rs;
        }
@@ -398,6 +479,463 @@ vec4 diskColor(vec4 fragColor,float timerate,float steplength,vec3 RayPos,vec3 l
 //     return log(1.0 + pow(0.1 * NoiseAccumulator, ContrastLevel));
 // }
 
+vec3 CameraToWorldDir(vec3 dir)//相机系方向换回世界系（GetCameraRot 的逆），背景天空固定在世界系
+{
+    return transpose(mat3(iView))*dir;
+}
+
+vec2 skyUv(vec3 dir)//世界系方向 -> 等距柱状投影纹理坐标，v=0 为北极 (+z)，与 blackhole/starfield.py 一致
+{
+    return vec2(0.5+atan(dir.y, dir.x)/(2.0*PI), 0.5-asin(clamp(dir.z,-1.0,1.0))/PI);
+}
+
+vec4 backgroundColor(vec4 fragColor, vec3 RayDir)//逃逸光线叠加背景
+{
+    // 根据背景类型选择不同的背景
+    if (backgroundType == 1) { // 纯黑背景
+        return fragColor + vec4(0.0, 0.0, 0.0, 1.0) * (1.0 - fragColor.a);
+    }
+    ivec2 skySize = textureSize(backgroundTexture, 0);
+    if ((backgroundType == 2 || backgroundType == 3) && skySize.x > 0) { // 星空/全景纹理（未就绪时纹理为空，退回棋盘）
+        // 循环内没有可靠的屏幕导数，按像素张角与纹素张角之比统一选择 mip 级别
+        float lod = log2(max(2.0*iFov/iResolution.x*float(skySize.x)/(2.0*PI), 1.0));
+        return fragColor + textureLod(backgroundTexture, skyUv(CameraToWorldDir(RayDir)), lod)*(1.0-fragColor.a);
+    }
+    // 棋盘背景
+    vec2 uv = DirTouv(RayDir);
+    return fragColor + 0.5*texelFetch(iChannel1, ivec2(vec2(fract(uv.x),fract(uv.y))*iChannelResolution.xy), 0)*(1.0-fragColor.a);
+}
+
+// 光线离黑洞最近距离超过 max(ROut + CULL_MARGIN*Rs, CULL_MIN_RADIUS*Rs) 时不再步进
+#define CULL_MARGIN 2.0
+#define CULL_MIN_RADIUS 10.0
+
+vec3 weakFieldDirection(vec3 NPosToBH, vec3 RayDir, float Dis, float Rs)//弱场近似下逃逸到无穷远时的方向
+{
+    // 完整掠过的偏折角取到二阶 2Rs/b+15π/16(Rs/b)^2，已走过的部分按一阶偏折沿直线积分的比例扣除
+    float x = dot(NPosToBH, RayDir);
+    vec3 toBH = x*RayDir - NPosToBH;//长度为 sin(夹角)，指向黑洞一侧
+    float sinA = length(toBH);
+    float rb = Rs/max(Dis*sinA, 1e-12*Rs);
+    float delta = (2.0*rb + 15.0*PI/16.0*rb*rb)*(1.0-x)*(1.0-x)*(2.0+x)/4.0;
+    return normalize(cos(delta)*RayDir + sin(delta)/max(sinA, 1e-12)*toBH);
+}
+
+#ifdef DEFLECTION_LUT
+// 史瓦西偏折查找表（由 blackhole/lut.py 生成），行坐标 x = b/(b+LUT_B0)，b 为以 Rs 为单位的碰撞参数
+layout(binding = 4) uniform sampler2D deflectionTable;  // r: 归一化轨道角 s -> u/uEnd, g: u/uEnd -> s
+layout(binding = 5) uniform sampler2D deflectionInfo;   // (psiEnd, uEnd, captured)
+#define LUT_B0 3.0
+#define MAX_DISK_CROSSINGS 4
+
+struct LutOrbit {
+    vec3 e1;       // 起点方向（轨道平面基）
+    vec3 e2;       // 轨道平面内与 e1 垂直、指向前进方向
+    float x;       // 碰撞参数坐标
+    float psi0;    // 起点在入射轨道上的轨道角
+    float psiEnd;  // 入射轨道到近心点（或视界）的轨道角
+    float uEnd;
+    float dir;     // +1 向内, -1 向外
+    float phiEnd;  // 从起点到逃逸（或视界）转过的角度
+    bool captured;
+};
+
+vec2 lutCoord(float s, float x)//表格第一维的格点在 0 与 1 处
+{
+    float n = float(textureSize(deflectionTable, 0).x);
+    return vec2((clamp(s, 0.0, 1.0)*(n-1.0)+0.5)/n, x);
+}
+
+LutOrbit lutOrbit(vec3 PosToBH, vec3 RayDir, float Rs)
+{
+    LutOrbit o;
+    float r0 = length(PosToBH);
+    o.e1 = PosToBH/r0;
+    float cosA = dot(o.e1, RayDir);
+    vec3 t = RayDir - cosA*o.e1;
+    float sinA = length(t);
+    if(sinA > 1e-6){
+        o.e2 = t/sinA;
+    }else{//径向光线，轨道平面任取
+        o.e2 = normalize(cross(o.e1, abs(o.e1.z) < 0.9 ? vec3(0.0, 0.0, 1.0) : vec3(1.0, 0.0, 0.0)));
+    }
+
+    // 能量守恒 1/b^2 = u^2/sin^2(a) - u^3（以 Rs 为单位）
+    float u0 = Rs/r0;
+    float b = inversesqrt(max(u0*u0/max(sinA*sinA, 1e-12) - u0*u0*u0, 1e-12));
+    o.x = b/(b+LUT_B0);
+    vec3 info = texture(deflectionInfo, vec2(o.x, 0.5)).xyz;
+    o.psiEnd = info.x;
+    o.uEnd = info.y;
+    o.psi0 = texture(deflectionTable, lutCoord(u0/o.uEnd, o.x)).g*o.psiEnd;
+
+    bool ingoing = cosA < 0.0;
+    o.dir = ingoing ? 1.0 : -1.0;
+    o.phiEnd = ingoing ? (info.z > 0.5 ? o.psiEnd-o.psi0 : 2.0*o.psiEnd-o.psi0) : o.psi0;
+    o.captured = ingoing && info.z > 0.5;
+    return o;
+}
+
+float lutU(LutOrbit o, float phi)//从起点转过 phi 后的 u = Rs/r
+{
+    float psi = o.psi0 + o.dir*phi;
+    if(psi > o.psiEnd){//近心点之后轨道对称
+        psi = 2.0*o.psiEnd - psi;
+    }
+    return texture(deflectionTable, lutCoord(psi/o.psiEnd, o.x)).r*o.uEnd;
+}
+
+vec4 traceLut(vec3 PosToBH, vec3 RayDir, float Rs, vec3 DiskNormal, float RIn, float ROut)//查表代替逐步推进
+{
+    LutOrbit o = lutOrbit(PosToBH, RayDir, Rs);
+    vec4 color = vec4(0.0);
+    float a = dot(o.e1, DiskNormal);
+    float b = dot(o.e2, DiskNormal);
+    // 轨道平面与盘面的交线方向，由近及远依次穿越
+    float phi = mod(atan(b, a) + 0.5*PI, PI);
+    for(int k = 0; k < MAX_DISK_CROSSINGS && phi < o.phiEnd; k++, phi += PI){
+        float u = lutU(o, phi);
+        float lo = max(phi - 1e-3, 0.0);
+        float du = (lutU(o, phi + 1e-3) - lutU(o, lo))/(phi + 1e-3 - lo);
+        float r = 1.0/u;
+        float dr = -du/(u*u);
+        // 穿越处径向在盘面内，光线与盘面的夹角只由切向分量决定；盘层厚度为 Rs
+        float sinBeta = r*abs(b*cos(phi) - a*sin(phi))*inversesqrt(dr*dr + r*r);
+        float len = min(1.0/max(sinBeta, 1e-3), 2.0*ROut/Rs);
+        if(r*Rs > RIn && r*Rs < ROut){
+            color += vec4(1.0 - exp(-0.05*len))*(1.0 - color.a);
+        }
+    }
+    if(!o.captured){
+        color = backgroundColor(color, cos(o.phiEnd)*o.e1 + sin(o.phiEnd)*o.e2);
+    }
+    return color;
+}
+#endif
+
+#if defined(ADAPTIVE_RK) || defined(KERR)
+// Dormand–Prince 5(4) 自适应积分（ADAPTIVE_RK、KERR 变体）共用的步长控制与插值，与 blackhole/integrators.py 相同
+#define RK_MAX_STEPS 1000
+#define RK_SAFETY 0.9
+#define RK_MIN_FACTOR 0.2
+#define RK_MAX_FACTOR 5.0
+#define RK_MAX_STEP_FRACTION 0.5  // 步长不超过当前距离的一半，一步内最多穿过盘面一次
+#define RK_INITIAL_STEP 0.1
+#define ESCAPE_RADIUS 100.0
+
+float stepFactor(float err)
+{
+    return clamp(RK_SAFETY*pow(max(err, 1e-10), -0.2), RK_MIN_FACTOR, RK_MAX_FACTOR);
+}
+
+vec3 hermitePosition(vec3 x0, vec3 v0, vec3 x1, vec3 v1, float dl, float t)
+{
+    float t2 = t*t, t3 = t2*t;
+    return (2.0*t3-3.0*t2+1.0)*x0 + (t3-2.0*t2+t)*dl*v0 + (3.0*t2-2.0*t3)*x1 + (t3-t2)*dl*v1;
+}
+
+vec3 hermiteTangent(vec3 x0, vec3 v0, vec3 x1, vec3 v1, float dl, float t)
+{
+    float t2 = t*t;
+    return (6.0*t2-6.0*t)*x0 + (3.0*t2-4.0*t+1.0)*dl*v0 + (6.0*t-6.0*t2)*x1 + (3.0*t2-2.0*t)*dl*v1;
+}
+
+float crossingTime(float s0, float ds0, float s1, float ds1, float dl)//步内标量 s 的 Hermite 插值过零的位置，s0 与 s1 异号
+{
+    // 按弦线性插值，再做两次牛顿迭代
+    float t = s0/(s0 - s1);
+    for(int i = 0; i < 2; i++){
+        float t2 = t*t, t3 = t2*t;
+        float value = (2.0*t3-3.0*t2+1.0)*s0 + (t3-2.0*t2+t)*dl*ds0 + (3.0*t2-2.0*t3)*s1 + (t3-t2)*dl*ds1;
+        float slope = (6.0*t2-6.0*t)*s0 + (3.0*t2-4.0*t+1.0)*dl*ds0 + (6.0*t-6.0*t2)*s1 + (3.0*t2-2.0*t)*dl*ds1;
+        t = clamp(t - value/(slope == 0.0 ? 1.0 : slope), 0.0, 1.0);
+    }
+    return t;
+}
+
+vec4 diskLayer(vec4 color, vec3 RayPos, vec3 RayDir, vec3 BHRPos, vec3 DiskDir, vec3 DiskNormal,
+               float Rs, float RIn, float ROut)//在盘面交点处按穿过盘层的路径长度一次着色
+{
+    // 穿过厚度为 Rs 的盘层的路径长度（Rs），换算成 diskColor 线性不透明度下的等效步长，整层不透明度为 1-exp(-0.05*len)
+    float len = min(1.0/max(abs(dot(RayDir, DiskNormal)), 1e-3), 2.0*ROut/Rs);
+    float steplength = 20.0*Rs*(1.0 - exp(-0.05*len));
+    return diskColor(color, 0.0, steplength, RayPos, RayPos, RayDir, RayDir, vec3(0.0, 0.0, 1.0),
+                     BHRPos, DiskDir, Rs, RIn, ROut, spin, TPeak4, shiftMax);
+}
+#endif
+
+#ifdef ADAPTIVE_RK
+// 史瓦西时空的自适应积分，坐标以 Rs 为单位：
+// x' = v, v' = -1.5 h² x / r⁵, h = |x × v| 守恒，与逐步推进的弯曲率 dphirate 等价
+
+vec3 photonAcceleration(vec3 x, float h2)
+{
+    float r2 = dot(x, x);
+    return x*(-1.5*h2/(r2*r2*sqrt(r2)));
+}
+
+float dopriStep(vec3 x, vec3 v, vec3 a, float h2, float dl, out vec3 x5, out vec3 v5, out vec3 a5)//一次尝试，返回误差范数（<=1 时接受）
+{
+    // 第 i 级的位置导数就是该级的速度 vi，速度导数为 ki
+    vec3 k1 = a;
+    vec3 v2 = v + dl*(1.0/5.0*k1);
+    vec3 k2 = photonAcceleration(x + dl*(1.0/5.0*v), h2);
+    vec3 v3 = v + dl*(3.0/40.0*k1 + 9.0/40.0*k2);
+    vec3 k3 = photonAcceleration(x + dl*(3.0/40.0*v + 9.0/40.0*v2), h2);
+    vec3 v4 = v + dl*(44.0/45.0*k1 - 56.0/15.0*k2 + 32.0/9.0*k3);
+    vec3 k4 = photonAcceleration(x + dl*(44.0/45.0*v - 56.0/15.0*v2 + 32.0/9.0*v3), h2);
+    vec3 v5s = v + dl*(19372.0/6561.0*k1 - 25360.0/2187.0*k2 + 64448.0/6561.0*k3 - 212.0/729.0*k4);
+    vec3 k5 = photonAcceleration(x + dl*(19372.0/6561.0*v - 25360.0/2187.0*v2 + 64448.0/6561.0*v3
+                                         - 212.0/729.0*v4), h2);
+    vec3 v6 = v + dl*(9017.0/3168.0*k1 - 355.0/33.0*k2 + 46732.0/5247.0*k3 + 49.0/176.0*k4
+                      - 5103.0/18656.0*k5);
+    vec3 k6 = photonAcceleration(x + dl*(9017.0/3168.0*v - 355.0/33.0*v2 + 46732.0/5247.0*v3
+                                         + 49.0/176.0*v4 - 5103.0/18656.0*v5s), h2);
+    x5 = x + dl*(35.0/384.0*v + 500.0/1113.0*v3 + 125.0/192.0*v4 - 2187.0/6784.0*v5s + 11.0/84.0*v6);
+    v5 = v + dl*(35.0/384.0*k1 + 500.0/1113.0*k3 + 125.0/192.0*k4 - 2187.0/6784.0*k5 + 11.0/84.0*k6);
+    a5 = photonAcceleration(x5, h2);//第 7 级，下一步的第 1 级 (FSAL)
+    // 5 阶解与 4 阶解之差
+    vec3 xErr = dl*(71.0/57600.0*v - 71.0/16695.0*v3 + 71.0/1920.0*v4 - 17253.0/339200.0*v5s
+                    + 22.0/525.0*v6 - 1.0/40.0*v5);
+    vec3 vErr = dl*(71.0/57600.0*k1 - 71.0/16695.0*k3 + 71.0/1920.0*k4 - 17253.0/339200.0*k5
+                    + 22.0/525.0*k6 - 1.0/40.0*a5);
+    return max(length(xErr)/length(x5), length(vErr)/length(v5))/rayTolerance;
+}
+
+vec4 diskCrossing(vec4 color, vec3 x0, vec3 v0, vec3 x1, vec3 v1, float dl, vec3 BHRPos, vec3 DiskDir,
+                  vec3 DiskNormal, float Rs, float RIn, float ROut)//一步内穿过盘面：求交点，按穿过盘层的路径长度一次着色
+{
+    float t = crossingTime(dot(x0, DiskNormal), dot(v0, DiskNormal), dot(x1, DiskNormal), dot(v1, DiskNormal), dl);
+    vec3 RayPos = BHRPos + hermitePosition(x0, v0, x1, v1, dl, t)*Rs;
+    vec3 RayDir = normalize(hermiteTangent(x0, v0, x1, v1, dl, t));
+    return diskLayer(color, RayPos, RayDir, BHRPos, DiskDir, DiskNormal, Rs, RIn, ROut);
+}
+
+vec4 traceAdaptive(vec3 PosToBH, vec3 RayDir, vec3 BHRPos, vec3 DiskDir, vec3 DiskNormal, float Rs,
+                   float RIn, float ROut, float CullRadius, out int count)//自适应积分代替固定步长推进，count 为尝试的步数
+{
+    vec4 color = vec4(0.0);
+    vec3 x = PosToBH/Rs;
+    vec3 v = RayDir;
+    vec3 h = cross(x, v);
+    float h2 = dot(h, h);
+    vec3 a = photonAcceleration(x, h2);
+    float r = length(x);
+    float dl = RK_INITIAL_STEP*r;
+    float cull = CullRadius/Rs;
+    for(count = 0; count < RK_MAX_STEPS; count++){
+        // 与逐步推进相同的剔除条件；逃逸的光线按剩余的弱场偏折修正方向
+        float speed = length(v);
+        float radial = dot(x, v)/(r*speed);
+        float closest = radial < 0.0 ? r*sqrt(max(1.0-radial*radial, 0.0)) : r;
+        if(closest > cull || (r > ESCAPE_RADIUS && radial > 0.0)){
+            return backgroundColor(color, weakFieldDirection(x/r, v/speed, r*Rs, Rs));
+        }
+        if(r < 1.0){//进入视界
+            return color;
+        }
+        vec3 x5, v5, a5;
+        float err = dopriStep(x, v, a, h2, dl, x5, v5, a5);
+        if(err <= 1.0){
+            float z0 = dot(x, DiskNormal);
+            float z1 = dot(x5, DiskNormal);
+            if(z0*z1 <= 0.0 && z0 != z1){
+                color = diskCrossing(color, x, v, x5, v5, dl, BHRPos, DiskDir, DiskNormal, Rs, RIn, ROut);
+            }
+            x = x5;
+            v = v5;
+            a = a5;
+            r = length(x);
+        }
+        dl = min(dl*stepFactor(err), RK_MAX_STEP_FRACTION*r);
+    }
+    return color;
+}
+#endif
+
+#ifdef KERR
+// 克尔黑洞（与 blackhole/kerr.py 相同）：Boyer–Lindquist 坐标、Mino 时间中的二阶方程，以 M = Rs/2 为单位，
+// 自旋轴为吸积盘法向；状态为 p = (r, θ, φ) 与 q = (r', θ')，每条光线的守恒量只在起点算一次
+#define KERR_MAX_SPIN 0.999
+#define KERR_HORIZON_MARGIN 1.01  // r 小于视界半径的该倍数时视为被捕获
+
+struct KerrRay {
+    float a, a2;      // 自旋及其平方
+    float L, L2;      // 绕自旋轴的角动量
+    float P0;         // r² + a² - aL 中与 r 无关的部分
+    float Q, K;       // Carter 常数，K = (L - a)² + Q
+    float sqrtK;
+};
+
+mat3 diskBasis(vec3 DiskDir)//列为吸积盘系的 x、y、z 轴（相机系），与 GetBHRot 互逆
+{
+    vec3 vecz = vec3(0.0, 0.0, 1.0);
+    if(DiskDir == vecz){
+        DiskDir += 0.0001*(vec3(1.0, 0., 0.));
+    }
+    vec3 _X = normalize(cross(vecz, DiskDir));
+    vec3 _Y = normalize(cross(DiskDir, _X));
+    return mat3(_X, _Y, normalize(DiskDir));
+}
+
+KerrRay kerrInit(vec3 x, vec3 d, float a, out vec3 p, out vec2 q)//x 为吸积盘系起点（单位 M），d 为单位方向
+{
+    KerrRay k;
+    k.a = a;
+    k.a2 = a*a;
+    // 笛卡尔 -> Boyer–Lindquist（远处视为平直的扁球坐标）
+    float b = dot(x, x) - k.a2;
+    float r = sqrt(0.5*(b + sqrt(b*b + 4.0*k.a2*x.z*x.z)));
+    float theta = acos(clamp(x.z/r, -1.0, 1.0));
+    float phi = atan(x.y, x.x);
+    float sinT = sin(theta), cosT = cos(theta);
+    vec3 eR = vec3(sinT*cos(phi), sinT*sin(phi), cosT);
+    vec3 eTheta = vec3(cosT*cos(phi), cosT*sin(phi), -sinT);
+
+    // 起点处切向与 d 一致：动量各分量取局部平直空间中的值乘以同一个因子 c，c 由 R(r) = r'² 确定
+    float sigmaK = r*r + k.a2*cosT*cosT;
+    float L = x.x*d.y - x.y*d.x;
+    float pTheta = sqrt(sigmaK)*dot(d, eTheta);
+    float dR = dot(d, eR);
+    float A0 = r*r + k.a2;
+    float delta = r*r - 2.0*r + k.a2;
+    float qa = k.a2*L*L - delta*(L*L + pTheta*pTheta + (cosT*L/sinT)*(cosT*L/sinT)) - (sigmaK*dR)*(sigmaK*dR);
+    float qb = 2.0*a*L*(delta - A0);
+    float qc = A0*A0 - delta*k.a2*sinT*sinT;
+    float c = (-qb - sqrt(max(qb*qb - 4.0*qa*qc, 0.0)))/(2.0*qa);
+
+    k.L = c*L;
+    k.L2 = k.L*k.L;
+    pTheta *= c;
+    k.Q = pTheta*pTheta + cosT*cosT*(k.L2/(sinT*sinT) - k.a2);
+    k.P0 = k.a2 - a*k.L;
+    k.K = (k.L - a)*(k.L - a) + k.Q;
+    k.sqrtK = sqrt(max(k.K, 0.0));
+    p = vec3(r, theta, phi);
+    q = vec2(c*sigmaK*dR, pTheta);
+    return k;
+}
+
+void kerrRhs(KerrRay k, vec3 p, vec2 q, out vec3 dp, out vec2 dq)
+{
+    float sinT = sin(p.y), cosT = cos(p.y);
+    float P = p.x*p.x + k.P0;
+    float delta = p.x*p.x - 2.0*p.x + k.a2;
+    dp = vec3(q, k.a*P/delta - k.a + k.L/(sinT*sinT));
+    dq = vec2(2.0*p.x*P - (p.x - 1.0)*k.K, k.L2*cosT/(sinT*sinT*sinT) - k.a2*cosT*sinT);
+}
+
+float kerrStep(KerrRay k, vec3 p, vec2 q, vec3 dp1, vec2 dq1, float dl,
+               out vec3 p5, out vec2 q5, out vec3 dp7, out vec2 dq7)//一次 Dormand–Prince 尝试，返回误差范数（<=1 时接受）
+{
+    vec3 dp2, dp3, dp4, dp5, dp6;
+    vec2 dq2, dq3, dq4, dq5, dq6;
+    kerrRhs(k, p + dl*(1.0/5.0*dp1), q + dl*(1.0/5.0*dq1), dp2, dq2);
+    kerrRhs(k, p + dl*(3.0/40.0*dp1 + 9.0/40.0*dp2), q + dl*(3.0/40.0*dq1 + 9.0/40.0*dq2), dp3, dq3);
+    kerrRhs(k, p + dl*(44.0/45.0*dp1 - 56.0/15.0*dp2 + 32.0/9.0*dp3),
+               q + dl*(44.0/45.0*dq1 - 56.0/15.0*dq2 + 32.0/9.0*dq3), dp4, dq4);
+    kerrRhs(k, p + dl*(19372.0/6561.0*dp1 - 25360.0/2187.0*dp2 + 64448.0/6561.0*dp3 - 212.0/729.0*dp4),
+               q + dl*(19372.0/6561.0*dq1 - 25360.0/2187.0*dq2 + 64448.0/6561.0*dq3 - 212.0/729.0*dq4), dp5, dq5);
+    kerrRhs(k, p + dl*(9017.0/3168.0*dp1 - 355.0/33.0*dp2 + 46732.0/5247.0*dp3 + 49.0/176.0*dp4
+                       - 5103.0/18656.0*dp5),
+               q + dl*(9017.0/3168.0*dq1 - 355.0/33.0*dq2 + 46732.0/5247.0*dq3 + 49.0/176.0*dq4
+                       - 5103.0/18656.0*dq5), dp6, dq6);
+    p5 = p + dl*(35.0/384.0*dp1 + 500.0/1113.0*dp3 + 125.0/192.0*dp4 - 2187.0/6784.0*dp5 + 11.0/84.0*dp6);
+    q5 = q + dl*(35.0/384.0*dq1 + 500.0/1113.0*dq3 + 125.0/192.0*dq4 - 2187.0/6784.0*dq5 + 11.0/84.0*dq6);
+    kerrRhs(k, p5, q5, dp7, dq7);//第 7 级，下一步的第 1 级 (FSAL)
+    // 5 阶解与 4 阶解之差；r 按相对误差，角度按绝对误差，r'、θ' 按各自的量级
+    vec3 pErr = dl*(71.0/57600.0*dp1 - 71.0/16695.0*dp3 + 71.0/1920.0*dp4 - 17253.0/339200.0*dp5
+                    + 22.0/525.0*dp6 - 1.0/40.0*dp7);
+    vec2 qErr = dl*(71.0/57600.0*dq1 - 71.0/16695.0*dq3 + 71.0/1920.0*dq4 - 17253.0/339200.0*dq5
+                    + 22.0/525.0*dq6 - 1.0/40.0*dq7);
+    float r = p5.x;
+    return max(max(abs(pErr.x)/r, max(abs(pErr.y), abs(pErr.z))),
+               max(abs(qErr.x)/(r*r + k.sqrtK*r), abs(qErr.y)/(k.sqrtK + 1.0)))/rayTolerance;
+}
+
+void kerrProject(KerrRay k, vec3 p, inout vec2 q, inout vec3 dp)//把 r'、θ' 的大小拉回首次积分 R(r)、Θ(θ) 上（大于 0 处）
+{
+    float P = p.x*p.x + k.P0;
+    float R = P*P - (p.x*p.x - 2.0*p.x + k.a2)*k.K;
+    float sinT = sin(p.y), cosT = cos(p.y);
+    float Theta = k.Q - cosT*cosT*(k.L2/(sinT*sinT) - k.a2);
+    if(R > 0.0){
+        q.x = q.x < 0.0 ? -sqrt(R) : sqrt(R);
+    }
+    if(Theta > 0.0){
+        q.y = q.y < 0.0 ? -sqrt(Theta) : sqrt(Theta);
+    }
+    dp.xy = q;
+}
+
+void kerrCartesian(KerrRay k, vec3 p, vec3 dp, out vec3 pos, out vec3 vel)//(r, θ, φ) 及其导数 -> 吸积盘系位置与速度（单位 M）
+{
+    float sinT = sin(p.y), cosT = cos(p.y);
+    float sinP = sin(p.z), cosP = cos(p.z);
+    float w = sqrt(p.x*p.x + k.a2);
+    float dw = p.x*dp.x/w;
+    pos = vec3(w*sinT*cosP, w*sinT*sinP, p.x*cosT);
+    vel = vec3(dw*sinT*cosP + w*(cosT*cosP*dp.y - sinT*sinP*dp.z),
+               dw*sinT*sinP + w*(cosT*sinP*dp.y + sinT*cosP*dp.z),
+               dp.x*cosT - p.x*sinT*dp.y);
+}
+
+vec4 traceKerr(vec3 PosToBH, vec3 RayDir, vec3 BHRPos, vec3 DiskDir, vec3 DiskNormal, float Rs,
+               float RIn, float ROut, float CullRadius, out int count)//克尔时空中的自适应积分，count 为尝试的步数
+{
+    vec4 color = vec4(0.0);
+    float M = 0.5*Rs;
+    mat3 basis = diskBasis(DiskDir);
+    vec3 p, dp;
+    vec2 q, dq;
+    KerrRay k = kerrInit(transpose(basis)*PosToBH/M, transpose(basis)*RayDir,
+                         clamp(spin, -KERR_MAX_SPIN, KERR_MAX_SPIN), p, q);
+    kerrRhs(k, p, q, dp, dq);
+    float capture = kerrHorizon*KERR_HORIZON_MARGIN;
+    float cull = CullRadius/M;
+    vec3 pos, vel;
+    kerrCartesian(k, p, dp, pos, vel);
+    float dl = RK_INITIAL_STEP*length(pos)/length(vel);
+    for(count = 0; count < RK_MAX_STEPS; count++){
+        // 与史瓦西模式相同的剔除与逃逸条件，之后的偏折按史瓦西弱场近似（远处拖曳可忽略）
+        float dist = length(pos);
+        float speed = length(vel);
+        float radial = dot(pos, vel)/(dist*speed);
+        float closest = radial < 0.0 ? dist*sqrt(max(1.0-radial*radial, 0.0)) : dist;
+        if(closest > cull || (dist > 2.0*ESCAPE_RADIUS && radial > 0.0)){
+            return backgroundColor(color, basis*weakFieldDirection(pos/dist, vel/speed, dist*M, Rs));
+        }
+        if(p.x < capture){//进入视界
+            return color;
+        }
+        vec3 p5, dp5;
+        vec2 q5, dq5;
+        float err = kerrStep(k, p, q, dp, dq, dl, p5, q5, dp5, dq5);
+        if(err <= 1.0){
+            // cosθ 变号即穿过赤道面（吸积盘平面）；(r, θ, φ) 的 Hermite 切向与导数只差因子 dl
+            float s0 = cos(p.y);
+            float s1 = cos(p5.y);
+            if(s0*s1 <= 0.0 && s0 != s1){
+                float t = crossingTime(s0, -sin(p.y)*dp.y, s1, -sin(p5.y)*dp5.y, dl);
+                vec3 diskPos, diskVel;
+                kerrCartesian(k, hermitePosition(p, dp, p5, dp5, dl, t), hermiteTangent(p, dp, p5, dp5, dl, t),
+                              diskPos, diskVel);
+                color = diskLayer(color, BHRPos + basis*diskPos*M, basis*normalize(diskVel), BHRPos, DiskDir,
+                                  DiskNormal, Rs, RIn, ROut);
+            }
+            p = p5;
+            q = q5;
+            dp = dp5;
+            dq = dq5;
+            kerrProject(k, p, q, dp);
+            kerrCartesian(k, p, dp, pos, vel);
+        }
+        dl = min(dl*stepFactor(err), RK_MAX_STEP_FRACTION*length(pos)/length(vel));
+    }
+    return color;
+}
+#endif
+
 float RandomStep(vec2 xy, float seed)//用于光线起点抖动的随机
 {
     return fract(sin(dot(xy.xy+fract(11.4514*sin(seed)), vec2(12.9898, 78.233)))* 43758.5453);
@@ -406,9 +944,9 @@ float RandomStep(vec2 xy, float seed)//用于光线起点抖动的随机
 void main() {
     // 使用传入的黑洞质量参数
     fragColor = vec4(0.,0.,0.,0.);
-    vec2 uv = gl_FragCoord.xy / iResolution.xy;
+    vec2 uv = (gl_FragCoord.xy + iTileOrigin) / iResolution.xy;
 
-    float MBH = 1.49e7;//单位是太阳质量本部分在实际使用时uniform输入
+    float MBH = MBlackHole;//单位是太阳质量
     float Rs = 2.*MBH*G0 / lightspeed / lightspeed * Msun;//单位是米 
     Rs=Rs/ly;//现在单位是ly 
     
@@ -437,14 +975,27 @@ void main() {
     // 在main函数顶部添加这些定义
     float timerate = 0.0; // 时间因子，暂时设为0
     vec3 WorldZ = vec3(0.0, 0.0, 1.0); // 世界坐标系Z轴
-    vec3 BHRDiskDir = vec3(1.0, 1.0, 1.0); // 吸积盘方向（法向量）
-    float RIn = 2.0 * Rs; // 吸积盘内半径（典型值：3倍史瓦西半径）
-    float ROut = 10.0 * Rs; // 吸积盘外半径（典型值：20倍史瓦西半径）
-    float diskA = 0.0; // 黑洞角动量参数（0-1，0为无自旋）
-    float TPeak4 = 1.0; // 温度峰值参数（无量纲）
-    float shiftMax = 1.0; // 最大多普勒频移因子
+    vec3 BHRDiskDir = diskDir; // 吸积盘方向（法向量）
+    float RIn = diskInner * Rs; // 吸积盘内半径
+    float ROut = diskOuter * Rs; // 吸积盘外半径
+    float diskA = spin; // 黑洞无量纲自旋 a/M（-1 到 1，0 为无自旋）
+    vec3 DiskNormal = normalize(BHRDiskDir);
+    float CullRadius = max(ROut + CULL_MARGIN*Rs, CULL_MIN_RADIUS*Rs);
 
+#ifdef DEFLECTION_LUT
+    fragColor = traceLut(PosToBH, RayDir, Rs, DiskNormal, RIn, ROut);
+#elif defined(KERR)
+    fragColor = traceKerr(PosToBH, RayDir, BHRPos, BHRDiskDir, DiskNormal, Rs, RIn, ROut, CullRadius, count);
+#elif defined(ADAPTIVE_RK)
+    fragColor = traceAdaptive(PosToBH, RayDir, BHRPos, BHRDiskDir, DiskNormal, Rs, RIn, ROut, CullRadius, count);
+#else
     while(flag==true){//测地raymarching
+        // 最近距离（靠近时为碰撞参数，远离时为当前距离）在剔除半径外的光线不会碰到吸积盘，直接按弱场偏折查背景
+        float cosR = dot(NPosToBH, RayDir);
+        if((cosR < 0.0 ? Dis*sqrt(max(1.0-cosR*cosR, 0.0)) : Dis) > CullRadius){
+            fragColor = backgroundColor(fragColor, weakFieldDirection(NPosToBH, RayDir, Dis, Rs));
+            break;
+        }
         lastRayPos = RayPos;
         lastRayDir = RayDir;
         lastR = Dis;
@@ -481,34 +1032,36 @@ void main() {
         Dis = length(PosToBH);
         NPosToBH = PosToBH/Dis;
 
-        fragColor=diskColor(fragColor, timerate, steplength, RayPos, lastRayPos, RayDir, lastRayDir, 
-                            WorldZ, BHRPos, BHRDiskDir, Rs, RIn, ROut, diskA, TPeak4, shiftMax);//吸积盘颜色
+        if(abs(dot(DiskNormal, PosToBH)) < 0.5*Rs && Dis > RIn){//只有在吸积盘薄层内才计算吸积盘颜色
+            fragColor=diskColor(fragColor, timerate, steplength, RayPos, lastRayPos, RayDir, lastRayDir, 
+                                WorldZ, BHRPos, BHRDiskDir, Rs, RIn, ROut, diskA, TPeak4, shiftMax);//吸积盘颜色
+        }
         
         count++;
         if(Dis>(100.*Rs) && Dis>lastR && count>50){//远离黑洞
             flag = false;
             
-            // 根据背景类型选择不同的背景
-            if (backgroundType == 0) { // 棋盘背景
-                uv = DirTouv(RayDir);
-                fragColor+=0.5*texelFetch(iChannel1, ivec2(vec2(fract(uv.x),fract(uv.y))*iChannelResolution.xy), 0)*(1.0-fragColor.a);            
-            } else if (backgroundType == 1) { // 纯黑背景
-                fragColor += vec4(0.0, 0.0, 0.0, 1.0) * (1.0 - fragColor.a);
-            } else { // 其他背景类型暂时使用棋盘背景
-                uv = DirTouv(RayDir);
-                fragColor+=0.5*texelFetch(iChannel1, ivec2(vec2(fract(uv.x),fract(uv.y))*iChannelResolution.xy), 0)*(1.0-fragColor.a);
-            }
+            fragColor = backgroundColor(fragColor, RayDir);
         }
         if(Dis < 0.1 * Rs){//命中奇点
             flag = false;
         }
     }
+#endif
+#ifdef STEP_COUNT
+    // 调试输出：每像素步进次数（查找表模式为 0），不参与时间累积
+    fragColor = vec4(vec3(float(count)), 1.0);
+    return;
+#endif
     fragColor.a = 1.0;
 
-    // float blendWeight = 1.0-pow(0.5,(iTimeDelta)/max(min((0.131*36.0/(timerate)*(omega(3.*0.00000465,0.00000465))/(omega(3.*Rs,Rs))),0.3),0.02));//本部分在实际使用时max(min((0.131*36.0/(timerate)*(omega(3.*0.00000465,0.00000465))/(omega(3.*Rs,Rs))),0.3),0.02)由uniform输入
-    // blendWeight = (iFrame<2 || iMouse.z > 0.0 ) ? 1.0 : blendWeight;
-    
-    // vec4 previousColor = texelFetch(iChannel3, ivec2(fragCoord), 0); //获取前一帧的颜色
-    // fragColor = (blendWeight)*fragColor+(1.0-blendWeight)*previousColor; //混合当前帧和前一帧
-
+    // 时间累积：静态场景下逐帧取平均，accumHalfLife>0 时保留一个最小权重以跟随动画
+    float blendWeight = 1.0/float(iAccumFrame+1);
+    if(accumHalfLife > 0.0){
+        blendWeight = max(blendWeight, 1.0-pow(0.5, iTimeDelta/accumHalfLife));
+    }
+    if(iAccumFrame > 0){
+        vec4 previousColor = texelFetch(iChannel3, ivec2(gl_FragCoord.xy), 0); //获取前一帧的颜色
+        fragColor = (blendWeight)*fragColor+(1.0-blendWeight)*previousColor; //混合当前帧和前一帧
+    }
 }
\ No newline at end of file
@@ -0,0 +1,40 @@
+#version 430 core
+// 最终通道：HDR 场景（可能是缩小的累积缓冲，双线性放大）叠加泛光，乘曝光后做色调映射
+in vec2 fragCoord;
+out vec4 outColor;
+
+uniform sampler2D sceneTexture;   // 光线步进的 HDR 累积结果
+#ifdef BLOOM
+uniform sampler2D bloomTexture;   // 泛光链的输出（各级之和）
+uniform float bloomStrength;
+uniform float bloomLevels;        // 泛光链级数，用于把各级之和归一化
+#endif
+uniform float exposure;           // 线性曝光倍数
+uniform int tonemapOperator;      // 0: 截断, 1: ACES, 2: Reinhard, 3: 指数曝光
+
+vec3 acesFilm(vec3 x)//ACES 电影曲线的有理函数拟合 (Narkowicz 2015)
+{
+    return clamp(x*(2.51*x + 0.03)/(x*(2.43*x + 0.59) + 0.14), 0.0, 1.0);
+}
+
+vec3 reinhard(vec3 x)//按亮度压缩，保持色相
+{
+    float luminance = dot(x, vec3(0.2126, 0.7152, 0.0722));
+    return x/(1.0 + luminance);
+}
+
+void main() {
+    vec3 color = texture(sceneTexture, fragCoord).rgb;
+#ifdef BLOOM
+    color += bloomStrength*texture(bloomTexture, fragCoord).rgb/bloomLevels;
+#endif
+    color *= exposure;
+    if (tonemapOperator == 1) {
+        color = acesFilm(color);
+    } else if (tonemapOperator == 2) {
+        color = reinhard(color);
+    } else if (tonemapOperator == 3) {
+        color = 1.0 - exp(-color);
+    }
+    outColor = vec4(clamp(color, 0.0, 1.0), 1.0);
+}
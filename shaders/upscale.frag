@@ -0,0 +1,27 @@
+#version 430 core
+in vec2 fragCoord;
+out vec4 outColor;
+
+uniform sampler2D sourceTexture;  // 低分辨率光线步进结果
+uniform vec2 sourceSize;          // 源纹理尺寸（像素）
+uniform float sharpness;          // 0: 纯双线性, >0: 边缘保持锐化
+
+void main() {
+    vec2 uv = fragCoord;
+    vec4 color = texture(sourceTexture, uv);  // 硬件双线性插值
+
+    if (sharpness > 0.0) {
+        // 四邻域锐化，结果限制在邻域最小/最大值之间，避免边缘振铃
+        vec2 texel = 1.0 / sourceSize;
+        vec4 n = texture(sourceTexture, uv + vec2(0.0, texel.y));
+        vec4 s = texture(sourceTexture, uv - vec2(0.0, texel.y));
+        vec4 e = texture(sourceTexture, uv + vec2(texel.x, 0.0));
+        vec4 w = texture(sourceTexture, uv - vec2(texel.x, 0.0));
+        vec4 lo = min(min(min(n, s), min(e, w)), color);
+        vec4 hi = max(max(max(n, s), max(e, w)), color);
+        vec4 sharp = color + sharpness * (4.0 * color - n - s - e - w) * 0.25;
+        color = clamp(sharp, lo, hi);
+    }
+
+    outColor = vec4(color.rgb, 1.0);
+}
@@ -0,0 +1,9 @@
+#version 430 core
+layout(location = 0) in vec2 position;
+out vec2 fragCoord;
+
+void main() {
+    gl_Position = vec4(position, 0.0, 1.0);
+    // 由全屏矩形顶点位置得到纹理坐标
+    fragCoord = position * 0.5 + 0.5;
+}
@@ -1,11 +1,17 @@
+import os
+
 from PyQt6.QtWidgets import (QFrame, QVBoxLayout, QGroupBox, QPushButton, 
-                            QSlider, QLabel, QVBoxLayout, QHBoxLayout)
+                            QSlider, QLabel, QVBoxLayout, QHBoxLayout, QCheckBox, QFileDialog, QComboBox)
 from PyQt6.QtGui import QColor
 from PyQt6.QtCore import Qt
 from PyQt6.QtCore import pyqtSignal
 
+from blackhole.kerr import iscoRadius
+from blackhole.params import TONEMAP_OPERATORS
+
 class ControlPanel(QFrame):
     backgroundTypeChanged = pyqtSignal(int)  # 背景类型信号
+    backgroundPathChanged = pyqtSignal(str)  # 纹理背景的全景图路径
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -69,8 +75,227 @@ class ControlPanel(QFrame):
         
         # 添加按钮布局到组框
         bg_layout.addLayout(bg_button_layout)
+
+        # 纹理背景使用的等距柱状投影全景图
+        self.background_path = ""
+        self.bg_path_btn = QPushButton("Load Panorama...")
+        self.bg_path_btn.setFixedHeight(30)
+        self.bg_path_btn.clicked.connect(self.choosePanorama)
+        bg_layout.addWidget(self.bg_path_btn)
+        self.bg_path_label = QLabel("No panorama loaded")
+        self.bg_path_label.setWordWrap(True)
+        bg_layout.addWidget(self.bg_path_label)
         
         control_layout.addWidget(self.bg_group)
+
+        # 黑洞与吸积盘参数
+        self.physics_group = QGroupBox("Black Hole")
+        physics_layout = QVBoxLayout(self.physics_group)
+        physics_layout.setSpacing(8)
+        physics_layout.setContentsMargins(10, 20, 10, 10)
+
+        mass_row = QHBoxLayout()
+        mass_row.addWidget(QLabel("Mass"))
+        self.mass_slider = QSlider(Qt.Orientation.Horizontal)
+        self.mass_slider.setRange(1, 1000)  # × 10⁵ 太阳质量
+        self.mass_slider.setValue(149)
+        self.mass_slider.valueChanged.connect(self.onMassChanged)
+        mass_row.addWidget(self.mass_slider)
+        self.mass_value_label = QLabel("14.90 × 10⁶")
+        mass_row.addWidget(self.mass_value_label)
+        physics_layout.addLayout(mass_row)
+
+        spin_row = QHBoxLayout()
+        spin_row.addWidget(QLabel("Spin a/M"))
+        self.spin_slider = QSlider(Qt.Orientation.Horizontal)
+        self.spin_slider.setRange(-99, 99)  # 0.01，负值为逆向旋转的吸积盘
+        self.spin_slider.setValue(0)
+        self.spin_slider.valueChanged.connect(self.onSpinChanged)
+        spin_row.addWidget(self.spin_slider)
+        self.spin_label = QLabel("0.00")
+        spin_row.addWidget(self.spin_label)
+        physics_layout.addLayout(spin_row)
+
+        inner_row = QHBoxLayout()
+        inner_row.addWidget(QLabel("Disk inner"))
+        self.disk_inner_slider = QSlider(Qt.Orientation.Horizontal)
+        self.disk_inner_slider.setRange(10, 100)  # 0.1 Rs
+        self.disk_inner_slider.setValue(20)
+        self.disk_inner_slider.valueChanged.connect(self.onDiskRadiiChanged)
+        inner_row.addWidget(self.disk_inner_slider)
+        self.disk_inner_label = QLabel("2.0 Rs")
+        inner_row.addWidget(self.disk_inner_label)
+        physics_layout.addLayout(inner_row)
+
+        self.isco_check = QCheckBox("Inner edge at ISCO")
+        self.isco_check.toggled.connect(self.onIscoToggled)
+        physics_layout.addWidget(self.isco_check)
+
+        outer_row = QHBoxLayout()
+        outer_row.addWidget(QLabel("Disk outer"))
+        self.disk_outer_slider = QSlider(Qt.Orientation.Horizontal)
+        self.disk_outer_slider.setRange(20, 300)  # 0.1 Rs
+        self.disk_outer_slider.setValue(100)
+        self.disk_outer_slider.valueChanged.connect(self.onDiskRadiiChanged)
+        outer_row.addWidget(self.disk_outer_slider)
+        self.disk_outer_label = QLabel("10.0 Rs")
+        outer_row.addWidget(self.disk_outer_label)
+        physics_layout.addLayout(outer_row)
+
+        self.blackbody_check = QCheckBox("Blackbody disk colour (Doppler + gravitational shift)")
+        self.blackbody_check.setChecked(True)
+        self.blackbody_check.toggled.connect(self.onBlackbodyToggled)
+        physics_layout.addWidget(self.blackbody_check)
+
+        temperature_row = QHBoxLayout()
+        temperature_row.addWidget(QLabel("Disk peak T"))
+        self.disk_temperature_slider = QSlider(Qt.Orientation.Horizontal)
+        self.disk_temperature_slider.setRange(2, 80)  # × 500 K
+        self.disk_temperature_slider.setValue(16)
+        self.disk_temperature_slider.valueChanged.connect(self.onDiskTemperatureChanged)
+        temperature_row.addWidget(self.disk_temperature_slider)
+        self.disk_temperature_label = QLabel("8000 K")
+        temperature_row.addWidget(self.disk_temperature_label)
+        physics_layout.addLayout(temperature_row)
+
+        turbulence_row = QHBoxLayout()
+        turbulence_row.addWidget(QLabel("Turbulence"))
+        self.disk_turbulence_slider = QSlider(Qt.Orientation.Horizontal)
+        self.disk_turbulence_slider.setRange(0, 100)  # 百分比
+        self.disk_turbulence_slider.setValue(60)
+        self.disk_turbulence_slider.valueChanged.connect(self.onDiskTurbulenceChanged)
+        turbulence_row.addWidget(self.disk_turbulence_slider)
+        self.disk_turbulence_label = QLabel("60%")
+        turbulence_row.addWidget(self.disk_turbulence_label)
+        physics_layout.addLayout(turbulence_row)
+
+        self.animate_disk_check = QCheckBox("Animate disk turbulence (never idles)")
+        self.animate_disk_check.toggled.connect(self.animateDiskChanged.emit)
+        physics_layout.addWidget(self.animate_disk_check)
+
+        control_layout.addWidget(self.physics_group)
+        
+        # 渲染分辨率部分
+        self.scale_group = QGroupBox("Render Resolution")
+        scale_layout = QVBoxLayout(self.scale_group)
+        scale_layout.setSpacing(8)
+        scale_layout.setContentsMargins(10, 20, 10, 10)
+
+        scale_row = QHBoxLayout()
+        scale_row.addWidget(QLabel("Scale"))
+        self.scale_slider = QSlider(Qt.Orientation.Horizontal)
+        self.scale_slider.setRange(25, 100)  # 百分比
+        self.scale_slider.setValue(100)
+        self.scale_slider.valueChanged.connect(self.onRenderScaleChanged)
+        scale_row.addWidget(self.scale_slider)
+        self.scale_value_label = QLabel("100%")
+        scale_row.addWidget(self.scale_value_label)
+        scale_layout.addLayout(scale_row)
+
+        self.auto_scale_check = QCheckBox("Auto (hold 60 FPS, full resolution when idle)")
+        self.auto_scale_check.toggled.connect(self.onAutoScaleToggled)
+        scale_layout.addWidget(self.auto_scale_check)
+
+        control_layout.addWidget(self.scale_group)
+
+        # HDR 后处理（色调映射、曝光、泛光）
+        self.post_group = QGroupBox("Post Processing")
+        post_layout = QVBoxLayout(self.post_group)
+        post_layout.setSpacing(8)
+        post_layout.setContentsMargins(10, 20, 10, 10)
+
+        tonemap_row = QHBoxLayout()
+        tonemap_row.addWidget(QLabel("Tone map"))
+        self.tonemap_combo = QComboBox()
+        self.tonemap_combo.addItems(["None (clamp)", "ACES", "Reinhard", "Exposure"])
+        self.tonemap_combo.setCurrentIndex(TONEMAP_OPERATORS.index("aces"))
+        self.tonemap_combo.currentIndexChanged.connect(self.tonemapChanged.emit)
+        tonemap_row.addWidget(self.tonemap_combo)
+        post_layout.addLayout(tonemap_row)
+
+        exposure_row = QHBoxLayout()
+        exposure_row.addWidget(QLabel("Exposure"))
+        self.exposure_slider = QSlider(Qt.Orientation.Horizontal)
+        self.exposure_slider.setRange(-40, 40)  # × 0.1 EV
+        self.exposure_slider.setValue(0)
+        self.exposure_slider.valueChanged.connect(self.onExposureChanged)
+        exposure_row.addWidget(self.exposure_slider)
+        self.exposure_label = QLabel("+0.0 EV")
+        exposure_row.addWidget(self.exposure_label)
+        post_layout.addLayout(exposure_row)
+
+        bloom_row = QHBoxLayout()
+        bloom_row.addWidget(QLabel("Bloom"))
+        self.bloom_slider = QSlider(Qt.Orientation.Horizontal)
+        self.bloom_slider.setRange(0, 100)  # 百分比
+        self.bloom_slider.setValue(30)
+        self.bloom_slider.valueChanged.connect(self.onBloomChanged)
+        bloom_row.addWidget(self.bloom_slider)
+        self.bloom_label = QLabel("30%")
+        bloom_row.addWidget(self.bloom_label)
+        post_layout.addLayout(bloom_row)
+
+        control_layout.addWidget(self.post_group)
+
+        # 光线追踪方式
+        self.trace_group = QGroupBox("Ray Tracing")
+        trace_layout = QVBoxLayout(self.trace_group)
+        trace_layout.setSpacing(8)
+        trace_layout.setContentsMargins(10, 20, 10, 10)
+
+        self.lut_check = QCheckBox("Deflection lookup table (fast, static disk)")
+        self.lut_check.toggled.connect(self.deflectionLutChanged.emit)
+        trace_layout.addWidget(self.lut_check)
+
+        self.adaptive_check = QCheckBox("Adaptive RK integrator (Dormand-Prince)")
+        self.adaptive_check.toggled.connect(self.integratorChanged.emit)
+        trace_layout.addWidget(self.adaptive_check)
+
+        control_layout.addWidget(self.trace_group)
+
+        # 着色器热重载
+        self.shader_group = QGroupBox("Shaders")
+        shader_layout = QVBoxLayout(self.shader_group)
+        shader_layout.setSpacing(6)
+        shader_layout.setContentsMargins(10, 20, 10, 10)
+
+        self.hot_reload_check = QCheckBox("Hot reload shaders/ on save")
+        self.hot_reload_check.setChecked(True)
+        self.hot_reload_check.toggled.connect(self.shaderHotReloadToggled.emit)
+        shader_layout.addWidget(self.hot_reload_check)
+
+        self.shader_status_label = QLabel("Watching for changes")
+        self.shader_status_label.setWordWrap(True)
+        self.shader_status_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        shader_layout.addWidget(self.shader_status_label)
+
+        control_layout.addWidget(self.shader_group)
+        
+        # 性能统计部分
+        self.stats_group = QGroupBox("Performance")
+        stats_layout = QVBoxLayout(self.stats_group)
+        stats_layout.setSpacing(6)
+        stats_layout.setContentsMargins(10, 20, 10, 10)
+
+        self.fps_label = QLabel("-- FPS")
+        stats_layout.addWidget(self.fps_label)
+        self.frame_time_label = QLabel("Frame  p50 --  p95 --  p99 -- ms")
+        stats_layout.addWidget(self.frame_time_label)
+        self.gpu_time_label = QLabel("GPU march  p50 --  p95 --  p99 -- ms")
+        stats_layout.addWidget(self.gpu_time_label)
+        self.cpu_time_label = QLabel("CPU  paint -- ms  uniforms -- ms")
+        stats_layout.addWidget(self.cpu_time_label)
+
+        stats_toggle_row = QHBoxLayout()
+        self.overlay_check = QCheckBox("Show overlay")
+        self.overlay_check.toggled.connect(self.overlayToggled.emit)
+        stats_toggle_row.addWidget(self.overlay_check)
+        self.csv_log_check = QCheckBox("Log CSV")
+        self.csv_log_check.toggled.connect(self.csvLoggingToggled.emit)
+        stats_toggle_row.addWidget(self.csv_log_check)
+        stats_layout.addLayout(stats_toggle_row)
+
+        control_layout.addWidget(self.stats_group)
         
         # 添加拉伸因子使控件居中
         control_layout.addStretch(1)
@@ -90,7 +315,7 @@ class ControlPanel(QFrame):
         control_layout.addWidget(self.ratio_group)
         
         # 添加页脚
-        self.footer_label = QLabel("© 2023 OpenGL PyQt6 Demo | Dark Theme | MSAA Enabled")
+        self.footer_label = QLabel("© 2023 OpenGL PyQt6 Demo | Dark Theme | Temporal Accumulation")
         self.footer_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         control_layout.addWidget(self.footer_label)
 
@@ -99,8 +324,26 @@ class ControlPanel(QFrame):
         self.ratio_label.setText(ratio_text)
         
         # 添加这个方法
+    def choosePanorama(self):
+        """选择全景图，选中后切换到纹理背景；返回是否选择了文件"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Load Panorama", self.background_path,
+            "Panoramas (*.png *.jpg *.jpeg *.exr *.hdr *.npy);;All Files (*)")
+        if not path:
+            return False
+        self.background_path = path
+        self.bg_path_label.setText(os.path.basename(path))
+        self.backgroundPathChanged.emit(path)
+        self.setBackgroundType(3)
+        return True
+
     def setBackgroundType(self, bg_type):
         """设置背景类型并发出信号"""
+        if bg_type == 3 and not self.background_path:
+            # 纹理背景需要先选择全景图，取消时保持原来的背景
+            if not self.choosePanorama():
+                self.bg_texture_btn.setChecked(False)
+            return
         # 确保只有一个按钮被选中
         if bg_type == 0:
             self.bg_chess_btn.setChecked(True)
@@ -125,24 +368,94 @@ class ControlPanel(QFrame):
             
         self.backgroundTypeChanged.emit(bg_type)
 
-    def onOffsetChanged(self):
-        """偏移改变时处理"""
-        x = self.x_slider.value() / 100.0
-        y = self.y_slider.value() / 100.0
-        
-        # 更新标签显示
-        self.x_value_label.setText(f"{x:.2f}")
-        self.y_value_label.setText(f"{y:.2f}")
-        
-        # 发出信号
-        self.offsetChanged.emit(x, y)
-        
-    def onRadiusChanged(self, value):
-        """半径改变时处理"""
-        radius = value / 100.0
-        self.radius_value_label.setText(f"{radius:.2f}")
-        self.radiusChanged.emit(radius)
-        
+    def setStats(self, stats):
+        """显示 FrameProfiler.stats() 的结果"""
+        self.fps_label.setText(f"{stats.get('fps', 0.0):.1f} FPS")
+
+        def percentiles(name):
+            s = stats.get(name)
+            if not s:
+                return "p50 --  p95 --  p99 --"
+            return f"p50 {s['p50']:.2f}  p95 {s['p95']:.2f}  p99 {s['p99']:.2f}"
+
+        self.frame_time_label.setText(f"Frame  {percentiles('frame')} ms")
+        self.gpu_time_label.setText(f"GPU march  {percentiles('gpu.march')} ms")
+        paint = stats.get("cpu", {}).get("p50")
+        uniforms = stats.get("cpu.uniforms", {}).get("p50")
+        self.cpu_time_label.setText(
+            "CPU  paint {} ms  uniforms {} ms".format(
+                f"{paint:.2f}" if paint is not None else "--",
+                f"{uniforms:.2f}" if uniforms is not None else "--"))
+
+    def setShaderStatus(self, text, ok=True):
+        """显示着色器热重载结果，失败时显示编译日志"""
+        self.shader_status_label.setStyleSheet(
+            "" if ok else "color: #ff8080; font-family: monospace; font-size: 10px;")
+        self.shader_status_label.setText(text)
+
+    def onRenderScaleChanged(self, value):
+        """渲染比例改变时处理"""
+        self.scale_value_label.setText(f"{value}%")
+        self.renderScaleChanged.emit(value / 100.0)
+
+    def onAutoScaleToggled(self, enabled):
+        """自动分辨率开关"""
+        self.scale_slider.setEnabled(not enabled)
+        self.autoScaleChanged.emit(enabled)
+
+    def onSpinChanged(self, value):
+        """自旋改变时处理，内边缘取 ISCO 时随之更新"""
+        spin = value / 100.0
+        self.spin_label.setText(f"{spin:.2f}")
+        self.spinChanged.emit(spin)
+        if self.isco_check.isChecked():
+            self.onDiskRadiiChanged()
+
+    def onIscoToggled(self, enabled):
+        """吸积盘内边缘取 ISCO（随自旋变化）时禁用内半径滑块"""
+        self.disk_inner_slider.setEnabled(not enabled)
+        self.onDiskRadiiChanged()
+
+    def onDiskRadiiChanged(self, _value=None):
+        """吸积盘半径改变时处理，外半径不小于内半径"""
+        inner = self.disk_inner_slider.value() / 10.0
+        if self.isco_check.isChecked():
+            inner = iscoRadius(self.spin_slider.value() / 100.0)
+            self.disk_inner_slider.blockSignals(True)
+            self.disk_inner_slider.setValue(round(inner * 10.0))
+            self.disk_inner_slider.blockSignals(False)
+        outer = max(self.disk_outer_slider.value() / 10.0, inner)
+        self.disk_inner_label.setText(f"{inner:.1f} Rs")
+        self.disk_outer_label.setText(f"{outer:.1f} Rs")
+        self.diskRadiiChanged.emit(inner, outer)
+
+    def onBlackbodyToggled(self, enabled):
+        """吸积盘黑体着色开关（1: 查找表, 0: 灰色）"""
+        self.disk_temperature_slider.setEnabled(enabled)
+        self.diskShadingChanged.emit(1 if enabled else 0)
+
+    def onDiskTemperatureChanged(self, value):
+        """吸积盘最高温度改变时处理"""
+        temperature = value * 500.0
+        self.disk_temperature_label.setText(f"{temperature:.0f} K")
+        self.diskTemperatureChanged.emit(temperature)
+
+    def onDiskTurbulenceChanged(self, value):
+        """吸积盘湍流强度改变时处理"""
+        self.disk_turbulence_label.setText(f"{value}%")
+        self.diskTurbulenceChanged.emit(value / 100.0)
+
+    def onExposureChanged(self, value):
+        """曝光（EV）改变时处理，发出的是曝光倍数"""
+        ev = value / 10.0
+        self.exposure_label.setText(f"{ev:+.1f} EV")
+        self.exposureChanged.emit(2.0 ** ev)
+
+    def onBloomChanged(self, value):
+        """泛光强度改变时处理"""
+        self.bloom_label.setText(f"{value}%")
+        self.bloomChanged.emit(value / 100.0)
+
     def onMassChanged(self, value):
         """质量改变时处理"""
         mass = value * 1e5  # 转换为太阳质量单位 (10^5 * value)
@@ -157,18 +470,27 @@ class ControlPanel(QFrame):
             self.mass_value_label.setText(f"{base:.2f} × 10⁵")
         self.massChanged.emit(mass)
         
-    def customColorRequested(self):
-        self.customColorClicked.emit()
-
 # 为控件面板添加背景类型信号
 class ControlPanelSignals(ControlPanel):
-    colorSelected = pyqtSignal(float, float, float)
-    customColorClicked = pyqtSignal()
-    offsetChanged = pyqtSignal(float, float)
-    radiusChanged = pyqtSignal(float)
     requestAspectRatioUpdate = pyqtSignal()
-    massChanged = pyqtSignal(float)
+    massChanged = pyqtSignal(float)         # 黑洞质量（太阳质量单位）
+    spinChanged = pyqtSignal(float)         # 无量纲自旋 a/M
+    diskRadiiChanged = pyqtSignal(float, float)  # 吸积盘内、外半径（Rs）
+    diskShadingChanged = pyqtSignal(int)    # 吸积盘着色方式（0: 灰色, 1: 黑体查找表）
+    diskTemperatureChanged = pyqtSignal(float)  # 吸积盘最高温度（K）
+    diskTurbulenceChanged = pyqtSignal(float)   # 吸积盘湍流强度（0 ~ 1）
+    animateDiskChanged = pyqtSignal(bool)       # 吸积盘湍流转动开关
     backgroundTypeChanged = pyqtSignal(int)  # 新增背景类型信号
+    renderScaleChanged = pyqtSignal(float)  # 渲染比例 (0.25 ~ 1.0)
+    autoScaleChanged = pyqtSignal(bool)     # 自动分辨率开关
+    tonemapChanged = pyqtSignal(int)        # 色调映射算子（TONEMAP_OPERATORS 的下标）
+    exposureChanged = pyqtSignal(float)     # 曝光倍数
+    bloomChanged = pyqtSignal(float)        # 泛光强度（0 ~ 1）
+    overlayToggled = pyqtSignal(bool)       # 画布上的帧时间叠加显示
+    csvLoggingToggled = pyqtSignal(bool)    # 帧时间 CSV 日志
+    deflectionLutChanged = pyqtSignal(bool) # 偏折查找表模式开关
+    integratorChanged = pyqtSignal(bool)    # 自适应积分开关
+    shaderHotReloadToggled = pyqtSignal(bool)  # 着色器热重载开关
 
 # 合并信号类
 class ControlPanel(ControlPanelSignals):
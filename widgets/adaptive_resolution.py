@@ -0,0 +1,56 @@
+import math
+
+
+class ResolutionController:
+    """根据测得的 GPU 帧时间自动调整光线步进的渲染比例
+
+    光线步进的开销与像素数成正比，即与比例的平方成正比，因此按
+    sqrt(目标帧时间 / 实测帧时间) 修正比例；视图空闲时直接回到全分辨率。
+    """
+
+    def __init__(self, target_fps=60.0, min_scale=0.25, max_scale=1.0,
+                 idle_timeout=0.5, step=0.05):
+        self.target_fps = target_fps
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.idle_timeout = idle_timeout  # 无交互多少秒后视为空闲
+        self.step = step                  # 比例量化步长，避免频繁重建缓冲
+        self.scale = max_scale
+        self.smoothed_ms = None
+        self.last_activity = -math.inf
+
+    def setTargetFps(self, fps):
+        self.target_fps = max(1.0, float(fps))
+
+    def markActivity(self, now):
+        """记录一次交互（拖动视角、修改参数等）"""
+        self.last_activity = now
+
+    def isIdle(self, now):
+        return now - self.last_activity > self.idle_timeout
+
+    def update(self, gpu_ms, now):
+        """输入最近一帧的 GPU 时间（毫秒，可为 None），返回新的渲染比例"""
+        if self.isIdle(now):
+            # 空闲时以全分辨率累积出清晰画面
+            self.smoothed_ms = None
+            self.scale = self.max_scale
+            return self.scale
+        if gpu_ms is None or gpu_ms <= 0.0:
+            return self.scale
+
+        # 指数平滑，避免单帧抖动造成比例来回跳变
+        if self.smoothed_ms is None:
+            self.smoothed_ms = gpu_ms
+        else:
+            self.smoothed_ms += 0.2 * (gpu_ms - self.smoothed_ms)
+
+        budget_ms = 1000.0 / self.target_fps
+        wanted = self.scale * math.sqrt(budget_ms / self.smoothed_ms)
+        wanted = min(self.max_scale, max(self.min_scale, wanted))
+        wanted = round(wanted / self.step) * self.step
+        if abs(wanted - self.scale) >= self.step - 1e-9:
+            self.scale = wanted
+            # 比例变化后旧的帧时间不再有代表性
+            self.smoothed_ms = None
+        return self.scale
@@ -0,0 +1,159 @@
+import numpy as np
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from OpenGL import GL as gl
+
+from blackhole import procedural, starfield
+
+UPLOAD_CHUNK_BYTES = 4 << 20  # 每帧最多上传的数据量，大全景图分多帧上传
+
+
+def backgroundKey(params):
+    """背景图像的标识：星空为 (2, 种子)，纹理为 (3, 路径)，其他类型为 None"""
+    if params["backgroundType"] == 2:
+        return (2, params["starSeed"])
+    if params["backgroundType"] == 3 and params["backgroundPath"]:
+        return (3, params["backgroundPath"])
+    return None
+
+
+def loadBackground(key):
+    """按背景标识生成星空或读取全景图"""
+    kind, value = key
+    if kind == 2:
+        return procedural.generate("starfield", seed=value)
+    return starfield.loadPanorama(value)
+
+
+class BackgroundLoadWorker(QObject):
+    """在后台线程生成星空或读取全景图"""
+
+    loaded = pyqtSignal(object, object)  # 背景标识, (height, width, 4) float32
+    failed = pyqtSignal(object, str)     # 背景标识, 错误信息
+
+    @pyqtSlot(object)
+    def load(self, key):
+        try:
+            image = loadBackground(key)
+        except (OSError, RuntimeError, ValueError) as error:
+            self.failed.emit(key, str(error))
+            return
+        self.loaded.emit(key, image)
+
+
+class BackgroundLoader(QObject):
+    """背景图像的异步加载，只转发最近一次请求的结果"""
+
+    loaded = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+    loadRequested = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = None
+        self.load_thread = QThread(self)
+        self.worker = BackgroundLoadWorker()
+        self.worker.moveToThread(self.load_thread)
+        self.loadRequested.connect(self.worker.load)
+        self.worker.loaded.connect(self.onLoaded)
+        self.worker.failed.connect(self.onFailed)
+        self.load_thread.start()
+
+    def request(self, key):
+        if key is None or key == self.pending:
+            return
+        self.pending = key
+        self.loadRequested.emit(key)
+
+    def onLoaded(self, key, image):
+        if key != self.pending:
+            return  # 加载期间又切换了背景
+        self.pending = None
+        self.loaded.emit(key, image)
+
+    def onFailed(self, key, message):
+        if key != self.pending:
+            return
+        self.pending = None
+        self.failed.emit(message)
+
+    def shutdown(self):
+        self.load_thread.quit()
+        self.load_thread.wait()
+
+
+class BackgroundTexture:
+    """等距柱状投影背景纹理 (RGBA16F + mipmap)
+
+    新图像按行分块上传到一个新纹理中，每次 uploadChunk 最多上传 UPLOAD_CHUNK_BYTES，
+    全部上传后生成 mipmap 再替换当前纹理，上传期间继续使用旧纹理。需在 GL 上下文中调用。
+    """
+
+    def __init__(self):
+        self.texture = None  # 当前可用的纹理
+        self.key = None      # 当前纹理对应的背景标识
+        self._image = None
+        self._image_key = None
+        self._staging = None
+        self._row = 0
+
+    @property
+    def uploading(self):
+        return self._image is not None
+
+    def setImage(self, key, image):
+        """登记待上传的图像（不需要 GL 上下文），之前未完成的上传被丢弃"""
+        self._image = np.ascontiguousarray(image, dtype=np.float32)
+        self._image_key = key
+        self._row = 0
+
+    def textureFor(self, params):
+        """与当前参数匹配的纹理，没有时返回 0（着色器退回棋盘背景）"""
+        key = backgroundKey(params)
+        return self.texture if key is not None and key == self.key else 0
+
+    def uploadChunk(self):
+        """上传下一块，返回本次是否换入了新纹理"""
+        if self._image is None:
+            return False
+        height, width = self._image.shape[:2]
+        if self._row == 0:
+            if self._staging is not None:
+                gl.glDeleteTextures([self._staging])
+            levels = int(np.floor(np.log2(max(width, height)))) + 1
+            self._staging = gl.glGenTextures(1)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, self._staging)
+            gl.glTexStorage2D(gl.GL_TEXTURE_2D, levels, gl.GL_RGBA16F, width, height)
+
+        rows = max(1, min(height - self._row, UPLOAD_CHUNK_BYTES // (width * 16)))
+        gl.glBindTexture(gl.GL_TEXTURE_2D, self._staging)
+        gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 4)
+        gl.glTexSubImage2D(gl.GL_TEXTURE_2D, 0, 0, self._row, width, rows, gl.GL_RGBA, gl.GL_FLOAT,
+                           self._image[self._row:self._row + rows])
+        self._row += rows
+        if self._row < height:
+            gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+            return False
+
+        # 经度方向循环，纬度方向截断；三线性过滤配合 textureLod
+        gl.glGenerateMipmap(gl.GL_TEXTURE_2D)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR_MIPMAP_LINEAR)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_S, gl.GL_REPEAT)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_T, gl.GL_CLAMP_TO_EDGE)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+
+        if self.texture is not None:
+            gl.glDeleteTextures([self.texture])
+        self.texture, self.key = self._staging, self._image_key
+        self._staging = None
+        self._image = None
+        self._image_key = None
+        return True
+
+    def release(self):
+        textures = [t for t in (self.texture, self._staging) if t is not None]
+        if textures:
+            gl.glDeleteTextures(textures)
+        self.texture = self._staging = None
+        self.key = None
+        self._image = None
@@ -0,0 +1,372 @@
+import numpy as np
+from PyQt6.QtOpenGL import QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+from PyQt6.QtCore import QObject
+from OpenGL import GL as gl
+
+from blackhole import lut
+from blackhole.params import accumulationKey, packFrameParams, packRenderParams
+from widgets.background_texture import BackgroundTexture
+from widgets.frame_profiler import FrameProfiler
+from widgets.post_process import PostProcess
+from widgets.shader_library import ShaderLibrary
+from widgets.texture_cache import TextureCache
+from widgets.uniform_block import UniformBlock
+
+
+class CircleRenderer(QObject):
+    """黑洞着色器的绘制逻辑，GLCircleWidget 与离屏渲染共用"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.program = None
+        self.vao = None  # 顶点数组对象(VAO)
+        self.vbo = None
+        self.background = BackgroundTexture()  # 星空/全景背景 (backgroundTexture)，分块上传
+        self.chess_texture = None       # 棋格纹理 (iChannel1)，来自共享组的 TextureCache
+        self.blackbody_texture = None   # 黑体颜色查找表 (blackbodyTable)，同样来自 TextureCache
+        self.noise_texture = None       # 吸积盘湍流的三维噪声 (diskNoise)，同样来自 TextureCache
+        self.texture_cache = None
+        self.chess_texture_resolution = [64.0, 64.0, 0.0]  # 棋格纹理分辨率 (宽, 高, 深度)
+
+        # 时间累积：两个浮点帧缓冲交替作为当前帧和上一帧 (iChannel3)
+        self.accum_fbos = []
+        self.accum_index = 0
+        self.accum_frame = 0     # 已累积的帧数
+        self._accum_key = None
+
+        # 自适应分辨率：光线步进在缩小的离屏缓冲中进行，再放大到目标尺寸
+        self.upscale_program = None
+        self.render_scale = 1.0  # 0.25 ~ 1.0
+        self.sharpness = 0.5     # 放大时的边缘保持锐化强度
+
+        # HDR 后处理（泛光与色调映射），见 widgets.post_process；启用时代替拷贝/放大
+        self.post = PostProcess()
+
+        # 分块渲染：(x0, y0, 整幅宽, 整幅高)，x0/y0 为本块左下角的 gl_FragCoord 偏移；
+        # 设置后 paintGL 的尺寸即块尺寸，渲染比例固定为 1
+        self.tile = None
+
+        # 帧时间统计（各通道 GPU 计时、CPU 分段计时）
+        self.profiler = FrameProfiler(self)
+
+        # 着色器变体 (宏定义元组 -> 程序)：params["deflectionLut"] 为真时用 DEFLECTION_LUT
+        # 代替逐步推进，params["spin"] 不为 0 时用 KERR 克尔积分，否则 params["integrator"] 为 1 时用
+        # ADAPTIVE_RK 自适应积分，params["stepCount"] 为真时用 STEP_COUNT 输出每像素步进次数
+        self.variants = {}
+        self.params_block = None      # std140 参数块，见 shaders/circle.frag
+        self.frame_block = None
+        self.shader_generation = 0    # 与 ShaderLibrary.generation 比较，热重载后换入新程序
+        self.deflection_table = None  # RG32F, (s/v, x)
+        self.deflection_info = None   # RGB32F, (x)
+
+    def initializeGL(self):
+        """在当前上下文中创建着色器程序、顶点数据和纹理"""
+        # 创建着色器程序（共享组内只编译一次，并使用磁盘二进制缓存）
+        library = ShaderLibrary.current()
+        self.program = library.program("shaders/circle.vert", "shaders/circle.frag")
+        self.upscale_program = library.program("shaders/upscale.vert", "shaders/upscale.frag")
+        self.shader_generation = library.generation
+
+        # 参数块 (RenderParams: 绑定点0, FrameParams: 绑定点1)
+        self.params_block = UniformBlock(0, 176)
+        self.frame_block = UniformBlock(1, 32)
+
+        # 生成VAO和VBO
+        self.vao = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(self.vao)
+
+        # 生成全屏矩形顶点数据
+        self.generateScreenQuad()
+
+        # 创建棋格纹理与黑体查找表
+        self.createTextures()
+
+        # 解绑VAO
+        gl.glBindVertexArray(0)
+
+        self.post.initializeGL()
+
+    def createTextures(self):
+        """从共享组的纹理缓存取得棋格纹理 (iChannel1)、黑体查找表和三维噪声，上下文重建时不再重复生成"""
+        cache = TextureCache.current()
+        self.releaseTextures()
+        self.texture_cache = cache
+        self.chess_texture = cache.acquire("chessboard", size=64, tiles=8)
+        self.blackbody_texture = cache.acquire("blackbody")
+        self.noise_texture = cache.acquire("diskNoise")
+        width, height = cache.size(self.chess_texture)
+        self.chess_texture_resolution = [float(width), float(height), 0.0]
+
+    def releaseTextures(self):
+        """归还从纹理缓存取得的纹理"""
+        if self.texture_cache is not None:
+            for texture in (self.chess_texture, self.blackbody_texture, self.noise_texture):
+                if texture is not None:
+                    self.texture_cache.release(texture)
+        self.chess_texture = None
+        self.blackbody_texture = None
+        self.noise_texture = None
+        self.texture_cache = None
+
+    def refreshPrograms(self):
+        """着色器热重载后，在帧开头换入新编译的程序"""
+        library = ShaderLibrary.current()
+        if library.generation == self.shader_generation:
+            return
+        self.shader_generation = library.generation
+        self.program = library.currentProgram("shaders/circle.vert", "shaders/circle.frag")
+        self.upscale_program = library.currentProgram("shaders/upscale.vert", "shaders/upscale.frag")
+        for defines in self.variants:
+            self.variants[defines] = library.currentProgram(
+                "shaders/circle.vert", "shaders/circle.frag", defines=defines)
+
+    def marchProgram(self, params):
+        """按参数选择光线步进着色器（变体在首次使用时编译）"""
+        defines = ()
+        if params["deflectionLut"]:
+            self.ensureDeflectionLut()
+            defines += ("DEFLECTION_LUT",)
+        elif params["spin"]:
+            defines += ("KERR",)
+        elif params["integrator"]:
+            defines += ("ADAPTIVE_RK",)
+        if params["stepCount"]:
+            defines += ("STEP_COUNT",)
+        if not defines:
+            return self.program
+        program = self.variants.get(defines)
+        if program is None:
+            program = self.variants[defines] = ShaderLibrary.current().program(
+                "shaders/circle.vert", "shaders/circle.frag", defines=defines)
+        return program
+
+    def ensureDeflectionLut(self):
+        """首次使用查找表模式时上传偏折查找表"""
+        if self.deflection_table is not None:
+            return
+        table, info = lut.deflectionTables()
+        n_b, n_s = table.shape[:2]
+        self.deflection_table, self.deflection_info = gl.glGenTextures(2)
+        for texture, internal, fmt, w, h, data in (
+                (self.deflection_table, gl.GL_RG32F, gl.GL_RG, n_s, n_b, table),
+                (self.deflection_info, gl.GL_RGB32F, gl.GL_RGB, n_b, 1, info)):
+            gl.glBindTexture(gl.GL_TEXTURE_2D, texture)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_S, gl.GL_CLAMP_TO_EDGE)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_T, gl.GL_CLAMP_TO_EDGE)
+            gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 4)
+            gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, internal, w, h, 0, fmt, gl.GL_FLOAT,
+                            np.ascontiguousarray(data))
+        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+
+    def generateScreenQuad(self):
+        """生成覆盖整个视口的矩形顶点数据"""
+        # 全屏矩形顶点数据（两个三角形组成）
+        vertices = [
+            -1.0, -1.0,  # 左下
+             1.0, -1.0,  # 右下
+             1.0,  1.0,  # 右上
+
+            -1.0, -1.0,  # 左下
+             1.0,  1.0,  # 右上
+            -1.0,  1.0   # 左上
+        ]
+
+        # 创建或更新VBO
+        if not self.vbo:
+            self.vbo = gl.glGenBuffers(1)
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER,
+                       (gl.GLfloat * len(vertices))(*vertices),
+                       gl.GL_STATIC_DRAW)
+
+        # 设置顶点属性指针
+        gl.glEnableVertexAttribArray(0)
+        gl.glVertexAttribPointer(0, 2, gl.GL_FLOAT, False, 0, None)
+
+    def resetAccumulation(self):
+        """丢弃已累积的历史帧"""
+        self.accum_frame = 0
+
+    def ensureAccumulationBuffers(self, width, height):
+        """按尺寸创建（或重建）两个 RGBA32F 累积缓冲"""
+        if self.accum_fbos and self.accum_fbos[0].width() == width \
+                and self.accum_fbos[0].height() == height:
+            return
+        fbo_format = QOpenGLFramebufferObjectFormat()
+        fbo_format.setInternalTextureFormat(gl.GL_RGBA32F)
+        self.accum_fbos = [QOpenGLFramebufferObject(width, height, fbo_format) for _ in range(2)]
+        for fbo in self.accum_fbos:
+            gl.glBindTexture(gl.GL_TEXTURE_2D, fbo.texture())
+            # 累积读取用 texelFetch，不受过滤方式影响；线性过滤用于放大
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_S, gl.GL_CLAMP_TO_EDGE)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_T, gl.GL_CLAMP_TO_EDGE)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+        self.accum_index = 0
+        self.resetAccumulation()
+
+    @property
+    def last_gpu_ms(self):
+        """最近一次测得的光线步进 GPU 时间（毫秒），尚无结果时为 None"""
+        return self.profiler.latestGpuMs("march")
+
+    def renderSize(self, width, height):
+        """按渲染比例计算光线步进缓冲的尺寸"""
+        if self.tile is not None:
+            return width, height
+        scale = min(1.0, max(0.25, self.render_scale))
+        return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+    def postEnabled(self, params):
+        """是否对累积结果做后处理；分块渲染与步数输出保留原始的 HDR 值"""
+        if self.tile is not None or params["stepCount"]:
+            return False
+        return bool(params["tonemap"]) or params["bloom"] > 0.0
+
+    def paintGL(self, width, height, params, target_fbo=0):
+        """使用 params（键名同 blackhole.params.DEFAULT_PARAMS）绘制一帧到 target_fbo
+
+        光线步进结果先写入（可能缩小的）累积缓冲并与上一帧混合，再经泛光和色调映射
+        （同时放大）绘制到目标帧缓冲；后处理关闭时直接放大/拷贝。
+        """
+        if not self.program or not self.vao or not self.vbo:
+            return
+
+        self.profiler.beginFrame()
+        self.refreshPrograms()
+        if self.background.uploadChunk():
+            # 新背景纹理已就绪
+            self.resetAccumulation()
+        render_w, render_h = self.renderSize(width, height)
+        self.ensureAccumulationBuffers(render_w, render_h)
+        key = accumulationKey(params)
+        if key != self._accum_key:
+            # 视角、质量、背景等变化时重新开始累积
+            self._accum_key = key
+            self.resetAccumulation()
+
+        previous = self.accum_fbos[self.accum_index]
+        current = self.accum_fbos[1 - self.accum_index]
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, current.handle())
+        gl.glViewport(0, 0, render_w, render_h)
+        with self.profiler.gpuPass("march"):
+            self.drawMarch(render_w, render_h, params, previous.texture())
+
+        if self.postEnabled(params):
+            self.post.execute(current.texture(), width, height, params, target_fbo, self.profiler)
+        elif (render_w, render_h) == (width, height):
+            # 全分辨率：直接拷贝累积结果到目标帧缓冲
+            gl.glBindFramebuffer(gl.GL_READ_FRAMEBUFFER, current.handle())
+            gl.glBindFramebuffer(gl.GL_DRAW_FRAMEBUFFER, target_fbo)
+            gl.glBlitFramebuffer(0, 0, width, height, 0, 0, width, height,
+                                 gl.GL_COLOR_BUFFER_BIT, gl.GL_NEAREST)
+            gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target_fbo)
+        else:
+            gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target_fbo)
+            gl.glViewport(0, 0, width, height)
+            with self.profiler.gpuPass("upscale"):
+                self.drawUpscale(current.texture(), render_w, render_h)
+
+        self.accum_index = 1 - self.accum_index
+        self.accum_frame += 1
+        self.profiler.endFrame()
+
+    def drawUpscale(self, texture, source_w, source_h):
+        """把低分辨率结果放大绘制到当前帧缓冲"""
+        self.upscale_program.bind()
+        self.upscale_program.setUniformValue("sourceSize", float(source_w), float(source_h))
+        self.upscale_program.setUniformValue("sharpness", float(self.sharpness))
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, texture)
+        self.upscale_program.setUniformValue("sourceTexture", 0)
+
+        gl.glBindVertexArray(self.vao)
+        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
+        gl.glBindVertexArray(0)
+
+        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+        self.upscale_program.release()
+
+    def drawMarch(self, width, height, params, previous_texture):
+        """执行光线步进着色器，绘制到当前绑定的帧缓冲"""
+        # 清除背景
+        gl.glClearColor(0.1, 0.1, 0.1, 1.0)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+
+        # 使用着色器程序（查找表模式、步数调试输出使用对应的变体）
+        program = self.marchProgram(params)
+        program.bind()
+
+        with self.profiler.cpuSection("uniforms"):
+            self.setUniforms(program, width, height, params, previous_texture)
+
+        # 绑定VAO
+        gl.glBindVertexArray(self.vao)
+
+        # 绘制两个三角形（6个顶点）
+        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
+
+        # 解绑VAO
+        gl.glBindVertexArray(0)
+
+        # 解绑纹理
+        if params["deflectionLut"]:
+            for unit in (gl.GL_TEXTURE4, gl.GL_TEXTURE5):
+                gl.glActiveTexture(unit)
+                gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+        for unit in (gl.GL_TEXTURE6, gl.GL_TEXTURE3, gl.GL_TEXTURE0):
+            gl.glActiveTexture(unit)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+        gl.glActiveTexture(gl.GL_TEXTURE7)
+        gl.glBindTexture(gl.GL_TEXTURE_3D, 0)
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+
+        # 释放着色器程序
+        program.release()
+
+    def setUniforms(self, program, width, height, params, previous_texture):
+        """上传参数块并绑定纹理（采样器单元由着色器中的 layout(binding) 固定）"""
+        # 物理与相机参数只在变化时上传；每帧变化的时间参数单独放在一个小块中
+        tile_origin = (0.0, 0.0)
+        if self.tile is not None:
+            # iResolution 取整幅尺寸，uvToDir 和抖动在各块之间保持一致
+            tile_origin, width, height = self.tile[:2], self.tile[2], self.tile[3]
+        self.params_block.update(packRenderParams(params, width, height,
+                                                  self.chess_texture_resolution, tile_origin))
+        self.frame_block.update(packFrameParams(params, self.accum_frame))
+        self.params_block.bind()
+        self.frame_block.bind()
+
+        # 棋格纹理 (iChannel1) 在纹理单元1
+        if self.chess_texture:
+            gl.glActiveTexture(gl.GL_TEXTURE1)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, self.chess_texture)
+
+        # 上一帧 (iChannel3) 在纹理单元3
+        gl.glActiveTexture(gl.GL_TEXTURE3)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, previous_texture)
+
+        # 背景纹理在纹理单元0，尚未就绪或与当前背景不符时绑定 0，着色器退回棋盘背景
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, self.background.textureFor(params))
+
+        # 黑体颜色查找表在纹理单元6
+        if self.blackbody_texture:
+            gl.glActiveTexture(gl.GL_TEXTURE6)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, self.blackbody_texture)
+
+        # 吸积盘湍流的三维噪声在纹理单元7（三线性过滤，三个方向都平铺）
+        if self.noise_texture:
+            gl.glActiveTexture(gl.GL_TEXTURE7)
+            gl.glBindTexture(gl.GL_TEXTURE_3D, self.noise_texture)
+
+        # 偏折查找表在纹理单元4、5
+        if params["deflectionLut"]:
+            gl.glActiveTexture(gl.GL_TEXTURE4)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, self.deflection_table)
+            gl.glActiveTexture(gl.GL_TEXTURE5)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, self.deflection_info)
@@ -0,0 +1,184 @@
+import csv
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtWidgets import QLabel
+from OpenGL import GL as gl
+
+QUERY_RING = 3  # 每个通道的查询对象数量，读取几帧前的结果，避免等待 GPU
+
+
+class GpuPassTimer:
+    """单个渲染通道的 GL_TIME_ELAPSED 计时（环形查询对象，不会阻塞）"""
+
+    def __init__(self):
+        self.queries = list(np.atleast_1d(gl.glGenQueries(QUERY_RING)))
+        self.pending = [False] * QUERY_RING
+        self.index = 0
+
+    def begin(self):
+        # 该查询对象的旧结果若仍未就绪则直接丢弃
+        self.pending[self.index] = False
+        gl.glBeginQuery(gl.GL_TIME_ELAPSED, self.queries[self.index])
+
+    def end(self):
+        gl.glEndQuery(gl.GL_TIME_ELAPSED)
+        self.pending[self.index] = True
+        self.index = (self.index + 1) % QUERY_RING
+
+    def collect(self):
+        """返回所有已就绪的结果（毫秒），按提交顺序"""
+        results = []
+        for offset in range(QUERY_RING):
+            slot = (self.index + offset) % QUERY_RING
+            if not self.pending[slot]:
+                continue
+            available = np.zeros(1, dtype=np.int32)
+            gl.glGetQueryObjectiv(self.queries[slot], gl.GL_QUERY_RESULT_AVAILABLE, available)
+            if not available[0]:
+                continue
+            elapsed = np.zeros(1, dtype=np.uint64)
+            gl.glGetQueryObjectui64v(self.queries[slot], gl.GL_QUERY_RESULT, elapsed)
+            self.pending[slot] = False
+            results.append(float(elapsed[0]) / 1e6)
+        return results
+
+
+class FrameProfiler(QObject):
+    """帧时间统计：GPU 通道计时、CPU 分段计时、滚动百分位数和 CSV 日志
+
+    用法（在 paintGL 中，GL 上下文为当前）：
+        profiler.beginFrame()
+        with profiler.cpuSection("uniforms"): ...
+        with profiler.gpuPass("march"): ...      # GPU 通道不能嵌套
+        profiler.endFrame()
+    """
+
+    statsUpdated = pyqtSignal(dict)
+
+    def __init__(self, parent=None, window=240, report_interval=0.5):
+        super().__init__(parent)
+        self.window = window                    # 滚动统计的样本数
+        self.report_interval = report_interval  # statsUpdated 的发送间隔（秒）
+        self.samples = {}      # "frame"/"cpu"/"gpu.<pass>"/"cpu.<section>" -> deque(毫秒)
+        self.latest = {}       # 同上键的最近一次数值
+        self.gpu_timers = {}
+        self.frame_count = 0
+        self._frame_start = None
+        self._last_frame_end = None
+        self._last_report = 0.0
+        self._csv_file = None
+        self._csv_writer = None
+
+    def record(self, name, ms):
+        """记录一个样本（毫秒）"""
+        series = self.samples.get(name)
+        if series is None:
+            series = self.samples[name] = deque(maxlen=self.window)
+        series.append(ms)
+        self.latest[name] = ms
+        if self._csv_writer is not None:
+            self._csv_writer.writerow([f"{time.perf_counter():.6f}", self.frame_count, name, f"{ms:.4f}"])
+
+    def beginFrame(self):
+        self._frame_start = time.perf_counter()
+
+    @contextmanager
+    def cpuSection(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record("cpu." + name, (time.perf_counter() - start) * 1000.0)
+
+    @contextmanager
+    def gpuPass(self, name):
+        timer = self.gpu_timers.get(name)
+        if timer is None:
+            timer = self.gpu_timers[name] = GpuPassTimer()
+        timer.begin()
+        try:
+            yield
+        finally:
+            timer.end()
+
+    def endFrame(self):
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self.record("cpu", (now - self._frame_start) * 1000.0)
+        if self._last_frame_end is not None:
+            self.record("frame", (now - self._last_frame_end) * 1000.0)
+        self._last_frame_end = now
+
+        for name, timer in self.gpu_timers.items():
+            for ms in timer.collect():
+                self.record("gpu." + name, ms)
+
+        self.frame_count += 1
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self.statsUpdated.emit(self.stats())
+
+    def latestGpuMs(self, name):
+        """最近一次完成的 GPU 通道时间（毫秒），尚无结果时返回 None"""
+        return self.latest.get("gpu." + name)
+
+    def stats(self):
+        """各序列的 p50/p95/p99/均值（毫秒）以及帧率"""
+        result = {}
+        for name, series in self.samples.items():
+            if not series:
+                continue
+            values = np.fromiter(series, dtype=np.float64)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {"p50": p50, "p95": p95, "p99": p99,
+                            "mean": float(values.mean()), "count": values.size}
+        frame = result.get("frame")
+        result["fps"] = 1000.0 / frame["mean"] if frame and frame["mean"] > 0 else 0.0
+        return result
+
+    def reset(self):
+        self.samples.clear()
+        self.latest.clear()
+        self._last_frame_end = None
+
+    def startCsvLog(self, path):
+        """把之后的每个样本写入 CSV（time, frame, series, ms）"""
+        self.stopCsvLog()
+        self._csv_file = open(path, "w", newline="")
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(["time", "frame", "series", "ms"])
+
+    def stopCsvLog(self):
+        if self._csv_file is not None:
+            self._csv_file.close()
+        self._csv_file = None
+        self._csv_writer = None
+
+
+def formatStats(stats):
+    """把 FrameProfiler.stats() 格式化为多行文本"""
+    lines = [f"{stats.get('fps', 0.0):6.1f} FPS"]
+    for name in sorted(k for k in stats if k != "fps"):
+        s = stats[name]
+        lines.append(f"{name:<14} p50 {s['p50']:6.2f}  p95 {s['p95']:6.2f}  p99 {s['p99']:6.2f} ms")
+    return "\n".join(lines)
+
+
+class StatsOverlay(QLabel):
+    """叠加在画布左上角的帧时间统计"""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 150); color: #d0ffd0;"
+                           "font-family: monospace; font-size: 11px; padding: 4px;")
+        self.move(8, 8)
+        self.hide()
+
+    def setStats(self, stats):
+        self.setText(formatStats(stats))
+        self.adjustSize()
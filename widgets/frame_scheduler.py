@@ -0,0 +1,36 @@
+from PyQt6.QtCore import QObject, Qt
+
+
+class FrameScheduler(QObject):
+    """集中管理 OpenGL 组件的重绘
+
+    不再使用固定 16ms 的 QTimer：每个组件在 frameSwapped（受垂直同步节流）之后
+    询问 needsRedraw()，需要时才请求下一帧；不可见（所在标签页未选中、窗口最小化）
+    的组件不会被重绘，重新显示时 Qt 的绘制事件会自动恢复循环。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.widgets = []
+
+    def register(self, widget):
+        """登记组件；组件需实现 needsRedraw()"""
+        self.widgets.append(widget)
+        widget.frameSwapped.connect(lambda w=widget: self.onFrameSwapped(w))
+
+    def isActive(self, widget):
+        """组件当前是否需要显示"""
+        if not widget.isVisible():
+            return False
+        return not (widget.window().windowState() & Qt.WindowState.WindowMinimized)
+
+    def requestFrame(self, widget=None):
+        """请求重绘指定组件（默认全部），不可见的组件会被跳过"""
+        for w in ([widget] if widget is not None else self.widgets):
+            if self.isActive(w):
+                w.update()
+
+    def onFrameSwapped(self, widget):
+        """上一帧已交换到屏幕，决定是否继续绘制"""
+        if self.isActive(widget) and widget.needsRedraw():
+            widget.update()
@@ -1,12 +1,13 @@
-import os
 import numpy as np
 import math
 from PyQt6.QtOpenGLWidgets import QOpenGLWidget
-from PyQt6.QtOpenGL import QOpenGLShaderProgram, QOpenGLShader
-from PyQt6.QtCore import Qt, QFile, QTextStream, QTimer
+from PyQt6.QtCore import Qt
 from OpenGL import GL as gl
 import time
 
+from widgets.frame_profiler import FrameProfiler, StatsOverlay
+from widgets.shader_library import ShaderLibrary
+
 class GLBasicWidget(QOpenGLWidget):
     def __init__(self):
         super().__init__()
@@ -14,31 +15,17 @@ class GLBasicWidget(QOpenGLWidget):
         self.program = None
         self.vbo = None
         self.vao = None
-        self.start_time = time.time()
-        
-        # 创建定时器用于动画
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update)
-        self.timer.start(16)  # 约60fps
+        self.shader_generation = 0  # 与 ShaderLibrary.generation 比较，热重载后换入新程序
+        self.start_time = time.perf_counter()  # 单调时钟，重绘由 FrameScheduler 调度
 
-    def loadShaderFromFile(self, shader_type, file_path):
-        """从文件加载着色器"""
-        if not os.path.exists(file_path):
-            print(f"Shader file not found: {file_path}")
-            return None
-            
-        shader = QOpenGLShader(shader_type, self)
-        file = QFile(file_path)
-        if file.open(QFile.OpenModeFlag.ReadOnly | QFile.OpenModeFlag.Text):
-            stream = QTextStream(file)
-            shader_source = stream.readAll()
-            file.close()
-            
-            if not shader.compileSourceCode(shader_source):
-                print(f"Shader compilation error: {shader.log()}")
-                return None
-            return shader
-        return None
+        # 帧时间统计与画布叠加显示
+        self.profiler = FrameProfiler(self)
+        self.stats_overlay = StatsOverlay(self)
+        self.profiler.statsUpdated.connect(self.stats_overlay.setStats)
+
+    def needsRedraw(self):
+        """着色器随 iTime 变化，需要持续绘制"""
+        return True
 
     def initializeGL(self):
         # 配置OpenGL 4.3核心模式
@@ -47,25 +34,10 @@ class GLBasicWidget(QOpenGLWidget):
         fmt.setProfile(fmt.OpenGLContextProfile.CoreProfile)
         self.setFormat(fmt)
 
-        # 创建着色器程序
-        self.program = QOpenGLShaderProgram(self)
-        
-        # 从文件加载着色器
-        vertex_shader = self.loadShaderFromFile(
-            QOpenGLShader.ShaderTypeBit.Vertex, "shaders/basic.vert"
-        )
-        fragment_shader = self.loadShaderFromFile(
-            QOpenGLShader.ShaderTypeBit.Fragment, "shaders/basic.frag"
-        )
-        
-        if vertex_shader and fragment_shader:
-            self.program.addShader(vertex_shader)
-            self.program.addShader(fragment_shader)
-            
-            if not self.program.link():
-                raise RuntimeError("Shader program link failed: " + self.program.log())
-        else:
-            raise RuntimeError("Shader loading failed")
+        # 创建着色器程序（共享组内只编译一次，并使用磁盘二进制缓存）
+        library = ShaderLibrary.current()
+        self.program = library.program("shaders/basic.vert", "shaders/basic.frag")
+        self.shader_generation = library.generation
 
         # 顶点数据 (全屏矩形)
         vertices = np.array([
@@ -105,18 +77,27 @@ class GLBasicWidget(QOpenGLWidget):
         if not self.program or not self.vao:
             return
 
+        self.profiler.beginFrame()
+        library = ShaderLibrary.current()
+        if library.generation != self.shader_generation:
+            # 着色器热重载后换入新程序
+            self.shader_generation = library.generation
+            self.program = library.currentProgram("shaders/basic.vert", "shaders/basic.frag")
         self.program.bind()
         
         # 设置统一变量
-        elapsed_time = time.time() - self.start_time
-        self.program.setUniformValue("iTime", elapsed_time)
-        self.program.setUniformValue("iResolution", self.width(), self.height())
+        with self.profiler.cpuSection("uniforms"):
+            elapsed_time = time.perf_counter() - self.start_time
+            self.program.setUniformValue("iTime", elapsed_time)
+            self.program.setUniformValue("iResolution", self.width(), self.height())
         
-        gl.glBindVertexArray(self.vao)
-        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
-        gl.glBindVertexArray(0)
+        with self.profiler.gpuPass("draw"):
+            gl.glBindVertexArray(self.vao)
+            gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
+            gl.glBindVertexArray(0)
         
         self.program.release()
+        self.profiler.endFrame()
 
     def resizeGL(self, w, h):
         gl.glViewport(0, 0, w, h)
\ No newline at end of file
@@ -1,120 +1,260 @@
-import math
-import os
-import numpy as np
 from PyQt6.QtOpenGLWidgets import QOpenGLWidget
-from PyQt6.QtOpenGL import QOpenGLShaderProgram, QOpenGLShader
-from PyQt6.QtCore import Qt, QFile, QTextStream, QPoint, QTimer
-from PyQt6.QtGui import QSurfaceFormat, QMouseEvent, QImage
+import time
+from PyQt6.QtCore import Qt, QPoint
+from PyQt6.QtGui import QSurfaceFormat, QMouseEvent
 from OpenGL import GL as gl
 
+from blackhole.camera import (DEFAULT_DISTANCE, DEFAULT_FOV, DEFAULT_PHI, DEFAULT_THETA,
+                              cameraParams, mouseAngles)
+from blackhole.params import makeParams
+from widgets.circle_renderer import CircleRenderer
+from widgets.adaptive_resolution import ResolutionController
+from widgets.background_texture import BackgroundLoader, backgroundKey
+from widgets.frame_profiler import StatsOverlay
+
 class GLCircleWidget(QOpenGLWidget):
     def __init__(self):
         super().__init__()
         self.setMinimumSize(600, 600)
         self.iFrame = 0  # 初始帧数
-        # 配置MSAA抗锯齿
+        # 抗锯齿由着色器的光线抖动 + 时间累积完成，不再需要MSAA
         fmt = QSurfaceFormat()
-        fmt.setSamples(4)  # 4倍多重采样
         fmt.setVersion(4, 3)
         fmt.setProfile(QSurfaceFormat.OpenGLContextProfile.CoreProfile)
         self.setFormat(fmt)
         
-        self.program = None
-        self.vao = None  # 添加顶点数组对象(VAO)
-        self.vbo = None
-        self.circleColor = [1.0, 0.0, 0.0]  # 默认红色
-        self.offset = [0.2, 0.2]  # 默认偏移
-        self.radius = 0.2  # 默认半径
+        self.renderer = CircleRenderer(self)  # 着色器绘制逻辑（与离屏渲染共用）
+        self.profiler = self.renderer.profiler  # 帧时间统计
+        self.stats_overlay = StatsOverlay(self)
+        self.profiler.statsUpdated.connect(self.stats_overlay.setStats)
         self.blackHoleMass = 1.49e7  # 默认黑洞质量 (太阳质量单位)
-        self.background_texture = None  # 添加背景纹理
-        self.chess_texture = None       # 添加棋格纹理 (iChannel1)
+        self.spin = 0.0         # 无量纲自旋 a/M，非 0 时使用克尔积分
+        self.diskInner = 2.0    # 吸积盘内半径 (Rs)
+        self.diskOuter = 10.0   # 吸积盘外半径 (Rs)
+        self.diskShading = 1    # 0: 灰色, 1: 黑体查找表, 2: 黑体直接积分
+        self.diskTemperature = 8000.0  # 吸积盘最高温度 (K)
+        self.diskTurbulence = 0.6      # 吸积盘湍流强度 (0 ~ 1)
+        self.animateDisk = False       # 湍流是否随时间转动（默认静止，画面可以完全收敛）
+        self.diskTime = 0.0            # 湍流转动的时间（秒），只在 animateDisk 时前进
+        self.tonemap = 1         # 色调映射算子，见 blackhole.params.TONEMAP_OPERATORS
+        self.exposure = 1.0      # 曝光倍数
+        self.bloom = 0.3         # 泛光强度 (0 ~ 1)
         self.backgroundType = 0  # 0: 棋盘, 1: 纯黑, 2: 星空, 3: 纹理
-        self.chess_texture_resolution = [64.0, 64.0, 0.0]  # 棋格纹理分辨率 (宽, 高, 深度)
+        self.starSeed = 1        # 星空随机种子
+        self.backgroundPath = "" # 纹理背景的全景图路径
+
+        # 星空/全景图在后台线程生成或读取，完成后在 paintGL 中分块上传
+        self.background_loader = BackgroundLoader(self)
+        self.background_loader.loaded.connect(self.onBackgroundLoaded)
+        self.deflectionLut = 0   # 1: 查表代替逐步推进
+        self.integrator = 0      # 1: Dormand–Prince 自适应积分代替逐步推进
+
+        # 自适应分辨率：手动比例或根据 GPU 帧时间自动调整
+        self.renderScale = 1.0
+        self.autoScale = False
+        self.resolution_controller = ResolutionController()
         
         # 添加 iMouse 变量 (类似Shadertoy的实现)
         self.iMouse = [0.0, 0.0, 0.0, 0.0]  # [current_x, current_y, click_x, click_y]
         self.mousePressed = False  # 跟踪鼠标按下状态
         self.setMouseTracking(True)  # 启用鼠标跟踪
+        # 相机状态保存为角度（见 blackhole.camera），与窗口尺寸无关；拖动时按原 iMouse 映射更新
+        self.cameraTheta = DEFAULT_THETA
+        self.cameraPhi = DEFAULT_PHI
+        self.cameraDistance = DEFAULT_DISTANCE
+        self.fov = DEFAULT_FOV
         self.lastMousePos = QPoint()  # 添加变量记录上次鼠标位置
         
-        # 添加 iTime 变量 (类似Shadertoy)
+        # 添加 iTime 变量 (类似Shadertoy)，由单调时钟测量
         self.iTime = 0.0  # 初始时间
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.updateTime)
-        self.timer.start(16)  # 约60FPS
+        self.iTimeDelta = 0.0  # 与上一帧的时间间隔
+        self.start_time = time.perf_counter()
+        self.last_time = self.start_time
+
+        # 累积到该帧数后认为画面已收敛，静止时停止重绘（由 FrameScheduler 调度）
+        self.max_accum_frames = 128
+        # 吸积盘湍流转动时，累积改为按半衰期（秒）淡出历史帧，否则转动会被平均成模糊
+        self.turbulence_half_life = 0.1
 
     def setBackgroundType(self, bg_type):
         self.backgroundType = bg_type
+        self.requestBackground()
+        self.markActivity()
         self.update()
 
-    def updateTime(self):
-        """更新时间计数器"""
-        self.iTime += 0.016  # 每帧增加约16ms
-        self.iFrame += 1     # 增加帧数计数器
+    def setBackgroundPath(self, path):
+        """设置纹理背景使用的等距柱状投影全景图"""
+        self.backgroundPath = path
+        self.requestBackground()
         self.update()
 
-    def createChessTexture(self):
-        """创建棋格纹理 (iChannel1)"""
-        # 创建 64x64 的棋格纹理
-        size = 64
-        texture_data = np.zeros((size, size, 4), dtype=np.uint8)
-        
-        # 定义棋格颜色
-        color1 = [220, 220, 220, 255]  # 浅色
-        color2 = [80, 80, 100, 255]    # 深色
-        
-        # 创建棋格图案
-        tile_size = size // 8
-        for y in range(size):
-            for x in range(size):
-                tile_x = x // tile_size
-                tile_y = y // tile_size
-                
-                if (tile_x + tile_y) % 2 == 0:
-                    texture_data[y, x] = color1
-                else:
-                    texture_data[y, x] = color2
-        
-        # 创建OpenGL纹理
-        self.chess_texture = gl.glGenTextures(1)
-        gl.glBindTexture(gl.GL_TEXTURE_2D, self.chess_texture)
-        
-        # 设置纹理参数
-        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_S, gl.GL_REPEAT)
-        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_T, gl.GL_REPEAT)
-        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
-        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
-        
-        # 上传纹理数据
-        gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGBA, size, size, 0, 
-                       gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, texture_data)
-        
-        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+    def requestBackground(self):
+        """当前背景需要的图像尚未上传时，交给后台线程加载"""
+        key = backgroundKey(self.renderParams())
+        if key is not None and key != self.renderer.background.key:
+            self.background_loader.request(key)
 
-    def loadShaderFromFile(self, shader_type, file_path):
-        """从文件加载着色器"""
-        if not os.path.exists(file_path):
-            print(f"Shader file not found: {file_path}")
-            return None
-            
-        shader = QOpenGLShader(shader_type, self)
-        file = QFile(file_path)
-        if file.open(QFile.OpenModeFlag.ReadOnly | QFile.OpenModeFlag.Text):
-            stream = QTextStream(file)
-            shader_source = stream.readAll()
-            file.close()
-            
-            if not shader.compileSourceCode(shader_source):
-                print(f"Shader compilation error: {shader.log()}")
-                return None
-            return shader
-        return None
+    def onBackgroundLoaded(self, key, image):
+        self.renderer.background.setImage(key, image)
+        self.update()
 
-    def updateTime(self):
-        """更新时间计数器"""
-        self.iTime += 0.016  # 每帧增加约16ms
+    def setMass(self, mass):
+        """设置黑洞质量（太阳质量单位）"""
+        self.blackHoleMass = mass
+        self.markActivity()
+        self.update()
+
+    def setSpin(self, spin):
+        """设置黑洞无量纲自旋 a/M"""
+        self.spin = float(spin)
+        self.markActivity()
+        self.update()
+
+    def setDiskRadii(self, inner, outer):
+        """设置吸积盘内外半径（Rs）"""
+        self.diskInner = inner
+        self.diskOuter = max(outer, inner)
+        self.markActivity()
         self.update()
 
+    def setDiskShading(self, shading):
+        """设置吸积盘着色方式"""
+        self.diskShading = int(shading)
+        self.markActivity()
+        self.update()
+
+    def setDiskTemperature(self, temperature):
+        """设置吸积盘最高温度（K）"""
+        self.diskTemperature = float(temperature)
+        self.markActivity()
+        self.update()
+
+    def setDiskTurbulence(self, strength):
+        """设置吸积盘湍流强度 (0 ~ 1)"""
+        self.diskTurbulence = float(strength)
+        self.markActivity()
+        self.update()
+
+    def setAnimateDisk(self, enabled):
+        """开关吸积盘湍流的转动；关闭时停在当前位置，静止画面照常完全平均"""
+        self.animateDisk = bool(enabled)
+        self.markActivity()
+        self.update()
+
+    def diskAnimating(self):
+        return self.animateDisk and self.diskTurbulence > 0.0
+
+    def setTonemap(self, operator):
+        """设置色调映射算子（只影响后处理，不重置时间累积）"""
+        self.tonemap = int(operator)
+        self.update()
+
+    def setExposure(self, exposure):
+        """设置色调映射前的曝光倍数"""
+        self.exposure = float(exposure)
+        self.update()
+
+    def setBloom(self, strength):
+        """设置泛光强度 (0 ~ 1)，0 时跳过泛光链"""
+        self.bloom = float(strength)
+        self.update()
+
+    def setCamera(self, theta, phi, distance=None, fov=None):
+        """设置相机角度（度）、距离（光年）和视场"""
+        self.cameraTheta = theta
+        self.cameraPhi = phi
+        if distance is not None:
+            self.cameraDistance = distance
+        if fov is not None:
+            self.fov = fov
+        self.markActivity()
+        self.update()
+
+    def updateCameraFromMouse(self):
+        """拖动时由鼠标位置得到相机角度（与原着色器中 iMouse 的映射相同）"""
+        self.cameraTheta, self.cameraPhi = mouseAngles(
+            self.iMouse[0], self.iMouse[1], max(self.width(), 1), max(self.height(), 1))
+
+    def setDeflectionLut(self, enabled):
+        """开启/关闭偏折查找表模式"""
+        self.deflectionLut = int(bool(enabled))
+        self.markActivity()
+        self.update()
+
+    def setIntegrator(self, adaptive):
+        """切换逐步推进 / Dormand–Prince 自适应积分"""
+        self.integrator = int(bool(adaptive))
+        self.markActivity()
+        self.update()
+
+    def setRenderScale(self, scale):
+        """设置手动渲染比例 (0.25 ~ 1.0)"""
+        self.renderScale = min(1.0, max(0.25, scale))
+        self.update()
+
+    def setAutoScale(self, enabled):
+        """开启/关闭根据帧时间自动调整渲染比例"""
+        self.autoScale = enabled
+        self.markActivity()
+        self.update()
+
+    def setTargetFps(self, fps):
+        self.resolution_controller.setTargetFps(fps)
+
+    def markActivity(self):
+        """记录交互，自动模式下在交互期间降低分辨率"""
+        self.resolution_controller.markActivity(time.perf_counter())
+
+    def renderParams(self):
+        """收集当前帧的着色器参数（未设置的键取 DEFAULT_PARAMS 中的默认值）"""
+        return makeParams({
+            "MBlackHole": self.blackHoleMass,
+            "spin": self.spin,
+            "diskInner": self.diskInner,
+            "diskOuter": self.diskOuter,
+            "diskShading": self.diskShading,
+            "diskTemperature": self.diskTemperature,
+            "diskTurbulence": self.diskTurbulence,
+            "diskTime": self.diskTime,
+            "accumHalfLife": self.turbulence_half_life if self.diskAnimating() else 0.0,
+            "tonemap": self.tonemap,
+            "exposure": self.exposure,
+            "bloom": self.bloom,
+            "backgroundType": self.backgroundType,
+            "starSeed": self.starSeed,
+            "backgroundPath": self.backgroundPath,
+            "deflectionLut": self.deflectionLut,
+            "integrator": self.integrator,
+            "iFrame": self.iFrame,
+            "iMouse": self.iMouse,
+            **cameraParams(self.cameraTheta, self.cameraPhi, self.cameraDistance, self.fov),
+            "iTime": self.iTime,
+            "iTimeDelta": self.iTimeDelta,
+        })
+
+    def updateTime(self):
+        """更新时间计数器（单调时钟）"""
+        now = time.perf_counter()
+        self.iTime = now - self.start_time
+        # 停止重绘一段时间后恢复时，不把空闲时间算进帧间隔
+        self.iTimeDelta = min(now - self.last_time, 0.1)
+        self.last_time = now
+        self.iFrame += 1     # 增加帧数计数器
+        if self.diskAnimating():
+            self.diskTime += self.iTimeDelta
+
+    def needsRedraw(self):
+        """是否还需要继续绘制下一帧"""
+        if self.mousePressed or self.renderer.background.uploading:
+            return True
+        if self.diskAnimating():
+            # 湍流在转动，画面不会收敛
+            return True
+        if self.renderer.accum_frame < self.max_accum_frames:
+            return True
+        # 自动分辨率下等待空闲后回到全分辨率
+        return self.autoScale and self.renderer.render_scale < 1.0
+
     def initializeGL(self):
         # 配置OpenGL 4.3核心模式 (已经在构造函数中设置过，这里确保)
         fmt = self.format()
@@ -122,123 +262,18 @@ class GLCircleWidget(QOpenGLWidget):
         fmt.setProfile(fmt.OpenGLContextProfile.CoreProfile)
         self.setFormat(fmt)
 
-        # 创建着色器程序
-        self.program = QOpenGLShaderProgram(self)
-        
-        # 从文件加载着色器
-        vertex_shader = self.loadShaderFromFile(
-            QOpenGLShader.ShaderTypeBit.Vertex, "shaders/circle.vert"
-        )
-        fragment_shader = self.loadShaderFromFile(
-            QOpenGLShader.ShaderTypeBit.Fragment, "shaders/circle.frag"
-        )
-        
-        if vertex_shader and fragment_shader:
-            self.program.addShader(vertex_shader)
-            self.program.addShader(fragment_shader)
-            
-            if not self.program.link():
-                raise RuntimeError("Shader program link failed: " + self.program.log())
-        else:
-            raise RuntimeError("Shader loading failed")
-            
-        # 生成VAO和VBO
-        self.vao = gl.glGenVertexArrays(1)
-        gl.glBindVertexArray(self.vao)
-        
-        # 生成全屏矩形顶点数据
-        self.generateScreenQuad()
-        
-        # 创建棋格纹理
-        self.createChessTexture()
-        
-        # 解绑VAO
-        gl.glBindVertexArray(0)
-
-    def generateScreenQuad(self):
-        """生成覆盖整个视口的矩形顶点数据"""
-        # 全屏矩形顶点数据（两个三角形组成）
-        vertices = [
-            -1.0, -1.0,  # 左下
-             1.0, -1.0,  # 右下
-             1.0,  1.0,  # 右上
-             
-            -1.0, -1.0,  # 左下
-             1.0,  1.0,  # 右上
-            -1.0,  1.0   # 左上
-        ]
-        
-        # 创建或更新VBO
-        if not self.vbo:
-            self.vbo = gl.glGenBuffers(1)
-        
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
-        gl.glBufferData(gl.GL_ARRAY_BUFFER, 
-                       (gl.GLfloat * len(vertices))(*vertices),
-                       gl.GL_STATIC_DRAW)
-        
-        # 设置顶点属性指针
-        gl.glEnableVertexAttribArray(0)
-        gl.glVertexAttribPointer(0, 2, gl.GL_FLOAT, False, 0, None)
+        # 着色器、VAO/VBO 和棋格纹理由 CircleRenderer 创建
+        self.renderer.initializeGL()
 
     def paintGL(self):
-        if not self.program or not self.vao or not self.vbo:
-            return
-
-        # 清除背景
-        gl.glClearColor(0.1, 0.1, 0.1, 1.0)
-        gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
-
-        # 使用着色器程序
-        self.program.bind()
-        
-        # 设置统一变量
-        self.program.setUniformValue("circleColor", *self.circleColor)
-        self.program.setUniformValue("iResolution", self.width(), self.height())
-        self.program.setUniformValue("offset", *self.offset)
-        self.program.setUniformValue("radius", self.radius)
-        self.program.setUniformValue("MBlackHole", self.blackHoleMass)
-        self.program.setUniformValue("backgroundType", self.backgroundType)  # 设置背景类型
-        self.program.setUniformValue("iFrame", self.iFrame)
-
-        # 传递 iMouse 变量 (类似Shadertoy)
-        self.program.setUniformValue("iMouse", *self.iMouse)
-        # 传递 iTime 变量 (类似Shadertoy)
-        self.program.setUniformValue("iTime", self.iTime)
-        
-        # 传递棋格纹理分辨率 (iChannelResolution[1])
-        self.program.setUniformValue("iChannelResolution", 
-                                self.chess_texture_resolution[0],
-                                self.chess_texture_resolution[1],
-                                self.chess_texture_resolution[2])
-        
-        # 绑定棋格纹理 (iChannel1) 到纹理单元1
-        if self.chess_texture:
-            gl.glActiveTexture(gl.GL_TEXTURE1)
-            gl.glBindTexture(gl.GL_TEXTURE_2D, self.chess_texture)
-            self.program.setUniformValue("iChannel1", 1)
-        
-        # 绑定背景纹理（如果存在）到纹理单元0
-        if self.background_texture:
-            gl.glActiveTexture(gl.GL_TEXTURE0)
-            gl.glBindTexture(gl.GL_TEXTURE_2D, self.background_texture)
-            self.program.setUniformValue("backgroundTexture", 0)
-        
-        # 绑定VAO
-        gl.glBindVertexArray(self.vao)
-        
-        # 绘制两个三角形（6个顶点）
-        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
-        
-        # 解绑VAO
-        gl.glBindVertexArray(0)
-        
-        # 解绑纹理
-        if self.background_texture:
-            gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
-        
-        # 释放着色器程序
-        self.program.release()
+        self.updateTime()
+        if self.autoScale:
+            self.renderer.render_scale = self.resolution_controller.update(
+                self.renderer.last_gpu_ms, time.perf_counter())
+        else:
+            self.renderer.render_scale = self.renderScale
+        self.renderer.paintGL(self.width(), self.height(), self.renderParams(),
+                              self.defaultFramebufferObject())
         
     def resizeGL(self, w, h):
         # 设置视口大小
@@ -260,7 +295,9 @@ class GLCircleWidget(QOpenGLWidget):
             # 更新当前坐标
             self.iMouse[0] = pos.x()
             self.iMouse[1] = self.height() - pos.y()
+            self.updateCameraFromMouse()
             
+            self.markActivity()
             self.update()
 
     def mouseReleaseEvent(self, event: QMouseEvent):
@@ -277,6 +314,7 @@ class GLCircleWidget(QOpenGLWidget):
             self.iMouse[0] = pos.x()
             self.iMouse[1] = self.height() - pos.y()
             
+            self.markActivity()
             self.update()
 
     def mouseMoveEvent(self, event: QMouseEvent):
@@ -299,5 +337,7 @@ class GLCircleWidget(QOpenGLWidget):
         # 根据移动增量更新按下坐标
         self.iMouse[2] += delta.x()
         self.iMouse[3] -= delta.y()  # Y轴方向相反
+        self.updateCameraFromMouse()
         
+        self.markActivity()
         self.update()
\ No newline at end of file
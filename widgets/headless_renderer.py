@@ -0,0 +1,133 @@
+import numpy as np
+from PyQt6.QtGui import QOffscreenSurface, QOpenGLContext, QSurfaceFormat
+from PyQt6.QtOpenGL import QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+from OpenGL import GL as gl
+
+from blackhole.params import makeParams
+from widgets.background_texture import backgroundKey, loadBackground
+from widgets.circle_renderer import CircleRenderer
+from widgets.pbo_readback import PboReadback
+
+SAMPLE_TIME_OFFSET = 1e-3  # 累积子帧之间的 iTime 偏移（秒）
+READBACK_BUFFERS = 3       # 异步读回的 PBO 数量
+
+
+class HeadlessRenderer:
+    """不需要窗口的黑洞渲染器：QOffscreenSurface + 浮点 FBO + glReadPixels
+
+    需要已创建的 QGuiApplication；在无显示环境中设置 QT_QPA_PLATFORM=offscreen
+    即可使用 Mesa llvmpipe 软件渲染。
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        fmt = QSurfaceFormat()
+        fmt.setVersion(4, 3)
+        fmt.setProfile(QSurfaceFormat.OpenGLContextProfile.CoreProfile)
+
+        self.context = QOpenGLContext()
+        self.context.setFormat(fmt)
+        if not self.context.create():
+            raise RuntimeError("Failed to create an OpenGL 4.3 core context")
+
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+        self.makeCurrent()
+
+        # 浮点颜色附件，保留超过 1.0 的 HDR 数值
+        fbo_format = QOpenGLFramebufferObjectFormat()
+        fbo_format.setInternalTextureFormat(gl.GL_RGBA32F)
+        self.fbo = QOpenGLFramebufferObject(width, height, fbo_format)
+
+        self.renderer = CircleRenderer()
+        self.renderer.initializeGL()
+
+        # 预分配读回缓冲区，逐帧复用
+        self._readback = np.empty((height, width, 4), dtype=np.float32)
+        self.pixels = np.empty((height, width, 4), dtype=np.float32)
+        self.pbo = None  # 异步读回时才创建
+
+    def makeCurrent(self):
+        if not self.context.makeCurrent(self.surface):
+            raise RuntimeError("Failed to make the offscreen context current")
+
+    def renderFrame(self, params=None, samples=1, tile=None, progress=None):
+        """渲染一帧，返回预分配的 (height, width, 4) float32 数组（第 0 行为图像顶部）
+
+        samples 为时间累积的子帧数，每帧都从头累积，保证输出与之前的帧无关。
+        tile=(x0, y0, 整幅宽, 整幅高) 时渲染整幅图像中左上角位于 (x0, y0)（图像坐标）、
+        大小为本渲染器尺寸的一块，超出图像的部分需由调用方裁掉。
+        返回值在下一次调用时会被覆盖，需要保留时请自行复制。
+        progress(已完成子帧数, samples) 在每个子帧提交后调用。
+        """
+        self.draw(params, samples, tile, progress)
+        self.fbo.bind()
+
+        gl.glPixelStorei(gl.GL_PACK_ALIGNMENT, 1)
+        gl.glReadPixels(0, 0, self.width, self.height, gl.GL_RGBA, gl.GL_FLOAT, self._readback)
+        self.fbo.release()
+
+        # OpenGL 的第 0 行在底部，翻转为图像顺序
+        np.copyto(self.pixels, self._readback[::-1])
+        return self.pixels
+
+    def draw(self, params=None, samples=1, tile=None, progress=None):
+        """渲染一帧到离屏 FBO，不读回（参数含义同 renderFrame）"""
+        params = makeParams(params)
+        self.makeCurrent()
+        key = backgroundKey(params)
+        if key is not None and key != self.renderer.background.key:
+            # 离屏渲染不需要保持界面响应，同步加载并一次上传完
+            self.renderer.background.setImage(key, loadBackground(key))
+            while not self.renderer.background.uploadChunk():
+                pass
+        if tile is not None:
+            x0, y0, full_w, full_h = tile
+            # gl_FragCoord 自下而上，换算成本块左下角在整幅图像中的位置
+            self.renderer.tile = (float(x0), float(full_h - y0 - self.height), full_w, full_h)
+        else:
+            self.renderer.tile = None
+        self.renderer.resetAccumulation()
+        for sample in range(samples):
+            # 子帧之间只改变抖动种子
+            sub_params = dict(params, iTime=params["iTime"] + sample * SAMPLE_TIME_OFFSET)
+            self.renderer.paintGL(self.width, self.height, sub_params, self.fbo.handle())
+            if progress is not None:
+                progress(sample + 1, samples)
+
+    def startReadback(self, tag):
+        """对 draw() 的结果发起异步 PBO 读回；环形缓冲已满时先调用 finishReadback()"""
+        if self.pbo is None:
+            self.pbo = PboReadback(self.width, self.height, READBACK_BUFFERS)
+        self.makeCurrent()
+        self.fbo.bind()
+        self.pbo.start(tag)
+        self.fbo.release()
+
+    def finishReadback(self, out):
+        """取回最早一帧到 out（(height, width, 4) float32，第 0 行为顶部），返回其标签"""
+        self.makeCurrent()
+        return self.pbo.finish(out)
+
+    @property
+    def readback_full(self):
+        return self.pbo is not None and self.pbo.full
+
+    @property
+    def pending_readbacks(self):
+        return 0 if self.pbo is None else len(self.pbo.pending)
+
+    def release(self):
+        """释放 GL 资源"""
+        self.makeCurrent()
+        self.renderer.releaseTextures()
+        self.renderer.background.release()
+        if self.pbo is not None:
+            self.pbo.release()
+            self.pbo = None
+        self.fbo = None
+        self.renderer = None
+        self.context.doneCurrent()
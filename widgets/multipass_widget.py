@@ -1,44 +1,34 @@
-import os
-import numpy as np
-import math
 from PyQt6.QtOpenGLWidgets import QOpenGLWidget
-from PyQt6.QtOpenGL import QOpenGLShaderProgram, QOpenGLShader
-from PyQt6.QtCore import Qt, QFile, QTextStream, QTimer
 from OpenGL import GL as gl
-import time
+
+from widgets.frame_profiler import FrameProfiler, StatsOverlay
+from widgets.render_graph import RenderGraph
+
+def createMultiPassGraph():
+    """两个通道的渲染图：方形写入离屏纹理，合成通道读取 pass1Texture 并叠加圆形"""
+    graph = RenderGraph()
+    graph.addPass("square", "shaders/multipass1.vert", "shaders/multipass1.frag")
+    graph.addPass("composite", "shaders/multipass2.vert", "shaders/multipass2.frag",
+                  inputs={"pass1Texture": "square"})
+    graph.setOutput("composite")
+    return graph
+
 
 class MultiPassWidget(QOpenGLWidget):
     def __init__(self):
         super().__init__()
         self.setMinimumSize(600, 600)
-        self.program = None
-        self.vbo = None
-        self.vao = None
-        self.start_time = time.time()
-        
-        # 创建定时器用于动画
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update)
-        self.timer.start(16)  # 约60fps
+        # 两个通道的渲染图，中间结果保存在帧缓冲纹理中，重绘由 FrameScheduler 调度
+        self.graph = createMultiPassGraph()
+
+        # 帧时间统计与画布叠加显示
+        self.profiler = FrameProfiler(self)
+        self.stats_overlay = StatsOverlay(self)
+        self.profiler.statsUpdated.connect(self.stats_overlay.setStats)
 
-    def loadShaderFromFile(self, shader_type, file_path):
-        """从文件加载着色器"""
-        if not os.path.exists(file_path):
-            print(f"Shader file not found: {file_path}")
-            return None
-            
-        shader = QOpenGLShader(shader_type, self)
-        file = QFile(file_path)
-        if file.open(QFile.OpenModeFlag.ReadOnly | QFile.OpenModeFlag.Text):
-            stream = QTextStream(file)
-            shader_source = stream.readAll()
-            file.close()
-            
-            if not shader.compileSourceCode(shader_source):
-                print(f"Shader compilation error: {shader.log()}")
-                return None
-            return shader
-        return None
+    def needsRedraw(self):
+        """画面与时间无关，只在尺寸变化或重新显示时重绘"""
+        return False
 
     def initializeGL(self):
         # 配置OpenGL 4.3核心模式
@@ -47,76 +37,21 @@ class MultiPassWidget(QOpenGLWidget):
         fmt.setProfile(fmt.OpenGLContextProfile.CoreProfile)
         self.setFormat(fmt)
 
-        # 创建着色器程序
-        self.program = QOpenGLShaderProgram(self)
-        
-        # 从文件加载着色器
-        vertex_shader = self.loadShaderFromFile(
-            QOpenGLShader.ShaderTypeBit.Vertex, "shaders/multipass1.vert"
-        )
-        fragment_shader = self.loadShaderFromFile(
-            QOpenGLShader.ShaderTypeBit.Fragment, "shaders/multipass1.frag"
-        )
-        
-        if vertex_shader and fragment_shader:
-            self.program.addShader(vertex_shader)
-            self.program.addShader(fragment_shader)
-            
-            if not self.program.link():
-                raise RuntimeError("Shader program link failed: " + self.program.log())
-        else:
-            raise RuntimeError("Shader loading failed")
-
-        # 顶点数据 (全屏矩形)
-        vertices = np.array([
-            # 位置       # 纹理坐标
-            -1.0, -1.0,  0.0, 0.0,
-             1.0, -1.0,  1.0, 0.0,
-             1.0,  1.0,  1.0, 1.0,
-             
-            -1.0, -1.0,  0.0, 0.0,
-             1.0,  1.0,  1.0, 1.0,
-            -1.0,  1.0,  0.0, 1.0
-        ], dtype=np.float32)
-
-        # 创建VAO和VBO
-        self.vao = gl.glGenVertexArrays(1)
-        self.vbo = gl.glGenBuffers(1)
-        
-        gl.glBindVertexArray(self.vao)
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
-        gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices, gl.GL_STATIC_DRAW)
-        
-        # 位置属性
-        gl.glVertexAttribPointer(0, 2, gl.GL_FLOAT, gl.GL_FALSE, 4 * vertices.itemsize, gl.ctypes.c_void_p(0))
-        gl.glEnableVertexAttribArray(0)
-        
-        # 纹理坐标属性
-        gl.glVertexAttribPointer(1, 2, gl.GL_FLOAT, gl.GL_FALSE, 4 * vertices.itemsize, gl.ctypes.c_void_p(2 * vertices.itemsize))
-        gl.glEnableVertexAttribArray(1)
-        
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
-        gl.glBindVertexArray(0)
+        # 通道1：方形写入离屏纹理；通道2：读取 pass1Texture 并叠加圆形，输出到屏幕
+        self.graph.initializeGL()
 
     def paintGL(self):
         gl.glClearColor(0.0, 0.0, 0.0, 1.0)
         gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
-        
-        if not self.program or not self.vao:
+
+        if self.graph.vao is None:
             return
 
-        self.program.bind()
-        
-        # 设置统一变量
-        elapsed_time = time.time() - self.start_time
-        self.program.setUniformValue("iTime", elapsed_time)
-        self.program.setUniformValue("iResolution", self.width(), self.height())
-        
-        gl.glBindVertexArray(self.vao)
-        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
-        gl.glBindVertexArray(0)
-        
-        self.program.release()
+        self.profiler.beginFrame()
+        # 方形通道的输入和参数不变，只在尺寸变化后重绘
+        self.graph.execute(self.width(), self.height(), self.defaultFramebufferObject(),
+                           self.profiler)
+        self.profiler.endFrame()
 
     def resizeGL(self, w, h):
-        gl.glViewport(0, 0, w, h)
\ No newline at end of file
+        gl.glViewport(0, 0, w, h)
@@ -0,0 +1,78 @@
+import ctypes
+from collections import deque
+
+import numpy as np
+from OpenGL import GL as gl
+
+
+class PboReadback:
+    """像素打包缓冲 (PBO) 环形队列，异步读回浮点 RGBA 帧
+
+    start() 把当前读帧缓冲的内容 glReadPixels 到下一个 PBO 并插入栅栏后立即返回，
+    GPU 在后台完成拷贝；finish() 等待最早的一帧完成、映射 PBO 并复制到调用方的数组。
+    环中有 count 个 PBO，读回 N 帧时 CPU 最多落后 GPU count-1 帧。需在同一 GL 上下文中调用。
+    """
+
+    def __init__(self, width, height, count=3):
+        self.width = width
+        self.height = height
+        self.count = count
+        self.nbytes = width * height * 4 * 4
+        self.buffers = list(np.atleast_1d(gl.glGenBuffers(count)))
+        for buffer in self.buffers:
+            gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, buffer)
+            gl.glBufferData(gl.GL_PIXEL_PACK_BUFFER, self.nbytes, None, gl.GL_STREAM_READ)
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, 0)
+        self.fences = [None] * count
+        self.pending = deque()  # (PBO 序号, 标签)，按发起顺序
+        self.next_index = 0
+
+    @property
+    def full(self):
+        """所有 PBO 都有未取回的帧，需要先 finish() 才能再 start()"""
+        return len(self.pending) == self.count
+
+    def start(self, tag):
+        """对当前绑定的读帧缓冲发起异步读回，tag 在 finish() 时原样返回"""
+        if self.full:
+            raise RuntimeError("PBO ring is full; call finish() first")
+        index = self.next_index
+        self.next_index = (index + 1) % self.count
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, self.buffers[index])
+        gl.glPixelStorei(gl.GL_PACK_ALIGNMENT, 1)
+        # 绑定 PBO 时最后一个参数是缓冲内的偏移
+        gl.glReadPixels(0, 0, self.width, self.height, gl.GL_RGBA, gl.GL_FLOAT, ctypes.c_void_p(0))
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, 0)
+        self.fences[index] = gl.glFenceSync(gl.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        gl.glFlush()  # 让读回命令尽快开始执行
+        self.pending.append((index, tag))
+
+    def finish(self, out):
+        """等待最早发起的读回完成，翻转为图像顺序（第 0 行为顶部）写入 out，返回其标签"""
+        index, tag = self.pending.popleft()
+        fence = self.fences[index]
+        while gl.glClientWaitSync(fence, gl.GL_SYNC_FLUSH_COMMANDS_BIT, 100000000) == gl.GL_TIMEOUT_EXPIRED:
+            pass
+        gl.glDeleteSync(fence)
+        self.fences[index] = None
+
+        gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, self.buffers[index])
+        address = gl.glMapBufferRange(gl.GL_PIXEL_PACK_BUFFER, 0, self.nbytes, gl.GL_MAP_READ_BIT)
+        try:
+            pointer = ctypes.cast(address, ctypes.POINTER(ctypes.c_float))
+            mapped = np.ctypeslib.as_array(pointer, shape=(self.height, self.width, 4))
+            np.copyto(out, mapped[::-1])  # OpenGL 的第 0 行在底部
+        finally:
+            gl.glUnmapBuffer(gl.GL_PIXEL_PACK_BUFFER)
+            gl.glBindBuffer(gl.GL_PIXEL_PACK_BUFFER, 0)
+        return tag
+
+    def release(self):
+        """删除 PBO 和未等待的栅栏（未取回的帧被丢弃）"""
+        for fence in self.fences:
+            if fence is not None:
+                gl.glDeleteSync(fence)
+        gl.glDeleteBuffers(len(self.buffers), self.buffers)
+        self.fences = [None] * self.count
+        self.pending.clear()
+        self.buffers = []
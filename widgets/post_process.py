@@ -0,0 +1,86 @@
+"""HDR 后处理：泛光 (bloom) 与色调映射
+
+光线步进的累积缓冲 (RGBA32F) 作为外部输入 "scene" 交给 RenderGraph：
+亮部提取并缩小 (bloom_down0) -> 逐级缩小 (bloom_down1..) -> 逐级放大并叠加同级 (..bloom_up0)
+-> 色调映射 (tonemap，绘制到目标帧缓冲，同时把缩小的累积缓冲放大到输出尺寸)。
+
+泛光链的中间结果为 RGBA16F，第一级的比例由 bloomScale 按输出像素数选择，使各级泛光通道
+每帧处理的像素总数不超过 BLOOM_PIXEL_BUDGET：4K 输出时泛光的开销与 1080p 相同，
+只有色调映射通道按全分辨率执行。各通道的 GPU 耗时以通道名记录在 FrameProfiler 中。
+"""
+from OpenGL import GL as gl
+
+from widgets.render_graph import RenderGraph
+
+BLOOM_LEVELS = 5                   # 泛光链级数（每级尺寸减半）
+BLOOM_PIXEL_BUDGET = 1920 * 1080   # 泛光链各通道每帧处理的像素总数上限
+BLOOM_MAX_SCALE = 0.5              # 第一级最大为输出的一半
+BLOOM_MIN_SCALE = 1.0 / 64.0
+BLOOM_THRESHOLD = 1.0              # 超过显示白点的部分才产生泛光
+BLOOM_KNEE = 0.5
+
+
+def bloomScale(width, height):
+    """泛光链第一级相对输出尺寸的比例（2 的负整数次幂）"""
+    # 第 k 级的面积比例为 (scale / 2^k)²；缩小链 BLOOM_LEVELS 个通道，放大链少一个
+    area = sum(0.25 ** k for k in range(BLOOM_LEVELS)) + sum(0.25 ** k for k in range(BLOOM_LEVELS - 1))
+    scale = BLOOM_MAX_SCALE
+    while scale > BLOOM_MIN_SCALE and width * height * scale * scale * area > BLOOM_PIXEL_BUDGET:
+        scale *= 0.5
+    return scale
+
+
+def createPostGraph(bloom=True):
+    """后处理渲染图，bloom 为假时只有色调映射一个通道"""
+    graph = RenderGraph()
+    if bloom:
+        source = "scene"
+        for level in range(BLOOM_LEVELS):
+            graph.addPass(f"bloom_down{level}", "shaders/post.vert", "shaders/bloom.frag",
+                          inputs={"sourceTexture": source}, internal_format=gl.GL_RGBA16F,
+                          defines=("PREFILTER",) if level == 0 else ("DOWNSAMPLE",))
+            source = f"bloom_down{level}"
+        for level in reversed(range(BLOOM_LEVELS - 1)):
+            graph.addPass(f"bloom_up{level}", "shaders/post.vert", "shaders/bloom.frag",
+                          inputs={"sourceTexture": source, "baseTexture": f"bloom_down{level}"},
+                          internal_format=gl.GL_RGBA16F, defines=("UPSAMPLE",))
+            source = f"bloom_up{level}"
+        graph.addPass("tonemap", "shaders/post.vert", "shaders/tonemap.frag",
+                      inputs={"sceneTexture": "scene", "bloomTexture": source}, defines=("BLOOM",))
+        graph.setUniforms("bloom_down0", threshold=BLOOM_THRESHOLD, knee=BLOOM_KNEE)
+        graph.setUniforms("tonemap", bloomLevels=float(BLOOM_LEVELS))
+    else:
+        graph.addPass("tonemap", "shaders/post.vert", "shaders/tonemap.frag",
+                      inputs={"sceneTexture": "scene"})
+    graph.setOutput("tonemap")
+    return graph
+
+
+class PostProcess:
+    """CircleRenderer 的后处理：按 params 中的 tonemap / exposure / bloom 执行对应的渲染图"""
+
+    def __init__(self):
+        self.graphs = {True: createPostGraph(bloom=True), False: createPostGraph(bloom=False)}
+        self.scene_version = 0
+
+    def initializeGL(self):
+        for graph in self.graphs.values():
+            graph.initializeGL()
+
+    def execute(self, scene_texture, width, height, params, target_fbo=0, profiler=None):
+        """把 HDR 场景纹理后处理后绘制到 target_fbo（尺寸 width x height）"""
+        bloom = params["bloom"] > 0.0
+        graph = self.graphs[bloom]
+        # 累积缓冲每帧都会更新，版本号每次加一
+        self.scene_version += 1
+        graph.setExternal("scene", scene_texture, self.scene_version)
+        if bloom:
+            scale = bloomScale(width, height)
+            for level in range(BLOOM_LEVELS):
+                graph.passes[f"bloom_down{level}"].scale = scale * 0.5 ** level
+            for level in range(BLOOM_LEVELS - 1):
+                graph.passes[f"bloom_up{level}"].scale = scale * 0.5 ** level
+            graph.setUniforms("tonemap", bloomStrength=float(params["bloom"]))
+        graph.setUniforms("tonemap", exposure=float(params["exposure"]),
+                          tonemapOperator=int(params["tonemap"]))
+        graph.execute(width, height, target_fbo, profiler)
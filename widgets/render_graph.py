@@ -0,0 +1,235 @@
+from contextlib import nullcontext
+
+import numpy as np
+from PyQt6.QtOpenGL import QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+from OpenGL import GL as gl
+
+from widgets.shader_library import ShaderLibrary
+
+POOL_LIMIT = 4  # 尺寸变化后闲置的帧缓冲最多保留的数量
+
+
+def _freeze(value):
+    """把 uniform 值转换为可比较的元组"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(np.asarray(value).ravel().tolist())
+    return value
+
+
+class RenderPass:
+    """渲染图中的一个全屏通道
+
+    inputs: 采样器名 -> 来源（其他通道名或 setExternal 登记的外部纹理名）
+    uniforms: 名称 -> 数值，每帧可修改；与输入版本一起决定通道是否需要重绘
+    """
+
+    def __init__(self, name, vertex_path, fragment_path, inputs=None,
+                 internal_format=gl.GL_RGBA8, scale=1.0, defines=(), filter=gl.GL_LINEAR):
+        self.name = name
+        self.vertex_path = vertex_path
+        self.fragment_path = fragment_path
+        self.defines = defines
+        self.inputs = dict(inputs or {})
+        self.internal_format = internal_format
+        self.scale = scale
+        self.filter = filter
+        self.uniforms = {}
+        self.program = None
+        self.fbo = None
+        self.version = 0     # 输出内容每变化一次加一，供下游判断是否需要重绘
+        self._key = None
+
+    def outputSize(self, width, height):
+        return max(1, int(round(width * self.scale))), max(1, int(round(height * self.scale)))
+
+
+class RenderGraph:
+    """由全屏通道组成的小型渲染图
+
+    按依赖关系（拓扑序）执行各通道；中间结果写入按尺寸和格式复用的帧缓冲纹理，
+    输入和 uniform 均未变化的通道直接沿用上次的输出。setOutput 指定的通道绘制到
+    目标帧缓冲，每次都会执行。
+    """
+
+    def __init__(self):
+        self.passes = {}
+        self.externals = {}   # 名称 -> (纹理, 版本)
+        self.output = None
+        self.pool = []        # 闲置的帧缓冲
+        self.vao = None
+        self.vbo = None
+        self.shader_generation = 0
+        self._order = None
+
+    def addPass(self, name, vertex_path, fragment_path, **options):
+        render_pass = RenderPass(name, vertex_path, fragment_path, **options)
+        self.passes[name] = render_pass
+        self._order = None
+        return render_pass
+
+    def setOutput(self, name):
+        """指定直接绘制到目标帧缓冲的通道"""
+        self.output = name
+
+    def setUniforms(self, name, **values):
+        self.passes[name].uniforms.update(values)
+
+    def setExternal(self, name, texture, version):
+        """登记外部纹理（例如累积缓冲），version 变化表示内容已更新"""
+        self.externals[name] = (texture, version)
+
+    def texture(self, name):
+        """通道（或外部输入）当前输出的纹理"""
+        if name in self.externals:
+            return self.externals[name][0]
+        render_pass = self.passes[name]
+        return render_pass.fbo.texture() if render_pass.fbo else 0
+
+    def order(self):
+        """按依赖关系排序的通道名，存在环时抛出 RuntimeError"""
+        if self._order is not None:
+            return self._order
+        remaining = {name: {source for source in p.inputs.values() if source in self.passes}
+                     for name, p in self.passes.items()}
+        order = []
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise RuntimeError("Render graph has a cycle: " + ", ".join(sorted(remaining)))
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        self._order = order
+        return order
+
+    def initializeGL(self):
+        """创建全屏矩形（位置 location 0，纹理坐标 location 1）并编译各通道程序"""
+        vertices = np.array([
+            -1.0, -1.0, 0.0, 0.0,
+             1.0, -1.0, 1.0, 0.0,
+             1.0,  1.0, 1.0, 1.0,
+            -1.0, -1.0, 0.0, 0.0,
+             1.0,  1.0, 1.0, 1.0,
+            -1.0,  1.0, 0.0, 1.0,
+        ], dtype=np.float32)
+        self.vao = gl.glGenVertexArrays(1)
+        self.vbo = gl.glGenBuffers(1)
+        gl.glBindVertexArray(self.vao)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices, gl.GL_STATIC_DRAW)
+        stride = 4 * vertices.itemsize
+        gl.glVertexAttribPointer(0, 2, gl.GL_FLOAT, gl.GL_FALSE, stride, gl.ctypes.c_void_p(0))
+        gl.glEnableVertexAttribArray(0)
+        gl.glVertexAttribPointer(1, 2, gl.GL_FLOAT, gl.GL_FALSE, stride,
+                                 gl.ctypes.c_void_p(2 * vertices.itemsize))
+        gl.glEnableVertexAttribArray(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        gl.glBindVertexArray(0)
+
+        library = ShaderLibrary.current()
+        for render_pass in self.passes.values():
+            render_pass.program = library.program(render_pass.vertex_path,
+                                                  render_pass.fragment_path, render_pass.defines)
+        self.shader_generation = library.generation
+
+    def refreshPrograms(self):
+        """着色器热重载后换入新程序"""
+        library = ShaderLibrary.current()
+        if library.generation == self.shader_generation:
+            return
+        self.shader_generation = library.generation
+        for render_pass in self.passes.values():
+            render_pass.program = library.currentProgram(
+                render_pass.vertex_path, render_pass.fragment_path, render_pass.defines)
+
+    def acquireFbo(self, width, height, internal_format, filter):
+        """从闲置池中取出尺寸和格式相同的帧缓冲，没有则新建"""
+        for fbo in self.pool:
+            if fbo.width() == width and fbo.height() == height \
+                    and fbo.format().internalTextureFormat() == internal_format:
+                self.pool.remove(fbo)
+                break
+        else:
+            fbo_format = QOpenGLFramebufferObjectFormat()
+            fbo_format.setInternalTextureFormat(internal_format)
+            fbo = QOpenGLFramebufferObject(width, height, fbo_format)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, fbo.texture())
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, filter)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, filter)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_S, gl.GL_CLAMP_TO_EDGE)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_WRAP_T, gl.GL_CLAMP_TO_EDGE)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+        return fbo
+
+    def releaseFbo(self, fbo):
+        self.pool.append(fbo)
+        del self.pool[:-POOL_LIMIT]
+
+    def ensureTarget(self, render_pass, width, height):
+        """按当前尺寸准备通道的输出帧缓冲，尺寸变化时旧缓冲放回闲置池"""
+        fbo = render_pass.fbo
+        if fbo is not None and (fbo.width(), fbo.height()) == (width, height):
+            return
+        if fbo is not None:
+            self.releaseFbo(fbo)
+        render_pass.fbo = self.acquireFbo(width, height, render_pass.internal_format,
+                                          render_pass.filter)
+        render_pass._key = None
+
+    def inputVersion(self, source):
+        if source in self.externals:
+            return self.externals[source][1]
+        return self.passes[source].version
+
+    def execute(self, width, height, target_fbo=0, profiler=None):
+        """执行渲染图，最终通道绘制到 target_fbo（尺寸 width x height）"""
+        self.refreshPrograms()
+        for name in self.order():
+            render_pass = self.passes[name]
+            is_output = name == self.output
+            if is_output:
+                pass_w, pass_h = width, height
+            else:
+                pass_w, pass_h = render_pass.outputSize(width, height)
+                self.ensureTarget(render_pass, pass_w, pass_h)
+
+            key = (pass_w, pass_h, id(render_pass.program),
+                   tuple(sorted((k, _freeze(v)) for k, v in render_pass.uniforms.items())),
+                   tuple((sampler, self.inputVersion(source))
+                         for sampler, source in sorted(render_pass.inputs.items())))
+            if not is_output and key == render_pass._key:
+                continue  # 输入和参数都未变化，沿用上次输出
+            render_pass._key = key
+
+            gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target_fbo if is_output else render_pass.fbo.handle())
+            gl.glViewport(0, 0, pass_w, pass_h)
+            with profiler.gpuPass(name) if profiler else nullcontext():
+                self.drawPass(render_pass, pass_w, pass_h)
+            render_pass.version += 1
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, target_fbo)
+
+    def drawPass(self, render_pass, width, height):
+        program = render_pass.program
+        program.bind()
+        program.setUniformValue("iResolution", float(width), float(height))
+        for name, value in render_pass.uniforms.items():
+            if isinstance(value, (list, tuple, np.ndarray)):
+                program.setUniformValue(name, *[float(v) for v in value])
+            else:
+                program.setUniformValue(name, value)
+        for unit, (sampler, source) in enumerate(sorted(render_pass.inputs.items())):
+            gl.glActiveTexture(gl.GL_TEXTURE0 + unit)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture(source))
+            program.setUniformValue(sampler, unit)
+
+        gl.glBindVertexArray(self.vao)
+        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
+        gl.glBindVertexArray(0)
+
+        for unit in range(len(render_pass.inputs)):
+            gl.glActiveTexture(gl.GL_TEXTURE0 + unit)
+            gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+        program.release()
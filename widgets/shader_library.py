@@ -0,0 +1,127 @@
+import hashlib
+import os
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtGui import QOpenGLContext
+from PyQt6.QtOpenGL import QOpenGLShader, QOpenGLShaderProgram
+
+_sources = {}  # 文件路径 -> (修改时间, 源码)，多个组件共用同一份源码
+
+
+def readSource(path):
+    """读取着色器源码，文件未修改时直接返回缓存"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        raise RuntimeError(f"Shader file not found: {path}")
+    cached = _sources.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as file:
+        source = file.read()
+    _sources[path] = (mtime, source)
+    return source
+
+
+def applyDefines(source, defines):
+    """把 defines（名称序列或 名称->值 字典）插入到 #version 之后"""
+    if not defines:
+        return source
+    items = defines.items() if isinstance(defines, dict) else ((name, 1) for name in defines)
+    version, _, body = source.partition("\n")
+    return "\n".join([version] + [f"#define {name} {value}" for name, value in items] + [body])
+
+
+def requestKey(vertex_path, fragment_path, defines=()):
+    """程序请求的标识：规范化路径和排序后的宏"""
+    items = defines.items() if isinstance(defines, dict) else ((name, 1) for name in defines)
+    return (os.path.normpath(vertex_path), os.path.normpath(fragment_path),
+            tuple(sorted((name, str(value)) for name, value in items)))
+
+
+def requestSources(request):
+    """按请求读取（并预处理）源码，返回 (顶点源码, 片段源码, 源码哈希)"""
+    vertex_path, fragment_path, defines = request
+    defines = dict(defines)
+    vertex_source = applyDefines(readSource(vertex_path), defines)
+    fragment_source = applyDefines(readSource(fragment_path), defines)
+    key = hashlib.sha1((vertex_source + "\0" + fragment_source).encode("utf-8")).hexdigest()
+    return vertex_source, fragment_source, key
+
+
+def linkProgram(vertex_source, fragment_source, parent=None):
+    """在当前上下文中编译链接程序，返回 (程序, 错误日志)，失败时程序为 None"""
+    program = QOpenGLShaderProgram(parent)
+    for shader_type, source in ((QOpenGLShader.ShaderTypeBit.Vertex, vertex_source),
+                                (QOpenGLShader.ShaderTypeBit.Fragment, fragment_source)):
+        if not program.addCacheableShaderFromSourceCode(shader_type, source):
+            return None, program.log()
+    if not program.link():
+        return None, program.log()
+    return program, ""
+
+
+class ShaderLibrary(QObject):
+    """着色器程序缓存
+
+    同一共享组 (QOpenGLContextGroup) 内的上下文共用程序对象，相同源码只编译链接一次；
+    通过 addCacheableShaderFromSourceCode 启用 Qt 的程序二进制磁盘缓存（以源码和
+    驱动信息为键），源码未变时再次启动可跳过编译。
+
+    热重载时 ShaderReloader 在后台上下文中编译新程序并调用 install()，generation 随之增加；
+    组件在 paintGL 开头发现 generation 变化后用 currentProgram() 取得新程序。
+    """
+
+    programsChanged = pyqtSignal()
+
+    _libraries = {}  # id(共享组) -> ShaderLibrary
+
+    def __init__(self, group):
+        super().__init__(group)
+        self.programs = {}  # 源码哈希 -> QOpenGLShaderProgram
+        self.active = {}    # 请求 -> (源码哈希, 当前使用的程序)
+        self.generation = 0
+
+    @classmethod
+    def current(cls):
+        """当前 OpenGL 上下文所在共享组的着色器库"""
+        context = QOpenGLContext.currentContext()
+        if context is None:
+            raise RuntimeError("ShaderLibrary requires a current OpenGL context")
+        return cls.forContext(context)
+
+    @classmethod
+    def forContext(cls, context):
+        group = context.shareGroup()
+        key = id(group)
+        library = cls._libraries.get(key)
+        if library is None:
+            library = cls._libraries[key] = cls(group)
+            group.destroyed.connect(lambda *_: cls._libraries.pop(key, None))
+        return library
+
+    def program(self, vertex_path, fragment_path, defines=()):
+        """返回已链接的着色器程序，失败时抛出 RuntimeError"""
+        request = requestKey(vertex_path, fragment_path, defines)
+        vertex_source, fragment_source, key = requestSources(request)
+        program = self.programs.get(key)
+        if program is None:
+            program, log = linkProgram(vertex_source, fragment_source, self)
+            if program is None:
+                raise RuntimeError(f"Shader program build failed ({fragment_path}): {log}")
+            self.programs[key] = program
+        self.active[request] = (key, program)
+        return program
+
+    def currentProgram(self, vertex_path, fragment_path, defines=()):
+        """该请求当前使用的程序（热重载失败时保持旧程序），请求过的程序不会再触发编译"""
+        entry = self.active.get(requestKey(vertex_path, fragment_path, defines))
+        return entry[1] if entry else self.program(vertex_path, fragment_path, defines)
+
+    def install(self, request, key, program):
+        """换入后台编译好的程序"""
+        program.setParent(self)
+        self.programs[key] = program
+        self.active[request] = (key, program)
+        self.generation += 1
+        self.programsChanged.emit()
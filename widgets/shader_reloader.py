@@ -0,0 +1,176 @@
+import os
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QOffscreenSurface, QOpenGLContext
+from OpenGL import GL as gl
+
+from widgets.shader_library import ShaderLibrary, linkProgram, requestSources
+
+RELOAD_DELAY_MS = 150  # 合并编辑器保存时的多次文件事件
+
+
+class ShaderCompileWorker(QObject):
+    """在后台线程的共享上下文中编译着色器，渲染线程不会因编译而卡顿"""
+
+    compiled = pyqtSignal(object, str, object)  # 请求, 源码哈希, QOpenGLShaderProgram
+    failed = pyqtSignal(object, str, str)       # 请求, 源码哈希, 编译/链接日志
+
+    def __init__(self, share_context, main_thread):
+        super().__init__()
+        self.main_thread = main_thread
+        # 上下文和离屏表面需在 GUI 线程创建，随后把上下文移到工作线程
+        self.context = QOpenGLContext()
+        self.context.setShareContext(share_context)
+        self.context.setFormat(share_context.format())
+        if not self.context.create():
+            raise RuntimeError("Failed to create shader compile context")
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+
+    @pyqtSlot(object, str, str, str)
+    def compile(self, request, key, vertex_source, fragment_source):
+        if not self.context.makeCurrent(self.surface):
+            self.failed.emit(request, key, "Failed to make shader compile context current")
+            return
+        program, log = linkProgram(vertex_source, fragment_source)
+        if program is not None:
+            # 程序对象在共享上下文间可见，但须等链接真正完成后再交给渲染线程使用
+            gl.glFinish()
+        self.context.doneCurrent()
+
+        if program is None:
+            self.failed.emit(request, key, log)
+            return
+        program.moveToThread(self.main_thread)
+        self.compiled.emit(request, key, program)
+
+
+class ShaderReloader(QObject):
+    """监视 shaders/ 目录，源码变化后在后台重新编译并换入 ShaderLibrary
+
+    编译成功后由 ShaderLibrary.install() 换入新程序，组件在下一帧开头才切换；
+    编译失败时保留旧程序，并通过 reloadFailed 发出日志。需要启用
+    AA_ShareOpenGLContexts，使后台上下文与各组件位于同一共享组。
+    """
+
+    reloaded = pyqtSignal(str)        # 重新编译成功的片段着色器
+    reloadFailed = pyqtSignal(str)    # 出错文件与编译日志
+    compileRequested = pyqtSignal(object, str, str, str)
+
+    def __init__(self, directory="shaders", parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.onPathChanged)
+        self.watcher.directoryChanged.connect(self.onPathChanged)
+        self.changed = set()
+        self.pending = {}  # 请求 -> 正在编译的源码哈希
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(RELOAD_DELAY_MS)
+        self.timer.timeout.connect(self.reloadChanged)
+        self.compile_thread = None
+        self.worker = None
+        self.library = None
+
+    def isEnabled(self):
+        return bool(self.watcher.directories())
+
+    def setEnabled(self, enabled):
+        """开始/停止监视"""
+        if enabled == self.isEnabled():
+            return
+        if enabled:
+            self.watcher.addPath(self.directory)
+            self.watchFiles()
+        else:
+            paths = self.watcher.files() + self.watcher.directories()
+            if paths:
+                self.watcher.removePaths(paths)
+            self.timer.stop()
+            self.changed.clear()
+
+    def watchFiles(self):
+        """编辑器保存时可能替换文件，目录变化后重新登记所有文件"""
+        files = [os.path.join(self.directory, name) for name in sorted(os.listdir(self.directory))]
+        missing = [path for path in files if os.path.isfile(path) and path not in self.watcher.files()]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def onPathChanged(self, path):
+        if os.path.isdir(path):
+            # 目录事件（文件被替换或新增）时重新登记文件，并检查所有已使用的程序
+            self.watchFiles()
+            self.changed.add(None)
+        else:
+            self.changed.add(os.path.normpath(path))
+            if os.path.exists(path) and path not in self.watcher.files():
+                self.watcher.addPath(path)
+        self.timer.start()
+
+    def ensureWorker(self):
+        """首次需要时创建后台编译线程（全局共享上下文此时已存在）"""
+        if self.worker is not None:
+            return True
+        share_context = QOpenGLContext.globalShareContext()
+        if share_context is None:
+            self.reloadFailed.emit("Shader hot reload needs AA_ShareOpenGLContexts")
+            return False
+        self.library = ShaderLibrary.forContext(share_context)
+        self.compile_thread = QThread(self)
+        self.worker = ShaderCompileWorker(share_context, self.thread())
+        self.worker.context.moveToThread(self.compile_thread)
+        self.worker.moveToThread(self.compile_thread)
+        self.compileRequested.connect(self.worker.compile)
+        self.worker.compiled.connect(self.onCompiled)
+        self.worker.failed.connect(self.onFailed)
+        self.compile_thread.start()
+        return True
+
+    def reloadChanged(self):
+        """对使用了已修改文件的程序发起后台编译"""
+        changed, self.changed = self.changed, set()
+        if not self.ensureWorker():
+            return
+        for request, (key, _) in list(self.library.active.items()):
+            vertex_path, fragment_path, _ = request
+            if None not in changed and vertex_path not in changed and fragment_path not in changed:
+                continue
+            try:
+                vertex_source, fragment_source, new_key = requestSources(request)
+            except (RuntimeError, OSError) as error:
+                self.reloadFailed.emit(str(error))
+                continue
+            if new_key == key or self.pending.get(request) == new_key:
+                continue
+            program = self.library.programs.get(new_key)
+            if program is not None:
+                # 改回了之前编译过的版本
+                self.library.install(request, new_key, program)
+                self.reloaded.emit(fragment_path)
+                continue
+            self.pending[request] = new_key
+            self.compileRequested.emit(request, new_key, vertex_source, fragment_source)
+
+    def onCompiled(self, request, key, program):
+        if self.pending.get(request) != key:
+            # 编译期间文件又被修改，等待最新版本
+            program.deleteLater()
+            return
+        del self.pending[request]
+        self.library.install(request, key, program)
+        self.reloaded.emit(request[1])
+
+    def onFailed(self, request, key, log):
+        if self.pending.get(request) != key:
+            return
+        del self.pending[request]
+        self.reloadFailed.emit(f"{request[1]}:\n{log.strip()}")
+
+    def shutdown(self):
+        """应用退出前停止后台线程"""
+        self.setEnabled(False)
+        if self.compile_thread is not None:
+            self.compile_thread.quit()
+            self.compile_thread.wait()
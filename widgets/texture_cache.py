@@ -0,0 +1,120 @@
+from collections import OrderedDict
+
+import numpy as np
+from PyQt6.QtGui import QOpenGLContext
+from OpenGL import GL as gl
+
+from blackhole import procedural
+
+IDLE_LIMIT = 8  # 引用计数归零后仍保留的纹理数量，超过时删除最久未用的
+
+# 各程序纹理的上传方式: (S 方向环绕, T 方向环绕, 是否生成 mipmap, 浮点数据的内部格式)；
+# 三维纹理的 R 方向与 S 方向相同
+TEXTURE_OPTIONS = {
+    "blackbody": (gl.GL_CLAMP_TO_EDGE, gl.GL_CLAMP_TO_EDGE, False, gl.GL_RGBA32F),  # log2 亮度需要全精度
+    "chessboard": (gl.GL_REPEAT, gl.GL_REPEAT, False, gl.GL_RGBA16F),
+    "diskNoise": (gl.GL_REPEAT, gl.GL_REPEAT, False, gl.GL_RGBA16F),
+    "noise": (gl.GL_REPEAT, gl.GL_REPEAT, True, gl.GL_RGBA16F),
+    "starfield": (gl.GL_REPEAT, gl.GL_CLAMP_TO_EDGE, True, gl.GL_RGBA16F),
+    "temperatureRamp": (gl.GL_CLAMP_TO_EDGE, gl.GL_CLAMP_TO_EDGE, False, gl.GL_RGBA16F),
+}
+
+
+class TextureCache:
+    """程序纹理的 GL 纹理缓存
+
+    同一共享组内的组件共用纹理对象：acquire() 按 (名称, 参数) 返回纹理并增加引用计数，
+    release() 减少计数；计数归零的纹理暂不删除，再次请求时直接复用，闲置数量超过
+    IDLE_LIMIT 时删除最久未用的。纹理数据由 blackhole.procedural 生成并缓存在磁盘上。
+    """
+
+    _caches = {}  # id(共享组) -> TextureCache
+
+    def __init__(self):
+        self.textures = {}         # 键 -> 纹理
+        self.keys = {}             # 纹理 -> 键
+        self.sizes = {}            # 纹理 -> (宽, 高)
+        self.refcounts = {}        # 纹理 -> 引用计数
+        self.idle = OrderedDict()  # 闲置纹理（按释放先后）
+
+    @classmethod
+    def current(cls):
+        """当前 OpenGL 上下文所在共享组的纹理缓存"""
+        context = QOpenGLContext.currentContext()
+        if context is None:
+            raise RuntimeError("TextureCache requires a current OpenGL context")
+        group = context.shareGroup()
+        key = id(group)
+        cache = cls._caches.get(key)
+        if cache is None:
+            cache = cls._caches[key] = cls()
+            group.destroyed.connect(lambda *_: cls._caches.pop(key, None))
+        return cache
+
+    def acquire(self, name, **params):
+        """返回程序纹理的 GL 纹理对象（需在该共享组的上下文中调用）"""
+        key = (name, procedural.cacheKey(name, params))
+        texture = self.textures.get(key)
+        if texture is None:
+            texture = self.upload(name, procedural.generate(name, **params))
+            self.textures[key] = texture
+            self.keys[texture] = key
+            self.refcounts[texture] = 0
+        self.idle.pop(texture, None)
+        self.refcounts[texture] += 1
+        self.evict()
+        return texture
+
+    def release(self, texture):
+        """释放一次引用；计数归零后进入闲置列表"""
+        if texture not in self.refcounts:
+            return
+        self.refcounts[texture] -= 1
+        if self.refcounts[texture] <= 0:
+            self.refcounts[texture] = 0
+            self.idle[texture] = None
+
+    def evict(self):
+        """删除超出 IDLE_LIMIT 的闲置纹理（需要当前上下文）"""
+        while len(self.idle) > IDLE_LIMIT:
+            texture, _ = self.idle.popitem(last=False)
+            del self.textures[self.keys.pop(texture)]
+            del self.refcounts[texture]
+            del self.sizes[texture]
+            gl.glDeleteTextures([texture])
+
+    def size(self, texture):
+        """纹理尺寸 (宽, 高)"""
+        return self.sizes[texture]
+
+    def upload(self, name, image):
+        """把 (height, width, 4) 的 uint8/float32 数组上传为纹理，(depth, height, width, 4) 上传为三维纹理"""
+        target = gl.GL_TEXTURE_3D if image.ndim == 4 else gl.GL_TEXTURE_2D
+        height, width = image.shape[-3:-1]
+        wrap_s, wrap_t, mipmap, float_format = TEXTURE_OPTIONS[name]
+        if image.dtype == np.uint8:
+            internal_format, data_type = gl.GL_RGBA8, gl.GL_UNSIGNED_BYTE
+        else:
+            image = np.ascontiguousarray(image, dtype=np.float32)
+            internal_format, data_type = float_format, gl.GL_FLOAT
+
+        texture = gl.glGenTextures(1)
+        gl.glBindTexture(target, texture)
+        gl.glTexParameteri(target, gl.GL_TEXTURE_WRAP_S, wrap_s)
+        gl.glTexParameteri(target, gl.GL_TEXTURE_WRAP_T, wrap_t)
+        gl.glTexParameteri(target, gl.GL_TEXTURE_MIN_FILTER,
+                           gl.GL_LINEAR_MIPMAP_LINEAR if mipmap else gl.GL_LINEAR)
+        gl.glTexParameteri(target, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+        gl.glPixelStorei(gl.GL_UNPACK_ALIGNMENT, 4)
+        if target == gl.GL_TEXTURE_3D:
+            gl.glTexParameteri(target, gl.GL_TEXTURE_WRAP_R, wrap_s)
+            gl.glTexImage3D(target, 0, internal_format, width, height, image.shape[0], 0,
+                            gl.GL_RGBA, data_type, image)
+        else:
+            gl.glTexImage2D(target, 0, internal_format, width, height, 0,
+                            gl.GL_RGBA, data_type, image)
+        if mipmap:
+            gl.glGenerateMipmap(target)
+        gl.glBindTexture(target, 0)
+        self.sizes[texture] = (width, height)
+        return texture
@@ -0,0 +1,30 @@
+import numpy as np
+from OpenGL import GL as gl
+
+
+class UniformBlock:
+    """std140 uniform 缓冲，内容不变时跳过上传"""
+
+    def __init__(self, binding, size):
+        self.binding = binding
+        self.size = size
+        self.buffer = gl.glGenBuffers(1)
+        self.data = None
+        self.upload_count = 0  # 实际上传次数，便于确认只在参数变化时上传
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, self.buffer)
+        gl.glBufferData(gl.GL_UNIFORM_BUFFER, size, None, gl.GL_DYNAMIC_DRAW)
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, 0)
+
+    def update(self, data):
+        """data 为已按 std140 打包的数组，返回是否发生了上传"""
+        if self.data is not None and np.array_equal(self.data, data):
+            return False
+        self.data = np.array(data, copy=True)
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, self.buffer)
+        gl.glBufferSubData(gl.GL_UNIFORM_BUFFER, 0, self.data.nbytes, self.data)
+        gl.glBindBuffer(gl.GL_UNIFORM_BUFFER, 0)
+        self.upload_count += 1
+        return True
+
+    def bind(self):
+        gl.glBindBufferBase(gl.GL_UNIFORM_BUFFER, self.binding, self.buffer)